@@ -0,0 +1,110 @@
+"""
+Benchmark of the asynchronous aging worker against the synchronous computation of the aging within the step.
+
+A synthetic SoC profile (random cycles of different depth) is streamed to the Bolun model, checking the aging every
+'check_every' samples, by:
+    - sync: the aging computed within the loop, as done without 'aging_max_lag';
+    - worker: the aging computed by an AgingWorker with the given maximum lag.
+
+The loop is timed both without any other work, where the time is the cost of the aging for the simulation, and
+with some Python work at each step standing in for the battery models (about 'step_work' microseconds), where the
+worker can compute the aging while the loop goes on. The time to close the worker (i.e. to wait for the checks
+still pending) is included.
+
+The worker can only overlap the aging with the loop if a spare core is available. Measured on a machine with a
+single core (1M samples, streamflow, checked every 2000 samples, max_lag=8), where the worker can only add the cost
+of starting the process and of transferring the samples:
+    - no step work: 19.7 s sync, 23.4 s worker;
+    - 20 us of step work: 37.8 s sync, 39.2 s worker.
+With a spare core, the loop is expected to take about the larger of the aging and of the step work, instead of
+their sum.
+
+Usage (from the root of the repository):
+    python benchmarks/aging_worker.py --samples 1000000 --check_every 2000 --mode streamflow
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.digital_twin.battery_models.aging.bolun import BolunModel
+from src.digital_twin.battery_models.aging.worker import AgingWorker
+
+
+def soc_profile(n_samples: int):
+    rng = np.random.default_rng(0)
+    soc = np.cumsum(rng.choice([-1., 1.], size=n_samples // 50).repeat(50) * rng.uniform(0., 2e-3, n_samples))
+    return (0.5 + 0.4 * np.tanh(soc)).tolist()
+
+
+def new_model(mode: str):
+    with open('data/config/models/aging/bolun.yaml') as f:
+        config = yaml.safe_load(f)
+    config['components']['cycle_counting_mode'] = mode
+    model = BolunModel(components_settings=config['components'], stress_models=config['stress_models'])
+    model.init_model()
+    return model
+
+
+def step_work(n_ops: int):
+    x = 0.
+    for i in range(n_ops):
+        x += i * 1e-3
+    return x
+
+
+def run(soc: list, mode: str, check_every: int, max_lag: int, n_ops: int):
+    model = new_model(mode)
+    worker = AgingWorker(aging_model=model, max_lag=max_lag) if max_lag is not None else None
+    soc_series, temp_series = [], []
+
+    start = time.perf_counter()
+    for k, value in enumerate(soc):
+        step_work(n_ops)
+        soc_series.append(value)
+        temp_series.append(298.15)
+        if k > 0 and k % check_every == 0:
+            if worker is None:
+                model.compute_degradation(soc_history=soc_series, temp_history=temp_series, elapsed_time=k, k=k)
+            else:
+                worker.submit(soc_series=soc_series, temp_series=temp_series, elapsed_time=k, k=k)
+                worker.poll()
+
+    if worker is not None:
+        worker.close()
+    return time.perf_counter() - start, model.get_deg_series()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=1000000, help="Samples of the SoC profile.")
+    parser.add_argument('--check_every', type=int, default=2000, help="Samples between two aging checks.")
+    parser.add_argument('--mode', default='streamflow', help="Cycle counting mode of the Bolun model.")
+    parser.add_argument('--max_lag', type=int, default=8, help="Maximum lag of the aging worker.")
+    parser.add_argument('--step_work', type=float, default=20., help="Microseconds of work at each step.")
+    args = parser.parse_args()
+
+    # Calibrate the work standing in for the battery models
+    n_ops = 10000
+    start = time.perf_counter()
+    step_work(n_ops)
+    n_ops = int(n_ops * args.step_work * 1e-6 / (time.perf_counter() - start))
+
+    soc = soc_profile(args.samples)
+    print("{} samples, {} mode, aging checked every {} samples\n".format(args.samples, args.mode, args.check_every))
+    print("{:<12}{:<14}{:>12}{:>16}".format('aging', 'step work', 'total [s]', 'degradation'))
+
+    for work in [0, n_ops]:
+        for max_lag in [None, args.max_lag]:
+            elapsed, degradation = run(soc, args.mode, args.check_every, max_lag, work)
+            print("{:<12}{:<14}{:>12.2f}{:>16.6e}".format('sync' if max_lag is None else 'worker',
+                                                          '{:.0f} us'.format(args.step_work) if work else 'none',
+                                                          elapsed, degradation))
+
+
+if __name__ == '__main__':
+    main()
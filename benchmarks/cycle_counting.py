@@ -0,0 +1,89 @@
+"""
+Benchmark of the cycle counting modes of the Bolun aging model (streamflow, rainflow and fastflow) on the same
+synthetic SoC trace: daily cycles of varying depth with measurement noise and rests.
+
+Streamflow processes one sample for each call, so it is called at every step, whereas rainflow and fastflow are
+called every 'check_every' steps with the whole history, as done by the battery with 'check_soh_every'.
+
+Usage (from the root of the repository):
+    python benchmarks/cycle_counting.py --days 30 --dt 60 --check_every 3600
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.digital_twin.battery_models.aging.bolun import BolunModel
+from src.utils.running_stats import RunningMean
+
+
+def soc_trace(n_days: int, dt: float, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(0., n_days * 86400., dt) / 86400.
+    depth = 0.3 + 0.2 * np.sin(2 * np.pi * t / 7.)
+    soc = 0.55 + depth * np.sin(2 * np.pi * t) + 0.1 * np.sin(2 * np.pi * 5 * t) + rng.normal(0., 2e-4, len(t))
+    soc[(t % 1) > 0.9] = 0.55
+    temp = 298.15 + 5 * np.sin(2 * np.pi * t) + rng.normal(0., 0.5, len(t))
+    return np.clip(soc, 0., 1.).tolist(), temp.tolist()
+
+
+def run(mode: str, config: dict, soc: list, temp: list, check_every: int):
+    config['components']['cycle_counting_mode'] = mode
+    model = BolunModel(components_settings=config['components'], stress_models=config['stress_models'],
+                       init_soc=soc[0])
+    model.init_model()
+
+    # Histories and their means grow as in the simulation, without copying them at each call
+    soc_history, temp_history = [soc[0]], [temp[0]]
+    soc_mean, temp_mean = RunningMean(), RunningMean()
+    soc_mean.update(soc[0])
+    temp_mean.update(temp[0])
+    every = 1 if mode == 'streamflow' else check_every
+
+    # Only the time spent by the aging model is measured
+    elapsed = 0.
+    for k in range(1, len(soc)):
+        soc_history.append(soc[k])
+        temp_history.append(temp[k])
+        soc_mean.update(soc[k])
+        temp_mean.update(temp[k])
+        if k % every == 0 or k == len(soc) - 1:
+            start = time.perf_counter()
+            model.compute_degradation(soc_history=soc_history, temp_history=temp_history, elapsed_time=k, k=k,
+                                      avg_soc=soc_mean.mean, avg_temp=temp_mean.mean)
+            elapsed += time.perf_counter() - start
+
+    return elapsed, model.get_f_cyc_series(k=-1), model.get_deg_series(k=-1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=30, help="Simulated days.")
+    parser.add_argument('--dt', type=float, default=60., help="Sampling time of the trace [s].")
+    parser.add_argument('--check_every', type=int, default=3600, help="Steps between aging checks.")
+    parser.add_argument('--modes', nargs='+', default=['streamflow', 'rainflow', 'fastflow'])
+    parser.add_argument('--config', default='data/config/models/aging/bolun.yaml')
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    soc, temp = soc_trace(n_days=args.days, dt=args.dt)
+    print("Trace of {} samples ({} days, dt={}s), aging checked every {} steps\n"
+          .format(len(soc), args.days, args.dt, args.check_every))
+
+    results = {mode: run(mode, config, soc, temp, args.check_every) for mode in args.modes}
+    reference = results['rainflow'][1] if 'rainflow' in results else None
+
+    print("{:<12}{:>12}{:>16}{:>16}{:>14}".format('mode', 'time [s]', 'us / sample', 'cyclic aging', 'vs rainflow'))
+    for mode, (elapsed, f_cyc, deg) in results.items():
+        deviation = '{:+.3%}'.format((f_cyc - reference) / reference) if reference else '-'
+        print("{:<12}{:>12.3f}{:>16.2f}{:>16.4e}{:>14}".format(mode, elapsed, 1e6 * elapsed / len(soc), f_cyc,
+                                                               deviation))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark of the throughput of the DataWriter against the previous design, where the writer threads polled the
+size of unbounded queues every 0.1 s and pulled the rows one at a time.
+
+The same stream of rows (a ground row and a simulated row for each step) is written by:
+    - polling: the previous queue-based writer, reproduced below;
+    - rows: the current writer, fed row by row;
+    - chunks: the current writer, fed with the simulated rows already arranged in columns (as done by the recorder).
+
+For each writer, the time spent by the producer in the calls to the writer, the total time until all the data are
+written and the maximum number of rows pending in memory are reported.
+
+Usage (from the root of the repository):
+    python benchmarks/data_writer.py --steps 200000
+"""
+import argparse
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.digital_twin.orchestrator.writer import DataWriter
+
+SIM_VARIABLES = ['time', 'soc', 'soh', 'c_max', 'voltage', 'current', 'power', 'v_oc', 'r0', 'r1', 'c', 'v_r0',
+                 'v_rc', 'temperature', 'heat']
+GROUND_VARIABLES = ['time', 'current', 'voltage', 'temperature', 'power']
+
+
+class PollingDataWriter:
+    """
+    Previous design of the writer: unbounded queues of rows, polled by the writer threads.
+    """
+    def __init__(self, output_folder: Path):
+        self._output_folder = output_folder
+        self._ground_queue = queue.Queue()
+        self._sim_queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._save_output_every = 10000
+        self._threads = [threading.Thread(target=self._run_writer, args=(self._ground_queue, 'ground_0.csv')),
+                         threading.Thread(target=self._run_writer, args=(self._sim_queue, 'dataset_0.csv'))]
+        for thread in self._threads:
+            thread.start()
+
+    def _run_writer(self, _queue, filename):
+        while not self._stop_event.is_set():
+            if _queue.qsize() < self._save_output_every:
+                time.sleep(0.1)
+                continue
+            self._write([_queue.get() for _ in range(self._save_output_every)], filename)
+
+        data = [_queue.get() for _ in range(_queue.qsize())]
+        if data:
+            self._write(data, filename)
+
+    def _write(self, data, filename):
+        pd.DataFrame.from_records(data).to_csv(self._output_folder / filename, mode='a', index=False,
+                                               header=not (self._output_folder / filename).exists())
+
+    def add_ground_data(self, data):
+        self._ground_queue.put(data)
+
+    def add_simulated_data(self, data):
+        self._sim_queue.put(data)
+
+    def pending(self):
+        return self._ground_queue.qsize() + self._sim_queue.qsize()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def close(self):
+        for thread in self._threads:
+            thread.join()
+
+
+def pending_rows(writer):
+    if isinstance(writer, PollingDataWriter):
+        return writer.pending()
+    return (len(writer._ground_buffer) + len(writer._sim_buffer)) * writer.save_output_every
+
+
+def run(mode: str, n_steps: int, folder: Path):
+    rng = np.random.default_rng(0)
+    sim_values = rng.normal(size=(n_steps, len(SIM_VARIABLES)))
+    ground_values = rng.normal(size=(n_steps, len(GROUND_VARIABLES)))
+
+    writer = PollingDataWriter(output_folder=folder) if mode == 'polling' else DataWriter(output_folder=folder)
+    chunk_size = writer._save_output_every
+
+    start = time.perf_counter()
+    producer, peak = 0., 0
+    for k in range(n_steps):
+        ground_row = dict(zip(GROUND_VARIABLES, ground_values[k].tolist()))
+        sim_row = dict(zip(SIM_VARIABLES, sim_values[k].tolist())) if mode != 'chunks' else None
+
+        call = time.perf_counter()
+        writer.add_ground_data(ground_row)
+        if mode != 'chunks':
+            writer.add_simulated_data(sim_row)
+        elif (k + 1) % chunk_size == 0 or k == n_steps - 1:
+            rows = slice(k - k % chunk_size, k + 1)
+            writer.add_simulated_chunk({name: sim_values[rows, j] for j, name in enumerate(SIM_VARIABLES)})
+        producer += time.perf_counter() - call
+
+        if k % 1000 == 0:
+            peak = max(peak, pending_rows(writer))
+
+    writer.stop()
+    writer.close()
+    total = time.perf_counter() - start
+
+    n_written = len(pd.read_csv(folder / 'dataset_0.csv')) + len(pd.read_csv(folder / 'ground_0.csv'))
+    assert n_written == 2 * n_steps, "The {} writer lost some rows.".format(mode)
+    return producer, total, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--steps', type=int, default=200000, help="Simulated steps written.")
+    parser.add_argument('--modes', nargs='+', default=['polling', 'rows', 'chunks'])
+    args = parser.parse_args()
+
+    print("Writing {} steps ({} simulated and {} ground variables)\n"
+          .format(args.steps, len(SIM_VARIABLES), len(GROUND_VARIABLES)))
+    print("{:<10}{:>16}{:>14}{:>16}{:>16}".format('writer', 'producer [s]', 'total [s]', 'steps / s', 'peak pending'))
+
+    for mode in args.modes:
+        folder = Path(tempfile.mkdtemp())
+        try:
+            producer, total, peak = run(mode, args.steps, folder)
+        finally:
+            shutil.rmtree(folder)
+        print("{:<10}{:>16.3f}{:>14.3f}{:>16.0f}{:>16}".format(mode, producer, total, args.steps / total, peak))
+
+
+if __name__ == '__main__':
+    main()
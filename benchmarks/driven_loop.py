@@ -0,0 +1,156 @@
+"""
+Benchmark of the per-step overhead of the main loop of the DrivenSimulator against the previous design, where the
+loader yielded a dictionary for each sample and the simulator computed the delta of time and handed the ground data
+to the writer sample by sample.
+
+The same synthetic profile (current and temperature sampled every second, with some gaps) is simulated by:
+    - rows: the previous loop over the samples as dictionaries, reproduced below;
+    - columns: the current loop over chunks of samples arranged in columns.
+
+Each loop is timed both with the battery step replaced by a no-op, which isolates the overhead of the loop itself,
+and with the actual battery models. Most of the overhead left with the no-op battery is the recording of the status of
+the battery at each step, which is shared by the two loops.
+
+Usage (from the root of the repository):
+    python benchmarks/driven_loop.py --steps 100000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.digital_twin.orchestrator import DrivenLoader, DataWriter
+from src.digital_twin.orchestrator.simulation import DrivenSimulator
+from tests.unit.helpers import battery_models_config, driven_sim_config
+
+
+def write_profile(folder: Path, n_steps: int):
+    rng = np.random.default_rng(0)
+    seconds = np.arange(n_steps)
+    seconds[n_steps // 2:] += 7200
+    pd.DataFrame({'Time': seconds, 'I': rng.normal(0., 2., n_steps), 'T': 25. + rng.normal(0., 0.1, n_steps)}) \
+        .to_csv(folder / 'ground.csv', index=False)
+
+    return {'input': {'ground_data': {'file': folder / 'ground.csv', 'load': 'current', 'time_format': 'seconds',
+                                      'cache': False,
+                                      'vars': [{'var': 'current', 'label': 'I', 'unit': 'A'},
+                                               {'var': 'temperature', 'label': 'T', 'unit': 'degC'}]}},
+            'iterations': None, 'timestep': None}
+
+
+def rows_loop(sim, pbar):
+    """
+    Previous main loop of DrivenSimulator.solve(), with the samples as dictionaries.
+    """
+    loader, battery, recorder, writer = sim._loader, sim._battery, sim._recorder, sim._writer
+
+    def step(sample, k, dt):
+        if loader.timestep is None and dt > sim._get_rest_after:
+            battery.load_var = 'current'
+            battery.step(load=0, dt=dt - 1, k=k)
+            battery.load_var = loader.input_var
+            sim._elapsed_time += (dt - 1)
+            battery.t_series.append(sim._elapsed_time)
+            dt = 1
+            k += 1
+            recorder.record()
+
+        ground_temp = sample['temperature'] if 'temperature' in sample else None
+        battery.step(load=sample[loader.input_var], dt=dt, k=k, ground_temp=ground_temp)
+        sim._elapsed_time += dt
+        battery.t_series.append(sim._elapsed_time)
+        k += 1
+        if recorder.record():
+            writer.add_ground_data(sample)
+        return k, dt
+
+    k = 0
+    dt = loader.timestep if loader.timestep is not None else 1
+    inputs = loader.collection()
+    sample = next(inputs)
+    while True:
+        if dt != 0:
+            k, dt = step(sample, k, dt)
+            pbar.update(dt)
+        if sim._elapsed_time < loader.duration:
+            prev_time = sample['time']
+            sample = next(inputs)
+            dt = round(sample['time'] - prev_time, 2)
+        else:
+            break
+
+
+def columns_loop(sim, pbar):
+    """
+    Current main loop of DrivenSimulator.solve().
+    """
+    k, prev_time = 0, None
+    for columns in sim._loader.iter_columns(chunk_size=sim._writer.save_output_every):
+        k, prev_time, done = sim._simulate_samples(columns, k=k, prev_time=prev_time, pbar=pbar,
+                                                   duration=sim._loader.duration)
+        if done:
+            break
+
+
+def run(loop, config: dict, folder: Path, noop: bool):
+    writer = DataWriter(output_folder=folder / loop.__name__)
+    sim = DrivenSimulator(model_config=battery_models_config(), sim_config=driven_sim_config(),
+                          data_loader=DrivenLoader(config), data_writer=writer)
+    sim._battery.reset()
+    sim._battery.init()
+    sim._battery.load_var = sim._loader.input_var
+    if noop:
+        sim._battery.step = lambda load, dt, k, ground_temp=None: None
+    sim._recorder = sim._battery.build_status_recorder(on_chunk=writer.add_simulated_chunk,
+                                                       chunk_size=writer.save_output_every)
+    sim._recorder.record()
+
+    with open(os.devnull, 'w') as devnull:
+        pbar = tqdm(total=int(sim._loader.duration), file=devnull)
+        start = time.perf_counter()
+        loop(sim, pbar)
+        sim._recorder.flush()
+        elapsed = time.perf_counter() - start
+        pbar.close()
+
+    writer.stop()
+    writer.close()
+    n_ground = len(pd.read_csv(folder / loop.__name__ / 'ground_0.csv'))
+    shutil.rmtree(folder / loop.__name__)
+    return elapsed, n_ground
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--steps', type=int, default=100000, help="Samples of the driven profile.")
+    args = parser.parse_args()
+
+    folder = Path(tempfile.mkdtemp())
+    try:
+        config = write_profile(folder, args.steps)
+        print("Simulating {} samples\n".format(args.steps))
+        print("{:<10}{:<10}{:>12}{:>16}".format('loop', 'battery', 'total [s]', 'per step [us]'))
+
+        for noop in [True, False]:
+            n_ground = set()
+            for loop in [rows_loop, columns_loop]:
+                elapsed, n = run(loop, config, folder, noop=noop)
+                n_ground.add(n)
+                print("{:<10}{:<10}{:>12.3f}{:>16.2f}".format(loop.__name__.split('_')[0],
+                                                              'no-op' if noop else 'models',
+                                                              elapsed, elapsed / args.steps * 1e6))
+            assert len(n_ground) == 1, "The loops saved different ground data."
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
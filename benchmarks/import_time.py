@@ -0,0 +1,79 @@
+"""
+Benchmark of the startup time of the simulator, i.e. the time spent importing its modules before any simulation step.
+
+Each case is run in a fresh interpreter, so that nothing is already in the module cache:
+    - cli: parsing of the arguments of ernesto.py (e.g. --help), which does not need the simulator at all;
+    - orchestrator: import of the DTOrchestrator, as done by ernesto.py before running an experiment;
+    - physics: import of the DTOrchestrator and instantiation of a battery with physics-based models;
+    - all models: import of the DTOrchestrator and of every model module, as done before the models were
+      resolved lazily by their class name.
+
+For each case, the median wall time over the repetitions and the heavy dependencies that end up imported are reported.
+A physics-only battery is not expected to import torch.
+
+Usage (from the root of the repository):
+    python benchmarks/import_time.py --repeat 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+HEAVY_MODULES = ['torch', 'joblib', 'scipy', 'pandas', 'pint', 'pyarrow']
+
+PHYSICS_BATTERY = """
+from src.digital_twin.bess import BatteryEnergyStorageSystem
+from tests.unit.helpers import battery_models_config, battery_options
+BatteryEnergyStorageSystem(models_config=battery_models_config(), battery_options=battery_options())
+"""
+
+CASES = {
+    'cli': ['ernesto.py', '--help'],
+    'orchestrator': ['-c', 'import src.digital_twin.orchestrator.orchestrator'],
+    'physics': ['-c', 'import src.digital_twin.orchestrator.orchestrator\n' + PHYSICS_BATTERY],
+    'all models': ['-c', 'import src.digital_twin.orchestrator.orchestrator\n'
+                         'from src.digital_twin.battery_models import MODELS, get_model_class\n'
+                         '[get_model_class(name) for name in MODELS]'],
+}
+
+# Appended to the code of each case to report the heavy modules that have been imported
+REPORT = "import sys; print(','.join(m for m in {} if m in sys.modules), file=sys.stderr)".format(HEAVY_MODULES)
+
+
+def run_case(args: list, repeat: int):
+    if args[0] == '-c':
+        args = ['-c', args[1] + '\n' + REPORT]
+    else:
+        # Scripts are wrapped to report their imports even if they exit (e.g. after printing the help)
+        args = ['-c', "import atexit, runpy, sys; atexit.register(lambda: exec({!r})); sys.argv = {!r}; "
+                      "runpy.run_path({!r}, run_name='__main__')".format(REPORT, args, args[0])]
+
+    times, loaded = [], ''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable] + args, cwd=ROOT, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE, text=True)
+        times.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr)
+        loaded = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else ''
+
+    return sorted(times)[len(times) // 2], loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters started for each case.")
+    args = parser.parse_args()
+
+    print("Median over {} runs\n".format(args.repeat))
+    print("{:<14}{:>10}   {}".format('case', 'time [s]', 'heavy modules imported'))
+    for name, case_args in CASES.items():
+        elapsed, loaded = run_case(case_args, args.repeat)
+        print("{:<14}{:>10.3f}   {}".format(name, elapsed, loaded.replace(',', ', ') or '-'))
+
+
+if __name__ == '__main__':
+    main()
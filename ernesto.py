@@ -1,9 +1,7 @@
 import argparse
 import logging
 import sys
-from joblib import Parallel, delayed
 from src.utils.logger import CustomFormatter
-from src.digital_twin.orchestrator.orchestrator import DTOrchestrator
 
 
 def get_args():
@@ -55,7 +53,8 @@ def get_args():
         main_parser.add_argument("--assets", action="store", default="./data/config/assets.yaml",
                                  type=str, help="Specifies the file containing parameters useful for the experiment.")
 
-        electrical_choices = ['first_order_thevenin', 'second_order_thevenin']
+        electrical_choices = ['first_order_thevenin', 'second_order_thevenin',
+                              'batched_first_order_thevenin', 'batched_second_order_thevenin']
         main_parser.add_argument("--battery_model", nargs=1, choices=electrical_choices, default=['first_order_thevenin'],
                                  help="Specifies the name of the core model of the battery, electrical or data driven.")
 
@@ -137,6 +136,8 @@ if __name__ == '__main__':
         del args['aging_model']
 
     def run_experiment(args, config_file):
+        # The simulator is imported after the parsing of the arguments, so that the CLI starts up quickly
+        from src.digital_twin.orchestrator.orchestrator import DTOrchestrator
         args['config'] = config_file
         orchestrator = DTOrchestrator(**args)
         orchestrator.run()
@@ -152,6 +153,7 @@ if __name__ == '__main__':
         if n_cores == 1:
             run_experiment(args, parallel_exp_config[0])
         else:
+            from joblib import Parallel, delayed
             Parallel(n_jobs=n_cores)(delayed(run_experiment)(args, config) for config in parallel_exp_config)
 
     except Exception as e:
@@ -1,4 +1,36 @@
-from .electrical import FirstOrderThevenin, SecondOrderThevenin
-from .thermal import DummyThermal, RCThermal, R2CThermal, MLPThermal
-from .aging import BolunModel
-from .soc_model import SOCEstimator
+import importlib
+
+# Modules defining the models that can be instantiated by 'class_name'. They are imported only when a model is
+# requested, so that a simulation does not pay for the dependencies of the models it does not use (e.g. torch).
+MODELS = {
+    'FirstOrderThevenin': '.electrical.ecm',
+    'SecondOrderThevenin': '.electrical.ecm',
+    'BatchedFirstOrderThevenin': '.electrical.batched_ecm',
+    'BatchedSecondOrderThevenin': '.electrical.batched_ecm',
+    'DummyThermal': '.thermal.dummy',
+    'RCThermal': '.thermal.rc',
+    'R2CThermal': '.thermal.r2c',
+    'MLPThermal': '.thermal.mlp_network',
+    'BolunModel': '.aging.bolun',
+    'SOCEstimator': '.soc_model',
+}
+
+__all__ = list(MODELS)
+
+
+def get_model_class(class_name: str):
+    """
+    Get the class of a model from its name, importing the module where it is defined.
+
+    Args:
+        class_name (str): name of the model class, as annotated in the model yaml file
+    """
+    if class_name not in MODELS:
+        raise Exception("The model '{}' does not exist! Available models are {}.".format(class_name, list(MODELS)))
+    return getattr(importlib.import_module(MODELS[class_name], __name__), class_name)
+
+
+def __getattr__(name: str):
+    if name in MODELS:
+        return get_model_class(name)
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
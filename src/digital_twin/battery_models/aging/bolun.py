@@ -1,6 +1,7 @@
 import numpy as np
-import rainflow
+from collections import deque
 from enum import Enum
+from functools import partial
 
 from src.digital_twin.battery_models.generic_models import AgingModel
 from src.digital_twin.battery_models.aging import stress_functions
@@ -10,6 +11,16 @@ class BolunModel(AgingModel):
     """
     Bolun model (https://www.researchgate.net/publication/303890624_Modeling_of_Lithium-Ion_Battery_Degradation_for_Cell_Life_Assessment)
     """
+    # Argument of the stress function of each factor and the simulation variable passed to it
+    _calendar_variables = {'time': ('t', 'time'),
+                           'temperature': ('mean_temp', 'temp'),
+                           'soc': ('soc', 'soc')}
+    _cyclic_variables = {'dod_bolun': ('dod', 'dod'),
+                         'dod_quadratic': ('dod', 'dod'),
+                         'dod_exponential': ('dod', 'dod'),
+                         'temperature': ('mean_temp', 'temp'),
+                         'soc': ('soc', 'soc')}
+
     def __init__(self,
                  components_settings: dict,
                  stress_models: dict,
@@ -37,9 +48,25 @@ class BolunModel(AgingModel):
         # Stress models constants
         self._stress_models_params = stress_models
 
+        # Stress functions of the factors with their constants bound once
+        self._calendar_stress = self._compile_stress_factors(self._calendar_factors, self._calendar_variables,
+                                                             aging_type='calendar')
+        self._cyclic_stress = self._compile_stress_factors(self._cyclic_factors, self._cyclic_variables,
+                                                           aging_type='cyclic')
+
         # Fatigue analysis method
         self._cycle_counting_mode = components_settings['cycle_counting_mode']
 
+        if self._cycle_counting_mode == 'rainflow':
+            self._cycle_counter = self.IncrementalRainflow()
+
+        if self._cycle_counting_mode == 'fastflow':
+            fastflow_settings = components_settings['fastflow'] if 'fastflow' in components_settings.keys() else {}
+            self._cycle_counter = self.Fastflow(**fastflow_settings)
+
+        # Aging caused by the cycles already closed by the cycle counter
+        self._f_cyc_closed = 0
+
         if self._cycle_counting_mode == 'streamflow':
             self._streamflow = self.Streamflow(init_soc=init_soc)
 
@@ -71,6 +98,12 @@ class BolunModel(AgingModel):
                 raise IndexError("Cyclic aging at step K not computed yet")
         return self._f_cyc_series
 
+    def get_cyclic_damage(self):
+        return self._f_cyc_series[-1]
+
+    def add_cyclic_damage(self, value: float):
+        self._f_cyc_closed += value
+
     def _update_f_cal_series(self, value: float):
         self._f_cal_series.append(value)
 
@@ -83,23 +116,34 @@ class BolunModel(AgingModel):
         self._update_f_cal_series(0)
         self._k_iters.append(0)
 
-    def compute_degradation(self, soc_history, temp_history, elapsed_time, k):
+    def compute_degradation(self, soc_history, temp_history, elapsed_time, k, avg_soc=None, avg_temp=None):
         """
         Compute the aging of the battery
 
         Inputs:
-        :param f_d:
+        :param soc_history: soc of the battery since the start of the simulation
+        :param temp_history: temperature of the battery since the start of the simulation
+        :param elapsed_time: time elapsed from the start of the simulation
+        :param k: current iteration of the simulation
+        :param avg_soc: mean of soc_history, if kept by the caller (computed from soc_history otherwise)
+        :param avg_temp: mean of temp_history, if kept by the caller (computed from temp_history otherwise)
         """
         f_d = 0
 
+        if avg_soc is None:
+            avg_soc = np.mean(soc_history)
+        if avg_temp is None:
+            avg_temp = np.mean(temp_history)
+
         if self._cycle_counting_mode == 'rainflow':
-            f_d = self._aging_period(soc_history, temp_history, elapsed_time)
+            f_d = self._aging_period(soc_history, temp_history, elapsed_time, avg_soc=avg_soc, avg_temp=avg_temp)
 
         elif self._cycle_counting_mode == 'streamflow':
-            f_d = self._aging_step(soc_history=soc_history, temp_history=temp_history, t=elapsed_time)
+            f_d = self._aging_step(soc_history=soc_history, temp_history=temp_history, t=elapsed_time,
+                                   avg_soc=avg_soc, avg_temp=avg_temp)
 
         elif self._cycle_counting_mode == 'fastflow':
-            ...
+            f_d = self._aging_period(soc_history, temp_history, elapsed_time, avg_soc=avg_soc, avg_temp=avg_temp)
 
         else:
             raise ValueError("The provided cycle counting method {} is not implemented or not existent"
@@ -112,6 +156,49 @@ class BolunModel(AgingModel):
         self._k_iters.append(k)
         return deg
 
+    def __getstate__(self):
+        # The compiled stress functions are closures, which cannot be pickled (e.g. to move the model to the
+        # process of an AgingWorker): they are compiled again when the model is unpickled
+        state = self.__dict__.copy()
+        del state['_calendar_stress'], state['_cyclic_stress']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._calendar_stress = self._compile_stress_factors(self._calendar_factors, self._calendar_variables,
+                                                             aging_type='calendar')
+        self._cyclic_stress = self._compile_stress_factors(self._cyclic_factors, self._cyclic_variables,
+                                                           aging_type='cyclic')
+
+    def _compile_stress_factors(self, factors: dict, variables: dict, aging_type: str):
+        """
+        Bind the constants of the stress function of each factor, returning a callable that computes the product of
+        all the stress factors. The callable is vectorized: simulation variables can be arrays (e.g. one value for
+        each cycle), as long as the stress functions are written with numpy operations.
+
+        Args:
+            factors (dict): stress factors to consider, with their constants
+            variables (dict): argument of the stress function of each factor and the simulation variable passed to it
+            aging_type (str): 'calendar' or 'cyclic', used for error messages
+        """
+        stress_terms = []
+        for factor in factors.keys():
+            if factor not in variables:
+                raise KeyError("Stress factor {} shouldn't be used for computing {} aging in Bolun model"
+                               .format(factor, aging_type))
+
+            stress_func = partial(getattr(stress_functions, factor + '_stress'), **self._stress_models_params[factor])
+            stress_terms.append((stress_func, *variables[factor]))
+
+        def compute_stress(initial_value=1, **sim_variables):
+            # Product of all aging factors
+            value = initial_value
+            for func, argument, variable in stress_terms:
+                value = value * func(**{argument: sim_variables[variable]})
+            return value
+
+        return compute_stress
+
     def _compute_calendar_aging(self, curr_time, avg_temp, avg_soc):
         """
         Compute the calendar aging of the battery from the start of the simulation.
@@ -121,46 +208,22 @@ class BolunModel(AgingModel):
         :param avg_temp:
         :param avg_soc:
         """
-        cal_aging = 1
+        return self._calendar_stress(time=curr_time, temp=avg_temp, soc=avg_soc)
 
-        # For each defined stress model we get the stress function with relative parameters
-        for factor in self._calendar_factors.keys():
-            stress_func = getattr(stress_functions, factor + '_stress')
-            sim_variables = {}
-
-            if factor == 'time':
-                sim_variables['t'] = curr_time
-
-            elif factor == 'temperature':
-                sim_variables['mean_temp'] = avg_temp
-
-            elif factor == 'soc':
-                sim_variables['soc'] = avg_soc
-
-            else:
-                raise KeyError("Stress factor {} shouldn't be used for computing calendar aging in Bolun model"
-                               .format(factor))
-
-            # Product of all calendar aging factors within the loop
-            stress_value = stress_func(**self._stress_models_params[factor], **sim_variables)
-            cal_aging = cal_aging * stress_value
-
-        return cal_aging
-
-    def _aging_step(self, soc_history, temp_history, t):
+    def _aging_step(self, soc_history, temp_history, t, avg_soc, avg_temp):
         """
         Compute the battery aging due to a single step of simulation with Streamflow method.
 
         Args:
-            soc ():
-            temp ():
+            soc_history ():
+            temp_history ():
             t ():
+            avg_soc (float): mean soc since the start of the simulation
+            avg_temp (float): mean temperature since the start of the simulation
 
         Returns: the sum of both cyclic and calendar aging  for the given period
         """
-        f_cal = self._compute_calendar_aging(curr_time=t,
-                                             avg_soc=np.mean(soc_history),
-                                             avg_temp=np.mean(temp_history))
+        f_cal = self._compute_calendar_aging(curr_time=t, avg_soc=avg_soc, avg_temp=avg_temp)
         self._update_f_cal_series(f_cal)
 
         is_charging = soc_history[-1] > soc_history[-2]
@@ -169,78 +232,83 @@ class BolunModel(AgingModel):
         else:
             expected_end = 0.5 * soc_history[-1]
 
-        if len(soc_history) % self._streamflow._reset_every == 0:
-            self._streamflow = self.Streamflow(init_soc=soc_history[-1])
-
-        soc_means, ranges, n_samples_arr, is_valid, _, start_indexes, temp_means, to_invalid = \
+        # Cycles closed by the new sample are accumulated, whereas the open ones are recomputed every time
+        closed_soc_means, closed_ranges, closed_temp_means = \
             self._streamflow.step(actual_value=soc_history[-1],
                                   expected_end=expected_end,
                                   second_signal_value=temp_history[-1])
+        self._f_cyc_closed += self._sum_half_cycles_aging(closed_soc_means, closed_ranges, closed_temp_means)
 
-        ranges[ranges == 0] += 1e-6
-        cycle_types = 0.5
-        valid_n_cycles = len(soc_means[is_valid])
+        soc_means, ranges, temp_means = self._streamflow.get_open_cycles()
+        f_cyc = self._f_cyc_closed + self._sum_half_cycles_aging(soc_means, ranges, temp_means)
+        self._update_f_cyc_series(f_cyc)
 
-        valid_temp_means = temp_means[is_valid]
-        valid_f_cyc_arr = self._compute_cyclic_aging(cycle_type=cycle_types,
-                                                     cycle_dod=ranges[is_valid],
-                                                     avg_cycle_soc=soc_means[is_valid],
-                                                     avg_cycle_temp=valid_temp_means)
-        f_cyc = np.sum(valid_f_cyc_arr)
+        return f_cal + f_cyc
 
-        self._update_f_cyc_series(f_cyc)
+    def _sum_half_cycles_aging(self, soc_means, ranges, temp_means):
+        """
+        Compute the total cyclic aging of the half cycles identified by Streamflow.
+        """
+        if len(ranges) == 0:
+            return 0
 
-        if len(to_invalid) != 0:
-            invalid_soc_means = soc_means[to_invalid]
-            invalid_ranges = ranges[to_invalid]
-            invalid_sample_arr = n_samples_arr[to_invalid]
-            invalid_start_indexes = start_indexes[to_invalid]
-            invalid_n_cycles = len(invalid_soc_means)
-            invalid_temp_means = temp_means[to_invalid]
-            f_cyc_invalid = np.sum(
-                self._compute_cyclic_aging(cycle_type=cycle_types,
-                                           cycle_dod=invalid_ranges,
-                                           avg_cycle_soc=invalid_soc_means,
-                                           avg_cycle_temp=invalid_temp_means))
-            self._streamflow._stream_f_cyc_past += f_cyc_invalid
-
-        return f_cal + f_cyc + self._streamflow._stream_f_cyc_past
-
-    def _aging_period(self, soc_history, temp_history, elapsed_time):
+        return np.sum(self._compute_cyclic_aging(cycle_type=0.5,
+                                                 cycle_dod=np.where(ranges == 0, 1e-6, ranges),
+                                                 avg_cycle_soc=soc_means,
+                                                 avg_cycle_temp=temp_means))
+
+    def _aging_period(self, soc_history, temp_history, elapsed_time, avg_soc, avg_temp):
         """
-        Compute the battery aging due a longer usage period with Rainflow algorithm.
+        Compute the battery aging due a longer usage period with Rainflow algorithm (or its Fastflow approximation).
 
         Args:
             soc_history (list):
             temp_history (list):
             elapsed_time (list):
+            avg_soc (float): mean soc since the start of the simulation
+            avg_temp (float): mean temperature since the start of the simulation
 
         Returns: the sum of both cyclic and calendar aging  for the given period
         """
         # Compute the calendar aging
-        f_cal = self._compute_calendar_aging(curr_time=elapsed_time,
-                                             avg_soc=np.mean(soc_history),
-                                             avg_temp=np.mean(temp_history))
+        f_cal = self._compute_calendar_aging(curr_time=elapsed_time, avg_soc=avg_soc, avg_temp=avg_temp)
         self._update_f_cal_series(f_cal)
 
-        # Compute the cyclic aging through rainflow algorithm
-        f_cyc = 0
-        extracted_cycles = rainflow.extract_cycles(soc_history)
+        # Compute the cyclic aging through rainflow algorithm, processing only the samples added since the last call.
+        # Cycles closed in the meanwhile are accumulated, whereas the residual ones are recomputed every time.
+        if len(soc_history) <= self._cycle_counter.n_processed:
+            self._cycle_counter.reset()
+            self._f_cyc_closed = 0
+        closed_cycles, residual_cycles = self._cycle_counter.update(soc_history=soc_history,
+                                                                    temp_history=temp_history)
 
-        # With Rainflow we retrieve tuples of (range, mean, count, i_start, i_end) associated to each cycle
-        for rng, mean, count, i_start, i_end in extracted_cycles:
-            f_cyc += self._compute_cyclic_aging(cycle_type=count,
-                                                cycle_dod=rng,
-                                                avg_cycle_soc=np.mean(soc_history[i_start:i_end]),
-                                                avg_cycle_temp=np.mean(temp_history[i_start:i_end]))
+        self._f_cyc_closed += self._sum_cyclic_aging(closed_cycles)
+        f_cyc = self._f_cyc_closed + self._sum_cyclic_aging(residual_cycles)
         self._update_f_cyc_series(f_cyc)
 
         return f_cal + f_cyc
 
+    def _sum_cyclic_aging(self, cycles: list):
+        """
+        Compute the total cyclic aging of a list of cycles at once.
+
+        Inputs:
+        :param cycles: tuples of (range, count, mean soc, mean temperature) associated to each cycle
+        """
+        if len(cycles) == 0:
+            return 0
+
+        ranges, counts, soc_means, temp_means = np.array(cycles, dtype=float).T
+        return np.sum(self._compute_cyclic_aging(cycle_type=counts,
+                                                 cycle_dod=ranges,
+                                                 avg_cycle_soc=soc_means,
+                                                 avg_cycle_temp=temp_means))
+
     def _compute_cyclic_aging(self, cycle_type, cycle_dod, avg_cycle_temp, avg_cycle_soc):
         """
         Compute the cyclic aging of the battery.
-        The parameters in input belong to a single cycle identify by means of the Rainflow algorithm.
+        The parameters in input belong to the cycles identified by means of the Rainflow algorithm: they can be either
+        scalars (a single cycle) or arrays (one value for each cycle).
 
         Inputs:
         :param cycle_type: value that can be 0.5 or 1.0 and  tells if a cycle is a half or a full cycle
@@ -248,37 +316,7 @@ class BolunModel(AgingModel):
         :param avg_cycle_temp:
         :param avg_cycle_soc:
         """
-        cyclic_aging = cycle_type
-
-        # For each defined stress model we get the stress function with relative parameters
-        for factor in self._cyclic_factors.keys():
-            stress_func = getattr(stress_functions, factor + '_stress')
-            sim_variables = {}
-
-            if factor == 'dod_bolun':
-                sim_variables['dod'] = cycle_dod
-
-            elif factor == 'dod_quadratic':
-                sim_variables['dod'] = cycle_dod
-
-            elif factor == 'dod_exponential':
-                sim_variables['dod'] = cycle_dod
-
-            elif factor == 'temperature':
-                sim_variables['mean_temp'] = avg_cycle_temp
-
-            elif factor == 'soc':
-                sim_variables['soc'] = avg_cycle_soc
-
-            else:
-                raise KeyError("Stress factor {} shouldn't be used for computing calendar aging in Bolun model"
-                               .format(factor))
-
-            # Product of all cyclic aging factors within the loop
-            stress_value = stress_func(**self._stress_models_params[factor], **sim_variables)
-            cyclic_aging = cyclic_aging * stress_value
-
-        return cyclic_aging
+        return self._cyclic_stress(initial_value=cycle_type, dod=cycle_dod, temp=avg_cycle_temp, soc=avg_cycle_soc)
 
     def get_results(self, **kwargs):
         """
@@ -293,10 +331,353 @@ class BolunModel(AgingModel):
                 'degradation': self.get_deg_series(k=k)
                 }
 
+    class IncrementalRainflow:
+        """
+        Incremental implementation of the rainflow cycle counting of the 'rainflow' package (ASTM E1049-85).
+        The reversals detected so far and the residual stack of turning points are kept between calls, so that only
+        the samples added to the history since the last call are processed. Mean soc and temperature of the cycles
+        are derived from running sums stored with each turning point, without slicing the whole history.
+
+        The most recent sample is never consumed, since it can still be overwritten (e.g. by a reset of the SoC):
+        the cycles it contributes to are returned as residual ones and recomputed at each call.
+        """
+        def __init__(self):
+            self.reset()
+
+        def reset(self):
+            # Number of samples of the history already processed
+            self._n = 0
+
+            # State of the reversals detection: last value that differs from the previous one and its derivative
+            self._x = None
+            self._d_last = 0.
+
+            # Stack of the turning points not yet closed in a cycle as (index, value, soc sum, temp sum), where sums
+            # are computed over the samples preceding the index
+            self._points = deque()
+
+            self._soc_sum = 0.
+            self._temp_sum = 0.
+            self._last_soc = None
+            self._last_temp = None
+
+        @property
+        def n_processed(self):
+            return self._n
+
+        def update(self, soc_history, temp_history):
+            """
+            Process the new samples of the history.
+
+            Args:
+                soc_history (list): whole soc history, of which only the samples added since the last call are read
+                temp_history (list): whole temperature history, aligned to soc_history
+
+            Returns: the cycles closed since the last call and the residual ones (i.e. the half cycles left by the
+            rainflow at the end of the history), both as lists of (range, count, mean soc, mean temperature)
+            """
+            n = len(soc_history)
+            assert n > self._n, "The history is shorter than the one already processed by the rainflow counter."
+
+            closed_cycles = []
+            for k, (soc, temp) in enumerate(zip(soc_history[self._n:n - 1], temp_history[self._n:n - 1]),
+                                            start=self._n):
+                self._consume(k, soc, temp, closed_cycles)
+            self._n = max(self._n, n - 1)
+
+            residual_cycles = []
+            if n >= 2:
+                points = deque(self._points)
+
+                # The last sample can still be a reversal for the previous value and closes the history
+                if n >= 3:
+                    last_soc = soc_history[n - 1]
+                    if last_soc != self._x and self._d_last * (last_soc - self._x) < 0:
+                        self._push(points, (n - 2, self._x, self._soc_sum - self._last_soc,
+                                            self._temp_sum - self._last_temp), residual_cycles)
+                    self._push(points, (n - 1, last_soc, self._soc_sum, self._temp_sum), residual_cycles)
+
+                # Count the remaining ranges as half cycles
+                while len(points) > 1:
+                    residual_cycles.append(self._cycle(points[0], points[1], 0.5))
+                    points.popleft()
+
+            return closed_cycles, residual_cycles
+
+        def _consume(self, k, soc, temp, cycles):
+            """
+            Process the k-th sample, detecting whether the previous value was a reversal.
+            """
+            if k == 0:
+                self._points.append((0, soc, 0., 0.))
+            elif k == 1:
+                self._x = soc
+                self._d_last = soc - self._last_soc
+            elif soc != self._x:
+                d_next = soc - self._x
+                if self._d_last * d_next < 0:
+                    self._push(self._points, (k - 1, self._x, self._soc_sum - self._last_soc,
+                                              self._temp_sum - self._last_temp), cycles)
+                self._x = soc
+                self._d_last = d_next
+
+            self._soc_sum += soc
+            self._temp_sum += temp
+            self._last_soc = soc
+            self._last_temp = temp
+
+        def _push(self, points, point, cycles):
+            """
+            Add a reversal to the stack of turning points, extracting the cycles it closes.
+            """
+            points.append(point)
+
+            while len(points) >= 3:
+                # Form ranges X and Y from the three most recent points
+                x_range = abs(points[-1][1] - points[-2][1])
+                y_range = abs(points[-2][1] - points[-3][1])
+
+                if x_range < y_range:
+                    break
+                elif len(points) == 3:
+                    # Y contains the starting point: count it as one-half cycle and discard the first point
+                    cycles.append(self._cycle(points[0], points[1], 0.5))
+                    points.popleft()
+                else:
+                    # Count Y as one cycle and discard the peak and the valley of Y
+                    cycles.append(self._cycle(points[-3], points[-2], 1.0))
+                    last = points.pop()
+                    points.pop()
+                    points.pop()
+                    points.append(last)
+
+        @staticmethod
+        def _cycle(start, end, count):
+            i_start, soc_start, soc_sum_start, temp_sum_start = start
+            i_end, soc_end, soc_sum_end, temp_sum_end = end
+            n_samples = i_end - i_start
+            return (abs(soc_start - soc_end),
+                    count,
+                    (soc_sum_end - soc_sum_start) / n_samples,
+                    (temp_sum_end - temp_sum_start) / n_samples)
+
+    class Fastflow:
+        """
+        Vectorized online implementation of the rainflow cycle counting, meant for long (multi-year) simulations.
+        New samples are processed in chunks with numpy: reversals are detected over the whole chunk and the full
+        cycles they close are extracted by the four-point rule, so that only the few turning points left open go
+        through the stack one at a time.
+
+        Without approximations (the default), the cycles are the same of the rainflow. Optionally:
+            - the soc can be quantized to multiples of a resolution before detecting reversals, so that oscillations
+              smaller than the resolution are ignored and ranges are rounded to the resolution;
+            - at most max_open turning points are kept open: when exceeded, the oldest range is counted as a half cycle.
+        Mean soc and temperature of the cycles are exact. On the noisy daily profiles of benchmarks/cycle_counting.py
+        (30 days, aging checked every 3600 steps), it takes 0.30 us/sample against 0.56 of the incremental rainflow
+        with a sampling time of 60s, and 0.44 against 0.97 with 10s. A resolution of 1e-4 does not make it faster,
+        and underestimates the cyclic aging by 0.7% at 60s and 3.3% at 10s, due to the micro-cycles it drops.
+        """
+        def __init__(self, resolution: float = None, max_open: int = 256):
+            """
+            Args:
+                resolution (float, None): soc quantization step used to detect reversals (no quantization if None)
+                max_open (int, None): maximum number of turning points not yet closed in a cycle (unbounded if None)
+            """
+            assert resolution is None or resolution > 0, "The resolution of fastflow has to be positive."
+            assert max_open is None or max_open >= 2, "Fastflow has to keep at least two open turning points."
+
+            self._resolution = resolution
+            self._max_open = max_open
+            self.reset()
+
+        def reset(self):
+            # Number of samples of the history already processed
+            self._n = 0
+
+            # Last (quantized) level that differs from the previous one, i.e. the candidate reversal, with the index
+            # of its last sample, the sums of soc and temperature preceding it and the sign of its derivative
+            self._x = None
+            self._x_index = None
+            self._x_sums = (0., 0.)
+            self._d_last = 0.
+
+            # Stack of the turning points not yet closed in a cycle as (index, level, soc sum, temp sum)
+            self._points = deque()
+
+            self._soc_sum = 0.
+            self._temp_sum = 0.
+
+        @property
+        def n_processed(self):
+            return self._n
+
+        def _quantize(self, soc):
+            if self._resolution is None:
+                return np.asarray(soc, dtype=float)
+            return np.round(np.asarray(soc, dtype=float) / self._resolution)
+
+        def update(self, soc_history, temp_history):
+            """
+            Process the new samples of the history.
+
+            Args:
+                soc_history (list): whole soc history, of which only the samples added since the last call are read
+                temp_history (list): whole temperature history, aligned to soc_history
+
+            Returns: the cycles closed since the last call and the residual ones, both as lists of
+            (range, count, mean soc, mean temperature)
+            """
+            n = len(soc_history)
+            assert n > self._n, "The history is shorter than the one already processed by the fastflow counter."
+
+            # The most recent sample is never consumed, since it can still be overwritten
+            closed_cycles = []
+            if n - 1 > self._n:
+                self._consume(soc=np.asarray(soc_history[self._n:n - 1], dtype=float),
+                              temp=np.asarray(temp_history[self._n:n - 1], dtype=float),
+                              cycles=closed_cycles)
+                self._n = n - 1
+
+            residual_cycles = []
+            if n >= 3:
+                points = deque(self._points)
+                last = float(self._quantize(soc_history[n - 1]))
+                if last != self._x and self._d_last * (last - self._x) < 0:
+                    self._push(points, (self._x_index, self._x, *self._x_sums), residual_cycles)
+                self._push(points, (n - 1, last, self._soc_sum, self._temp_sum), residual_cycles)
+
+                # Count the remaining ranges as half cycles
+                while len(points) > 1:
+                    residual_cycles.append(self._cycle(points[0], points[1], 0.5))
+                    points.popleft()
+
+            return closed_cycles, residual_cycles
+
+        def _consume(self, soc, temp, cycles):
+            """
+            Process a chunk of consecutive samples, starting from the first one not processed yet.
+            """
+            levels = self._quantize(soc)
+            indices = np.arange(self._n, self._n + len(soc))
+
+            # Sums of the samples preceding each index of the chunk
+            soc_sums = self._soc_sum + np.concatenate(([0.], np.cumsum(soc)))
+            temp_sums = self._temp_sum + np.concatenate(([0.], np.cumsum(temp)))
+            self._soc_sum, self._temp_sum = soc_sums[-1], temp_sums[-1]
+
+            if self._x is None:
+                # The first sample is always a turning point
+                self._points.append((0, levels[0], 0., 0.))
+                self._x, self._x_index, self._x_sums = levels[0], 0, (0., 0.)
+
+            # Prepend the pending candidate and keep only the last sample of each plateau
+            levels = np.concatenate(([self._x], levels))
+            indices = np.concatenate(([self._x_index], indices))
+            soc_sums = np.concatenate(([self._x_sums[0]], soc_sums[:-1]))
+            temp_sums = np.concatenate(([self._x_sums[1]], temp_sums[:-1]))
+
+            keep = np.append(levels[:-1] != levels[1:], True)
+            levels, indices, soc_sums, temp_sums = levels[keep], indices[keep], soc_sums[keep], temp_sums[keep]
+
+            # Reversals are the levels where the sign of the derivative changes
+            signs = np.sign(np.concatenate(([self._d_last], np.diff(levels))))
+            reversals = np.flatnonzero(signs[:-1] * signs[1:] < 0)
+            self._push_reversals(np.array([indices[reversals], levels[reversals], soc_sums[reversals],
+                                           temp_sums[reversals]]), cycles)
+
+            self._x, self._x_index, self._x_sums = levels[-1], int(indices[-1]), (soc_sums[-1], temp_sums[-1])
+            self._d_last = signs[-1]
+
+        def _push_reversals(self, reversals, cycles):
+            """
+            Add the reversals of a chunk to the stack of turning points, extracting the cycles they close.
+
+            The full cycles are extracted with numpy by the four-point rule, which closes the range between two
+            consecutive points if it is smaller than the previous range and not larger than the next one, as the
+            rainflow does: each pass removes all such ranges at once. When a pass closes only few of them (e.g. on
+            nested ranges), the remaining points go through the stack one at a time, which also counts the half
+            cycles at the start of the history.
+
+            Args:
+                reversals (np.ndarray): reversals as rows of index, level, soc sum and temp sum, with shape (4, n)
+            """
+            if len(self._points):
+                reversals = np.concatenate((np.array(self._points, dtype=float).T, reversals), axis=1)
+
+            while reversals.shape[1] >= 4:
+                ranges = np.abs(np.diff(reversals[1]))
+                starts = np.flatnonzero((ranges[:-2] > ranges[1:-1]) & (ranges[1:-1] <= ranges[2:])) + 1
+                if 32 * len(starts) < reversals.shape[1]:
+                    break
+
+                cycles.extend(self._cycles(reversals[:, starts], reversals[:, starts + 1]))
+                keep = np.ones(reversals.shape[1], dtype=bool)
+                keep[starts] = False
+                keep[starts + 1] = False
+                reversals = reversals[:, keep]
+
+            self._points = deque()
+            for point in reversals.T.tolist():
+                self._push(self._points, point, cycles)
+
+        def _push(self, points, point, cycles):
+            """
+            Add a reversal to the stack of turning points, extracting the cycles it closes.
+            """
+            points.append(point)
+
+            while len(points) >= 3:
+                x_range = abs(points[-1][1] - points[-2][1])
+                y_range = abs(points[-2][1] - points[-3][1])
+
+                if x_range < y_range:
+                    break
+                elif len(points) == 3:
+                    cycles.append(self._cycle(points[0], points[1], 0.5))
+                    points.popleft()
+                else:
+                    cycles.append(self._cycle(points[-3], points[-2], 1.0))
+                    last = points.pop()
+                    points.pop()
+                    points.pop()
+                    points.append(last)
+
+            # Bound the memory footprint of the open turning points
+            if self._max_open is not None:
+                while len(points) > self._max_open:
+                    cycles.append(self._cycle(points[0], points[1], 0.5))
+                    points.popleft()
+
+        def _cycle(self, start, end, count):
+            i_start, level_start, soc_sum_start, temp_sum_start = start
+            i_end, level_end, soc_sum_end, temp_sum_end = end
+            n_samples = i_end - i_start
+            rng = abs(level_start - level_end)
+            return (rng * self._resolution if self._resolution is not None else rng,
+                    count,
+                    (soc_sum_end - soc_sum_start) / n_samples,
+                    (temp_sum_end - temp_sum_start) / n_samples)
+
+        def _cycles(self, starts, ends):
+            """
+            Full cycles between arrays of turning points, with shape (4, n), as a list of
+            (range, count, mean soc, mean temperature).
+            """
+            n_samples = ends[0] - starts[0]
+            ranges = np.abs(starts[1] - ends[1])
+            return np.column_stack((ranges * self._resolution if self._resolution is not None else ranges,
+                                    np.ones(len(n_samples)),
+                                    (ends[2] - starts[2]) / n_samples,
+                                    (ends[3] - starts[3]) / n_samples)).tolist()
+
     class Streamflow:
         """
         Implementation of our cycle counting algorithm, that is able to perform in an online manner without considering
         every new sample the whole soc and temperature history. It's inspired to the rainflow cycle counting algorithm.
+
+        Only the open cycles (i.e. the ones that can still be extended by new samples) are kept, within compact arrays,
+        so that the cost of each sample depends on their number only. Cycles are closed when the signal crosses
+        their extreme value: they are removed from the open ones and returned once, to be accumulated by the caller.
         """
         class Direction(Enum):
             UP = 1
@@ -313,36 +694,28 @@ class BolunModel(AgingModel):
                 init_soc (int):
                 subsample (bool):
                 interpolate (str):
-                expected_cycle_num (int): number of fixed initial cycles considered
-                cycle_num_increment (int): amount of cycles used to increment the size of initial arrays
+                expected_cycle_num (int): number of open cycles initially allocated
+                cycle_num_increment (int): amount of cycles used to increment the size of the arrays
             """
-            # K-th cycle of the simulation
+            # Index of the open cycle extended by the last sample and number of open cycles
             self._cycle_k = -1
+            self._n_open = 0
 
-            # Direction can be 1 -> up, 2 -> down
-            self._directions = np.zeros(expected_cycle_num, dtype=self.Direction)
+            # Direction of each open cycle
+            self._directions = np.zeros(expected_cycle_num, dtype=int)
 
             # Signals mean values
             self._mean_values = np.zeros(expected_cycle_num)
             self._second_signal_means = np.zeros(expected_cycle_num)
 
-            # Inferior and superior of cycles and range considered as (max-min)
-            self._min_max_vals = np.zeros((expected_cycle_num, 2))
-            self._range_size = np.zeros(expected_cycle_num)
+            # Inferior and superior of cycles
+            self._min_vals = np.zeros(expected_cycle_num)
+            self._max_vals = np.zeros(expected_cycle_num)
 
-            # number of samples in the cycle
+            # Number of samples in the cycle and iteration at which it started
             self._number_of_samples = np.zeros(expected_cycle_num, dtype=int)
             self._start_cycles = np.zeros(expected_cycle_num, dtype=int)
-            self._end_cycles = np.zeros(expected_cycle_num, dtype=int)
-            # TODO: find the right value
-            self._reset_every = 50000
 
-            # Cycles that are waiting to be completed
-            self._is_valid = np.zeros(expected_cycle_num, dtype=bool)
-            # Mask to hide cycles allocated for efficiency purpose only
-            self._is_used = np.zeros(expected_cycle_num, dtype=bool)
-
-            self._aux_enum = np.linspace(0, expected_cycle_num - 1, expected_cycle_num, dtype=int)
             self._last_value = init_soc
 
             # To manage edge cases
@@ -354,53 +727,47 @@ class BolunModel(AgingModel):
 
             self._is_init = True
             self._iteration = 0
-            self._stream_f_cyc_past = 0
 
-        def step(self,
-                 actual_value,
-                 expected_end,
-                 second_signal_value=None,
-                 return_valid_only=True,
-                 return_unvalidated_list=True):
+        @property
+        def n_open(self):
+            return self._n_open
+
+        def get_open_cycles(self):
+            """
+            Returns: mean values, ranges and second signal mean values of the open cycles
+            """
+            n = self._n_open
+            return (self._mean_values[:n].copy(),
+                    self._max_vals[:n] - self._min_vals[:n],
+                    self._second_signal_means[:n].copy())
+
+        def step(self, actual_value, expected_end, second_signal_value=None):
             """
             Args:
                 actual_value ():
                 expected_end ():
                 second_signal_value ():
-                return_valid_only ():
-                return_unvalidated_list ():
+
+            Returns: mean values, ranges and second signal mean values of the cycles closed by the new sample
             """
-            change_direction = False
-            # Obtain information about closed cycles
-            to_invalid = []
-            if (self._is_init or
-                    (self._directions[self._cycle_k] == 1 and actual_value < self._last_value) or
-                    (self._directions[self._cycle_k] == 2 and actual_value > self._last_value)):
-                change_direction = True
-                self._is_init = False
+            to_close = np.empty(0, dtype=int)
 
             # Case in which there is a change of current direction wrt actual cycle -> creation of new cycle
-            if change_direction:
+            if (self._is_init or
+                    (self._directions[self._cycle_k] == self.Direction.UP.value and actual_value < self._last_value) or
+                    (self._directions[self._cycle_k] == self.Direction.DOWN.value and actual_value > self._last_value)):
+                self._is_init = False
                 self._create_new_cycle(value=actual_value, second_signal_value=second_signal_value)
 
             # Direction of the cycle doesn't change
             else:
-                self._update_existent_cycle(value=actual_value, expected_end=expected_end,
-                                            second_signal_value=second_signal_value)
+                to_close = self._update_existent_cycle(value=actual_value, expected_end=expected_end,
+                                                       second_signal_value=second_signal_value)
 
-            valid_and_used = np.logical_and(self._is_used, self._is_valid)
-            # self.number_of_samples[valid_and_used] += 1  # TODO this could be a problem
             self._last_value = actual_value
             self._iteration += 1
 
-            return (self._mean_values[self._is_used],
-                    self._range_size[self._is_used],
-                    self._number_of_samples[self._is_used],
-                    self._is_valid[self._is_used],
-                    change_direction,
-                    self._start_cycles[self._is_used],
-                    self._second_signal_means[self._is_used],
-                    to_invalid)
+            return self._close_cycles(to_close)
 
         def _create_new_cycle(self, value, second_signal_value=None):
             """
@@ -409,35 +776,27 @@ class BolunModel(AgingModel):
                 value ():
                 second_signal_value ():
             """
-            self._cycle_k = np.sum(self._is_used)
-
-            if self._cycle_k >= self._range_size.shape[0]:
+            if self._n_open >= self._mean_values.shape[0]:
                 self._expand()
 
-            # Enable the new cycle and set the direction
-            self._is_valid[self._cycle_k] = True
-            self._is_used[self._cycle_k] = True
+            self._cycle_k = self._n_open
+            self._n_open += 1
 
             if value < self._last_value:
-                self._directions[self._cycle_k] = 2
+                self._directions[self._cycle_k] = self.Direction.DOWN.value
             else:
-                self._directions[self._cycle_k] = 1
+                self._directions[self._cycle_k] = self.Direction.UP.value
 
             # Set the min and max values of the new cycle
-            min_val, max_val = min(value, self._last_value), max(value, self._last_value)
-            self._min_max_vals[self._cycle_k] = (min_val, max_val)
-            self._range_size[self._cycle_k] = max_val - min_val
+            self._min_vals[self._cycle_k] = min(value, self._last_value)
+            self._max_vals[self._cycle_k] = max(value, self._last_value)
 
             self._mean_values[self._cycle_k] = value
-            if second_signal_value is not None:
-                self._second_signal_means[self._cycle_k] = second_signal_value
+            self._second_signal_means[self._cycle_k] = second_signal_value if second_signal_value is not None else 0
             self._number_of_samples[self._cycle_k] = 1
 
             self._start_cycles[self._cycle_k] = self._iteration
 
-            # self.mean_values[self.actual_cycle] = 0
-            # self.number_of_samples[self.actual_cycle] = 0
-
         def _update_existent_cycle(self, value: float, expected_end: float, second_signal_value=None):
             """
 
@@ -445,122 +804,99 @@ class BolunModel(AgingModel):
                 value ():
                 expected_end ():
                 second_signal_value ():
-            """
-            # Get indices of cycles used, valid and with the same direction of current cycle
-            valid_used_correct_direction = np.logical_and(self._is_used, self._is_valid,
-                                                          (self._directions == self._directions[self._cycle_k]))
-
-            is_direction_up = self._directions[self._cycle_k] == 1
-            min_max_index = 1 if is_direction_up else 0
-            arg_function = np.argmax if is_direction_up else np.argmin
-
-            indices = self._get_indices_by_direction(direction=self._directions[self._cycle_k],
-                                                     value=value,
-                                                     indices_range=valid_used_correct_direction)
-
-            expected_end_indices = self._get_indices_by_direction(direction=self._directions[self._cycle_k],
-                                                                  value=expected_end,
-                                                                  indices_range=valid_used_correct_direction)
 
+            Returns: indices of the open cycles closed by the new sample
             """
-            up_indexes = (self._min_max_vals[valid_used_correct_direction][:, 1] > self._last_value
-                          ) & (self._min_max_vals[valid_used_correct_direction][:, 1] < actual_value)
-
-            down_indexes = (self._min_max_vals[valid_used_correct_direction][:, 0] < self._last_value
-                            ) & (self._min_max_vals[valid_used_correct_direction][:, 0] > actual_value)
-            indexes = up_indexes if is_direction_up == 1 else down_indexes
+            to_close = np.empty(0, dtype=int)
+            direction = self._directions[self._cycle_k]
 
-            expected_indexes_up = (self._min_max_vals[valid_used_correct_direction][:, 1] > actual_value
-                                   ) & (self._min_max_vals[valid_used_correct_direction][:, 1] < expected_end)
-            expected_indexes_down = (self._min_max_vals[valid_used_correct_direction][:, 0] < actual_value
-                                     ) & (self._min_max_vals[valid_used_correct_direction][:, 0] > expected_end)
-            expected_end_indexes = expected_indexes_up if is_direction_up else expected_indexes_down
-            """
-            if indices.any():
-                aux = self._aux_enum[valid_used_correct_direction]
+            # Open cycles with the same direction of the current one whose extreme has been crossed by the new sample
+            same_direction = self._directions[:self._n_open] == direction
+            crossed = np.flatnonzero(same_direction & self._crossed_extremes(direction, value))
 
-                # If something will fall later, invalid all the current falling cycles
-                if expected_end_indices.any():
-                    to_invalid = aux[indices]
-                    self._is_valid[to_invalid] = False
+            if len(crossed) > 0:
+                # If something will fall later, close all the current falling cycles
+                if np.any(same_direction & self._crossed_extremes(direction, expected_end)):
+                    to_close = crossed
 
-                # Nothing is falling, so find the biggest that is falling
+                # Nothing is falling, so the current cycle merges with the biggest that is falling
                 else:
-                    # Indices is boolean, therefore aux[indices] filter
-                    self._is_valid[self._cycle_k] = False
-                    self._cycle_k = arg_function(self._min_max_vals[aux[indices]][:, min_max_index])
-                    to_invalid = np.concatenate((aux[indices][0:self._cycle_k],
-                                                 aux[indices][self._cycle_k + 1:len(aux[indices])]))
-                    self._is_valid[to_invalid] = False
-                    self._is_valid[self._cycle_k] = True
+                    if direction == self.Direction.UP.value:
+                        biggest = crossed[np.argmax(self._max_vals[crossed])]
+                    else:
+                        biggest = crossed[np.argmin(self._min_vals[crossed])]
+
+                    to_close = np.append(crossed[crossed != biggest], self._cycle_k)
+                    self._cycle_k = biggest
 
             # Update of the mean and the ranges
-            self._mean_values[self._cycle_k] = ((self._mean_values[self._cycle_k] *
-                                                self._number_of_samples[self._cycle_k] + value) /
-                                                (self._number_of_samples[self._cycle_k] + 1))
+            k = self._cycle_k
+            n_samples = self._number_of_samples[k]
+            self._mean_values[k] = (self._mean_values[k] * n_samples + value) / (n_samples + 1)
             if second_signal_value is not None:
-                self._second_signal_means[self._cycle_k] = \
-                    (self._second_signal_means[self._cycle_k] * self._number_of_samples[self._cycle_k] +
-                     second_signal_value) / (self._number_of_samples[self._cycle_k] + 1)
+                self._second_signal_means[k] = \
+                    (self._second_signal_means[k] * n_samples + second_signal_value) / (n_samples + 1)
 
-            # Update min_max values considering the new value and the range
-            self._min_max_vals[self._cycle_k] = (min(value, self._min_max_vals[self._cycle_k][0]),
-                                                 max(value, self._min_max_vals[self._cycle_k][1]))
-            self._range_size[self._cycle_k] = (self._min_max_vals[self._cycle_k][1] -
-                                               self._min_max_vals[self._cycle_k][0])
+            self._min_vals[k] = min(value, self._min_vals[k])
+            self._max_vals[k] = max(value, self._max_vals[k])
+            self._number_of_samples[k] += 1
 
-            # bounds_tuple = self._min_max_vals[self._cycle_k]
-            # min_val, max_val = min(bounds_tuple[0], actual_value), max(bounds_tuple[1], actual_value)
-            # self._min_max_vals[self._cycle_k] = (min_val, max_val)
-            self._number_of_samples[self._cycle_k] += 1
+            return to_close
 
-        def _get_indices_by_direction(self, direction: Direction, value: float, indices_range: np.array = None):
+        def _crossed_extremes(self, direction: int, value: float):
             """
 
             Args:
-                direction (Direction):
+                direction (int):
                 value ():
-                indices_range ():
 
-            Returns: indices of desired subset of cycles
+            Returns: mask of the open cycles whose extreme value lies between the last sample and the given value
             """
-            if direction == 1:
-                indices = np.logical_and(self._min_max_vals[indices_range][:, 1] > self._last_value,
-                                         self._min_max_vals[indices_range][:, 1] < value)
-            elif direction == 2:
-                indices = np.logical_and(self._min_max_vals[indices_range][:, 0] < self._last_value,
-                                         self._min_max_vals[indices_range][:, 0] > value)
+            if direction == self.Direction.UP.value:
+                max_vals = self._max_vals[:self._n_open]
+                return (max_vals > self._last_value) & (max_vals < value)
+            elif direction == self.Direction.DOWN.value:
+                min_vals = self._min_vals[:self._n_open]
+                return (min_vals < self._last_value) & (min_vals > value)
             else:
                 raise ValueError("The specified direction does not exist!")
 
-            return indices
+        def _close_cycles(self, to_close: np.ndarray):
+            """
+            Remove the given cycles from the open ones, keeping the arrays compact.
 
-        def _expand(self):
+            Returns: mean values, ranges and second signal mean values of the closed cycles
             """
+            n = self._n_open
+            closed = (self._mean_values[to_close],
+                      self._max_vals[to_close] - self._min_vals[to_close],
+                      self._second_signal_means[to_close])
+
+            if len(to_close) > 0:
+                keep = np.ones(n, dtype=bool)
+                keep[to_close] = False
+                n_kept = n - len(to_close)
+
+                for values in (self._directions, self._mean_values, self._second_signal_means, self._min_vals,
+                               self._max_vals, self._number_of_samples, self._start_cycles):
+                    values[:n_kept] = values[:n][keep]
 
+                self._cycle_k -= np.count_nonzero(~keep[:self._cycle_k])
+                self._n_open = n_kept
+
+            return closed
+
+        def _expand(self):
+            """
+            More open cycles than the ones pre-allocated, need to allocate new ones
             """
-            # more cycles than the one pre-allocated, need to allocate new ones
-            self._mean_values = np.concatenate(
-                (self._mean_values, np.zeros(self._cycle_num_increment)))
-            self.second_signal_means = np.concatenate(
-                (self._second_signal_means, np.zeros(self._cycle_num_increment)))
-            self.range_size = np.concatenate(
-                (self._range_size, np.zeros(self._cycle_num_increment)))
-            self.min_max_vals = np.vstack(
-                (self._min_max_vals, np.zeros((self._cycle_num_increment, 2))))
-            self._number_of_samples = np.concatenate(
-                (self._number_of_samples, np.zeros(self._cycle_num_increment, dtype=int)))
-            self.start_cycles = np.concatenate(
-                (self._start_cycles, np.zeros(self._cycle_num_increment, dtype=int)))
-            self.end_cycles = np.concatenate(
-                (self._end_cycles, np.zeros(self._cycle_num_increment, dtype=int)))
-            self._directions = np.concatenate(
-                (self._directions, np.zeros(self._cycle_num_increment, dtype=int)))
-            self._is_valid = np.concatenate(
-                (self._is_valid, np.zeros(self._cycle_num_increment, dtype=bool)))
-            self._is_used = np.concatenate(
-                (self._is_used, np.zeros(self._cycle_num_increment, dtype=bool)))
-            self._aux_enum = np.concatenate(
-                (self._aux_enum, np.linspace(self._aux_enum.shape[0], self._aux_enum.shape[0] +
-                                             self._cycle_num_increment - 1,
-                                             self._cycle_num_increment, dtype=int)))
+            def grow(values):
+                return np.concatenate((values, np.zeros(self._cycle_num_increment, dtype=values.dtype)))
+
+            self._directions = grow(self._directions)
+            self._mean_values = grow(self._mean_values)
+            self._second_signal_means = grow(self._second_signal_means)
+            self._min_vals = grow(self._min_vals)
+            self._max_vals = grow(self._max_vals)
+            self._number_of_samples = grow(self._number_of_samples)
+            self._start_cycles = grow(self._start_cycles)
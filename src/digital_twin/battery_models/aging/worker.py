@@ -0,0 +1,192 @@
+import logging
+import multiprocessing
+import os
+
+logger = logging.getLogger('ErNESTO-DT')
+
+
+def _run_worker(aging_model, conn):
+    """
+    Loop of the process of the AgingWorker, computing the degradation of the aging checks received through the pipe.
+    """
+    soc_history, temp_history = [], []
+
+    while True:
+        message = conn.recv()
+        try:
+            if message[0] == 'close':
+                conn.send(('closed', aging_model))
+                break
+
+            if message[0] == 'call':
+                _, method, args = message
+                conn.send(('call', getattr(aging_model, method)(*args)))
+                continue
+
+            _, start, soc_chunk, temp_chunk, elapsed_time, k, kwargs = message
+            del soc_history[start:]
+            del temp_history[start:]
+            soc_history.extend(soc_chunk)
+            temp_history.extend(temp_chunk)
+
+            logger.debug("Aging step at iteration {}".format(k))
+            degradation = aging_model.compute_degradation(soc_history=soc_history,
+                                                          temp_history=temp_history,
+                                                          elapsed_time=elapsed_time,
+                                                          k=k,
+                                                          **kwargs)
+            conn.send(('check', k, degradation, aging_model.get_results(k=-1)))
+
+        except Exception as e:
+            conn.send(('error', "{}: {}".format(type(e).__name__, e)))
+            break
+
+    conn.close()
+
+
+class AgingWorker:
+    """
+    Process that computes the degradation of an aging model concurrently to the simulation of the battery.
+
+    At each aging check, the samples of SoC and temperature added since the previous check are sent to the worker
+    through a pipe. The worker keeps its own copy of the histories and of the aging model, and sends back the
+    degradation (and the results of the aging model) as soon as it has been computed. The lag of the published
+    degradation is bounded: at most 'max_lag' checks can be pending, otherwise the submission waits for the worker
+    to catch up (with max_lag=0 the computation is synchronous). When the worker is closed, the state of its aging
+    model is copied back to the model given at init.
+
+    The worker runs in its own process, since the aging computation holds the GIL and would not run concurrently to
+    the simulation in a thread. Starting the process takes some hundreds of milliseconds, and each check costs the
+    transfer of its samples, so the worker pays off when the aging checks are expensive with respect to the steps
+    between them, and it needs a spare core: on a single core it only adds the overhead (see
+    benchmarks/aging_worker.py).
+    """
+    def __init__(self, aging_model, max_lag: int = 1):
+        """
+        Args:
+            aging_model (AgingModel): model used to compute the degradation, owned by the worker until it is closed
+            max_lag (int): maximum number of aging checks that can be pending
+        """
+        assert max_lag >= 0, "The maximum lag of the aging worker cannot be negative."
+
+        if (os.cpu_count() or 1) < 2:
+            logger.warning("The aging worker cannot run concurrently to the simulation on a single core.")
+
+        self._aging_model = aging_model
+        self._max_lag = max_lag
+
+        self._n_submitted = 0
+        self._pending = 0
+        self._error = None
+
+        # Last degradation computed with the iteration of the check and the results of the aging model
+        self._k = None
+        self._degradation = None
+        self._results = aging_model.get_results(k=-1)
+
+        # The process is spawned, since forking a simulator with running threads (e.g. the writer) is unsafe
+        context = multiprocessing.get_context('spawn')
+        self._conn, worker_conn = context.Pipe()
+        self._process = context.Process(target=_run_worker, args=(aging_model, worker_conn), daemon=True)
+        self._process.start()
+        worker_conn.close()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    @property
+    def results(self):
+        return self._results
+
+    def submit(self, soc_series: list, temp_series: list, elapsed_time: float, k: int, **kwargs):
+        """
+        Submit an aging check, streaming the samples added to the histories since the previous one. The last sample
+        submitted is sent again, since it can be overwritten after the check (e.g. by a reset of the SoC).
+
+        Args:
+            soc_series (list): whole SoC history of the battery
+            temp_series (list): whole temperature history of the battery
+            elapsed_time (float): time elapsed from the start of the simulation
+            k (int): iteration of the aging check
+            **kwargs: other arguments of compute_degradation (e.g. avg_soc, avg_temp)
+        """
+        self._raise_error()
+
+        start = max(self._n_submitted - 1, 0)
+        n = len(soc_series)
+        self._send(('check', start, list(soc_series[start:n]), list(temp_series[start:n]), elapsed_time, k, kwargs))
+        self._n_submitted = n
+
+        # Bound the lag of the published degradation
+        while self._pending > self._max_lag:
+            self._receive()
+
+    def poll(self):
+        """
+        Get the last degradation published by the worker, without waiting for the pending checks.
+
+        Returns: the iteration of the aging check and the degradation, or (None, None) if nothing has been computed yet
+        """
+        while self._pending and self._conn.poll():
+            self._receive()
+        return self._k, self._degradation
+
+    def wait(self):
+        """
+        Wait for all the pending checks to be computed.
+        """
+        while self._pending:
+            self._receive()
+
+    def call(self, method: str, *args):
+        """
+        Call a method of the aging model owned by the worker, after the pending checks.
+
+        Args:
+            method (str): name of the method of the aging model
+            *args: arguments of the method
+        """
+        self.wait()
+        self._send(('call', method, args))
+        return self._receive()[1]
+
+    def close(self):
+        """
+        Wait for the pending checks to be computed, stop the worker and copy the state of its aging model back.
+        """
+        if self._process.is_alive() and self._error is None:
+            self.wait()
+            self._send(('close',))
+            _, aging_model = self._receive()
+            vars(self._aging_model).update(vars(aging_model))
+
+        self._process.join()
+        self._conn.close()
+        self._raise_error()
+
+    def _send(self, message):
+        self._conn.send(message)
+        self._pending += 1
+
+    def _receive(self):
+        try:
+            reply = self._conn.recv()
+        except EOFError:
+            self._error = "the process has stopped"
+            self._pending = 0
+            self._raise_error()
+
+        self._pending -= 1
+        if reply[0] == 'error':
+            self._error = reply[1]
+            self._pending = 0
+            self._raise_error()
+
+        if reply[0] == 'check':
+            self._k, self._degradation, self._results = reply[1:]
+        return reply
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise Exception("The aging worker failed: {}".format(self._error))
@@ -1 +1,2 @@
 from .ecm import FirstOrderThevenin, SecondOrderThevenin
+from .batched_ecm import BatchedFirstOrderThevenin, BatchedSecondOrderThevenin
@@ -0,0 +1,477 @@
+import numpy as np
+
+from src.digital_twin.battery_models.generic_models import ElectricalModel
+from src.digital_twin.parameters import instantiate_variables
+
+
+class BatchedThevenin(ElectricalModel):
+    """
+    Base class of the Thevenin equivalent circuits able to simulate a fleet of batteries at once.
+
+    Every parameter (R0, R_i, C_i, V_ocv) and every state (V_rc_i) is stored as a NumPy array of shape
+    (n_batteries,), so that a single call to the step methods advances all the batteries of the fleet.
+    Parameters are shared across the fleet as specified in the model configuration, but they can be
+    overridden battery by battery through reset_model() (e.g. to perform parameter sweeps).
+    """
+    _param_names = []
+
+    def __init__(self,
+                 name: str,
+                 components_settings: dict,
+                 sign_convention='active',
+                 n_batteries: int = 1,
+                 series_capacity: int = None
+                 ):
+        """
+        Args:
+            name (str): identifier of the model
+            components_settings (dict): settings of the circuit components
+            sign_convention (str): 'active' or 'passive' sign convention
+            n_batteries (int): number of batteries of the fleet
+            series_capacity (int, None): number of past values retained by each collection (all of them if None)
+        """
+        super().__init__(name=name, series_capacity=series_capacity)
+        assert n_batteries >= 1, "The number of batteries of a batched model has to be a positive integer."
+
+        self._sign_convention = sign_convention
+        self._n_batteries = n_batteries
+
+        self._init_components = instantiate_variables(components_settings)
+        self._params = self._param_names
+
+        # Per battery values of the parameters that override the configured ones
+        self._overrides = {}
+
+        # Battery state of each element of the fleet
+        self._state = {'temp': None, 'soc': None, 'soh': None}
+
+    @property
+    def n_batteries(self):
+        return self._n_batteries
+
+    @property
+    def temp(self):
+        return self._state['temp']
+
+    @property
+    def soc(self):
+        return self._state['soc']
+
+    @property
+    def soh(self):
+        return self._state['soh']
+
+    def _broadcast(self, value):
+        """
+        Broadcast a scalar or an array-like value to the shape of the fleet.
+        """
+        return np.broadcast_to(np.asarray(value, dtype=float), (self._n_batteries,)).copy()
+
+    def get_params(self):
+        return {name: self._get_param(name) for name in self._param_names}
+
+    def set_params(self, **kwargs):
+        """
+        Override the configured parameters with a value for each battery of the fleet.
+        """
+        for name, value in kwargs.items():
+            if name not in self._param_names:
+                raise KeyError("Parameter '{}' does not exist in model {}. Available parameters are {}."
+                               .format(name, self.name, self._param_names))
+            self._overrides[name] = self._broadcast(value)
+
+    def _get_param(self, name: str):
+        """
+        Evaluate the parameter for each battery of the fleet. Lookup tables are evaluated at once on the battery
+        state ({temp, soc, soh}) of all the elements of the fleet.
+        """
+        if name in self._overrides:
+            return self._overrides[name]
+
+        state = {key: self._broadcast(value) for key, value in self._state.items() if value is not None}
+        return self._broadcast(self._init_components[name].get_values(input_vars=state))
+
+    def reset_model(self, **kwargs):
+        self._v_load_series = self._new_series()
+        self._i_load_series = self._new_series()
+        self._power_series = self._new_series()
+        self._reset_components()
+        self.set_params(**{name: value for name, value in kwargs.items() if name in self._param_names})
+
+    def load_battery_state(self, temp=None, soc=None, soh=None):
+        """
+        Update temperature, SoC and SoH of each battery of the fleet for the current simulation step
+        """
+        if temp is not None:
+            self._state['temp'] = self._broadcast(temp)
+        if soc is not None:
+            self._state['soc'] = self._broadcast(soc)
+        if soh is not None:
+            self._state['soh'] = self._broadcast(soh)
+
+    def _init_load(self, **kwargs):
+        v = self._broadcast(kwargs['voltage'] if 'voltage' in kwargs and kwargs['voltage'] else 0)
+        i = self._broadcast(kwargs['current'] if 'current' in kwargs and kwargs['current'] else 0)
+
+        self.update_v_load(v)
+        self.update_i_load(i)
+        self.update_power(v * i)
+
+    def _compute_power(self, v, i_load, p_load=None):
+        if p_load is not None:
+            return self._broadcast(p_load)
+
+        power = v * i_load
+        if self._sign_convention == 'passive':
+            power = -power
+        return power
+
+    def _reset_components(self):
+        raise NotImplementedError
+
+    def step_power_driven(self, p_load, dt, k):
+        """
+        CP mode: to simplify the power driven case, we pose I = P / V(t-1), having a little shift in computed data
+        """
+        return self.step_current_driven(i_load=p_load / self._v_load_series[-1], dt=dt, k=k, p_load=p_load)
+
+
+class BatchedFirstOrderThevenin(BatchedThevenin):
+    """
+    First Order Thevenin model advancing n_batteries in a single vectorized step.
+    It shares the current, voltage and power driven semantics of FirstOrderThevenin.
+    """
+    _param_names = ['r0', 'r1', 'c', 'v_ocv']
+
+    def __init__(self,
+                 components_settings: dict,
+                 sign_convention='active',
+                 n_batteries: int = 1,
+                 series_capacity: int = None,
+                 **kwargs
+                 ):
+        """
+        Args:
+            components_settings (dict): settings of the circuit components
+            sign_convention (str): 'active' or 'passive' sign convention
+            n_batteries (int): number of batteries of the fleet
+            series_capacity (int, None): number of past values retained by each collection (all of them if None)
+            **kwargs ():
+        """
+        super().__init__(name='Batched First Order Thevenin',
+                         components_settings=components_settings,
+                         sign_convention=sign_convention,
+                         n_batteries=n_batteries,
+                         series_capacity=series_capacity)
+        self._reset_components()
+
+    def _reset_components(self):
+        self._r0_series = self._new_series()
+        self._v_r0_series = self._new_series()
+        self._r1_series = self._new_series()
+        self._c_series = self._new_series()
+        self._v_rc_series = self._new_series()
+        self._i_r1_series = self._new_series()
+        self._i_c_series = self._new_series()
+        self._v_ocv_series = self._new_series()
+
+    def init_model(self, **kwargs):
+        """
+        Initialize the model at t=0
+        """
+        self._init_load(**kwargs)
+
+        self._r0_series.append(self._broadcast(kwargs['r0']) if 'r0' in kwargs else self._get_param('r0'))
+        self._r1_series.append(self._broadcast(kwargs['r1']) if 'r1' in kwargs else self._get_param('r1'))
+        self._c_series.append(self._broadcast(kwargs['c']) if 'c' in kwargs else self._get_param('c'))
+        self._v_r0_series.append(self._broadcast(kwargs['v_r0'] if 'v_r0' in kwargs else 0))
+        self._v_rc_series.append(self._broadcast(kwargs['v_rc'] if 'v_rc' in kwargs else 0))
+        self._i_r1_series.append(self._broadcast(0))
+        self._i_c_series.append(self._broadcast(0))
+        self._v_ocv_series.append(self._broadcast(kwargs['v_ocv'] if 'v_ocv' in kwargs else 0))
+
+    def step_voltage_driven(self, v_load, dt, k):
+        """
+        CV mode
+        """
+        r0 = self._get_param('r0')
+        r1 = self._get_param('r1')
+        c = self._get_param('c')
+        v_ocv = self._get_param('v_ocv')
+        v_load = self._broadcast(v_load)
+
+        # Compute V_c with finite difference method
+        term_1 = self._v_rc_series[-1] / dt
+        term_2 = (v_ocv - v_load) / (r0 * c)
+        denominator = 1 / dt + 1 / (r0 * c) + 1 / (r1 * c)
+
+        v_rc = (term_1 + term_2) / denominator
+        i = (v_ocv - v_rc - v_load) / r0
+
+        if self._sign_convention == "passive":
+            i = -i
+
+        v_r0 = i * r0
+        i_r1 = v_rc / r1
+        i_c = i - i_r1
+
+        self._update_step_variables(r0=r0, r1=r1, c=c, v_ocv=v_ocv, v_r0=v_r0, v_rc=v_rc, i_r1=i_r1, i_c=i_c)
+        self.update_i_load(value=i)
+        self.update_v_load(value=v_load)
+        self.update_power(value=v_load * i)
+
+        return v_load, i
+
+    def step_current_driven(self, i_load, dt, k, p_load=None):
+        """
+        CC mode
+        """
+        r0 = self._get_param('r0')
+        r1 = self._get_param('r1')
+        c = self._get_param('c')
+        v_ocv = self._get_param('v_ocv')
+        i_load = self._broadcast(i_load)
+
+        if self._sign_convention == 'passive':
+            i_load = -i_load
+
+        # Compute V_r0 and V_rc
+        v_r0 = i_load * r0
+        v_rc = (self._v_rc_series[-1] / dt + i_load / c) / (1 / dt + 1 / (c * r1))
+
+        # Compute V
+        v = v_ocv - v_r0 - v_rc
+
+        # Compute I_r1 and I_c for the RC parallel
+        i_r1 = v_rc / r1
+        i_c = i_load - i_r1
+
+        if p_load is not None:
+            i_load = -i_load
+
+        power = self._compute_power(v=v, i_load=i_load, p_load=p_load)
+
+        self._update_step_variables(r0=r0, r1=r1, c=c, v_ocv=v_ocv, v_r0=v_r0, v_rc=v_rc, i_r1=i_r1, i_c=i_c)
+        self.update_v_load(value=v)
+        self.update_i_load(value=i_load)
+        self.update_power(value=power)
+
+        return v, i_load
+
+    def _update_step_variables(self, r0, r1, c, v_ocv, v_r0, v_rc, i_r1, i_c):
+        self._r0_series.append(r0)
+        self._r1_series.append(r1)
+        self._c_series.append(c)
+        self._v_ocv_series.append(v_ocv)
+        self._v_r0_series.append(v_r0)
+        self._v_rc_series.append(v_rc)
+        self._i_r1_series.append(i_r1)
+        self._i_c_series.append(i_c)
+
+    def compute_generated_heat(self, k=-1):
+        """
+        Compute the generated heat of each battery that can be used to feed the thermal model (when required).
+        For Thevenin first order circuit it is: [P = V * I + V_rc * I_r1].
+
+        Inputs:
+        :param k: step for which compute the heat generation
+        """
+        return self._r0_series[k] * self.get_i_series(k=k)**2 + self._r1_series[k] * self._i_r1_series[k]**2
+
+    def get_results(self, **kwargs):
+        """
+        Returns a dictionary with results, where each value is an array with an entry for each battery
+        """
+        k = kwargs['k'] if 'k' in kwargs else None
+
+        series = {'voltage': self._v_load_series,
+                  'current': self._i_load_series,
+                  'power': self._power_series,
+                  'v_oc': self._v_ocv_series,
+                  'r0': self._r0_series,
+                  'r1': self._r1_series,
+                  'c': self._c_series,
+                  'v_r0': self._v_r0_series,
+                  'v_rc': self._v_rc_series
+                  }
+        return {key: values[k] if k is not None else values for key, values in series.items()}
+
+
+class BatchedSecondOrderThevenin(BatchedThevenin):
+    """
+    Second Order Thevenin model advancing n_batteries in a single vectorized step.
+    It shares the current, voltage and power driven semantics of SecondOrderThevenin.
+    """
+    _param_names = ['r0', 'r1', 'c1', 'r2', 'c2', 'v_ocv']
+
+    def __init__(self,
+                 components_settings: dict,
+                 sign_convention='active',
+                 n_batteries: int = 1,
+                 series_capacity: int = None,
+                 **kwargs
+                 ):
+        """
+        Args:
+            components_settings (dict): settings of the circuit components
+            sign_convention (str): 'active' or 'passive' sign convention
+            n_batteries (int): number of batteries of the fleet
+            series_capacity (int, None): number of past values retained by each collection (all of them if None)
+            **kwargs ():
+        """
+        super().__init__(name='Batched Second Order Thevenin',
+                         components_settings=components_settings,
+                         sign_convention=sign_convention,
+                         n_batteries=n_batteries,
+                         series_capacity=series_capacity)
+        self._reset_components()
+
+    def _reset_components(self):
+        self._r0_series = self._new_series()
+        self._v_r0_series = self._new_series()
+        self._r1_series = self._new_series()
+        self._c1_series = self._new_series()
+        self._r2_series = self._new_series()
+        self._c2_series = self._new_series()
+        self._v_rc1_series = self._new_series()
+        self._v_rc2_series = self._new_series()
+        self._i_r1_series = self._new_series()
+        self._i_r2_series = self._new_series()
+        self._i_c1_series = self._new_series()
+        self._i_c2_series = self._new_series()
+        self._v_ocv_series = self._new_series()
+
+    def init_model(self, **kwargs):
+        """
+        Initialize the model at t=0
+        """
+        self._init_load(**kwargs)
+
+        for name in ['r0', 'r1', 'c1', 'r2', 'c2']:
+            getattr(self, '_{}_series'.format(name)).append(
+                self._broadcast(kwargs[name]) if name in kwargs else self._get_param(name))
+
+        for name in ['v_r0', 'v_rc1', 'v_rc2', 'v_ocv']:
+            getattr(self, '_{}_series'.format(name)).append(self._broadcast(kwargs[name] if name in kwargs else 0))
+
+        for name in ['i_r1', 'i_r2', 'i_c1', 'i_c2']:
+            getattr(self, '_{}_series'.format(name)).append(self._broadcast(0))
+
+    def step_voltage_driven(self, v_load, dt, k):
+        """
+        CV mode
+        """
+        r0 = self._get_param('r0')
+        r1 = self._get_param('r1')
+        c1 = self._get_param('c1')
+        r2 = self._get_param('r2')
+        c2 = self._get_param('c2')
+        v_ocv = self._get_param('v_ocv')
+        v_load = self._broadcast(v_load)
+
+        # Compute denominators of Vrc1 and Vrc2 terms
+        k1 = 1 / dt + 1 / (c1 * r1)
+        k2 = 1 / dt + 1 / (c2 * r2)
+        term1 = self._v_rc1_series[-1] / dt / k1
+        term2 = self._v_rc2_series[-1] / dt / k2
+        denominator = r0 + 1 / (c1 * k1) + 1 / (c2 * k2)
+
+        i = (v_ocv - v_load - term1 - term2) / denominator
+
+        if self._sign_convention == "passive":
+            i = -i
+
+        # Compute V_r0, V_rc1 and V_rc2
+        v_r0 = i * r0
+        v_rc1 = (self._v_rc1_series[-1] / dt + i / c1) / k1
+        v_rc2 = (self._v_rc2_series[-1] / dt + i / c2) / k2
+
+        # Compute I_r and I_c for both the RC parallels
+        i_r1 = v_rc1 / r1
+        i_r2 = v_rc2 / r2
+
+        self._update_step_variables(r0=r0, r1=r1, c1=c1, r2=r2, c2=c2, v_ocv=v_ocv, v_r0=v_r0,
+                                    v_rc1=v_rc1, v_rc2=v_rc2, i_r1=i_r1, i_r2=i_r2, i_c1=i - i_r1, i_c2=i - i_r2)
+        self.update_i_load(value=i)
+        self.update_v_load(value=v_load)
+        self.update_power(value=v_load * i)
+
+        return v_load, i
+
+    def step_current_driven(self, i_load, dt, k, p_load=None):
+        """
+        CC mode
+        """
+        r0 = self._get_param('r0')
+        r1 = self._get_param('r1')
+        c1 = self._get_param('c1')
+        r2 = self._get_param('r2')
+        c2 = self._get_param('c2')
+        v_ocv = self._get_param('v_ocv')
+        i_load = self._broadcast(i_load)
+
+        if self._sign_convention == 'passive':
+            i_load = -i_load
+
+        # Compute V_r0, V_rc1 and V_rc2
+        v_r0 = i_load * r0
+        v_rc1 = (self._v_rc1_series[-1] / dt + i_load / c1) / (1 / dt + 1 / (c1 * r1))
+        v_rc2 = (self._v_rc2_series[-1] / dt + i_load / c2) / (1 / dt + 1 / (c2 * r2))
+
+        # Compute V
+        v = v_ocv - v_r0 - v_rc1 - v_rc2
+
+        # Compute I_r and I_c for both the RC parallels
+        i_r1 = v_rc1 / r1
+        i_r2 = v_rc2 / r2
+        i_c1 = i_load - i_r1
+        i_c2 = i_load - i_r2
+
+        if p_load is not None:
+            i_load = -i_load
+
+        power = self._compute_power(v=v, i_load=i_load, p_load=p_load)
+
+        self._update_step_variables(r0=r0, r1=r1, c1=c1, r2=r2, c2=c2, v_ocv=v_ocv, v_r0=v_r0,
+                                    v_rc1=v_rc1, v_rc2=v_rc2, i_r1=i_r1, i_r2=i_r2, i_c1=i_c1, i_c2=i_c2)
+        self.update_v_load(value=v)
+        self.update_i_load(value=i_load)
+        self.update_power(value=power)
+
+        return v, i_load
+
+    def _update_step_variables(self, **kwargs):
+        for name, value in kwargs.items():
+            getattr(self, '_{}_series'.format(name)).append(value)
+
+    def compute_generated_heat(self, k=-1):
+        """
+        Compute the generated heat of each battery that can be used to feed the thermal model (when required).
+
+        Inputs:
+        :param k: step for which compute the heat generation
+        """
+        return self._r0_series[k] * self.get_i_series(k=k)**2 + \
+            self._r1_series[k] * self._i_r1_series[k]**2 + \
+            self._r2_series[k] * self._i_r2_series[k]**2
+
+    def get_results(self, **kwargs):
+        """
+        Returns a dictionary with results, where each value is an array with an entry for each battery
+        """
+        k = kwargs['k'] if 'k' in kwargs else None
+
+        series = {'voltage': self._v_load_series,
+                  'current': self._i_load_series,
+                  'power': self._power_series,
+                  'v_oc': self._v_ocv_series,
+                  'r0': self._r0_series,
+                  'r1': self._r1_series,
+                  'c1': self._c1_series,
+                  'r2': self._r2_series,
+                  'c2': self._c2_series,
+                  'v_r0': self._v_r0_series,
+                  'v_rc1': self._v_rc1_series,
+                  'v_rc2': self._v_rc2_series
+                  }
+        return {key: values[k] if k is not None else values for key, values in series.items()}
@@ -1,8 +1,11 @@
+import numpy as np
+
 from src.digital_twin.battery_models.generic_models import ElectricalModel
 from src.digital_twin.battery_models.electrical.ecm_components import Resistor
 from src.digital_twin.battery_models.electrical.ecm_components import ResistorCapacitorParallel
 from src.digital_twin.battery_models.electrical.ecm_components import OCVGenerator
-from src.digital_twin.parameters import instantiate_variables
+from src.digital_twin.parameters import Scalar, instantiate_variables
+from src.utils.recurrences import linear_recurrence
 
 
 class FirstOrderThevenin(ElectricalModel):
@@ -12,6 +15,7 @@ class FirstOrderThevenin(ElectricalModel):
     def __init__(self,
                  components_settings: dict,
                  sign_convention='active',
+                 series_capacity=None,
                  **kwargs
                  ):
         """
@@ -19,20 +23,24 @@ class FirstOrderThevenin(ElectricalModel):
         Args:
             components_settings ():
             sign_convention ():
+            series_capacity (int, None): number of past values retained by each collection (all of them if None)
             **kwargs ():
         """
-        super().__init__(name='First Order Thevenin')
+        super().__init__(name='First Order Thevenin', series_capacity=series_capacity)
         self._sign_convention = sign_convention
 
         self._init_components = instantiate_variables(components_settings)
 
-        self.r0 = Resistor(name='R0', resistance=self._init_components['r0'])
-        self.rc = ResistorCapacitorParallel(name='RC', resistance=self._init_components['r1'], capacity=self._init_components['c'])
-        self.ocv_gen = OCVGenerator(name='OCV', ocv_potential=self._init_components['v_ocv'])
+        self.r0 = Resistor(name='R0', resistance=self._init_components['r0'],
+                           series_capacity=series_capacity)
+        self.rc = ResistorCapacitorParallel(name='RC', resistance=self._init_components['r1'], capacity=self._init_components['c'],
+                                            series_capacity=series_capacity)
+        self.ocv_gen = OCVGenerator(name='OCV', ocv_potential=self._init_components['v_ocv'],
+                                    series_capacity=series_capacity)
 
     def reset_model(self, **kwargs):
-        self._v_load_series = []
-        self._i_load_series = []
+        self._v_load_series = self._new_series()
+        self._i_load_series = self._new_series()
         self.r0.reset_data()
         self.rc.reset_data()
         self.ocv_gen.reset_data()
@@ -179,6 +187,67 @@ class FirstOrderThevenin(ElectricalModel):
         else:
             return self.step_current_driven(i_load=p_load / self._v_load_series[-1], dt=dt, k=k, p_load=p_load)
 
+    @property
+    def is_fusable(self):
+        """
+        The whole profile can be solved at once only if parameters don't depend on the state of the battery
+        """
+        return all(isinstance(var, Scalar) for var in self._init_components.values())
+
+    def solve_current_profile(self, i_load, dt):
+        """
+        CC mode over a whole profile: since parameters are constant, V_rc is a first order linear recurrence that
+        is solved at once instead of step by step. Results are equal to the ones of step_current_driven applied
+        to each sample of the profile.
+
+        Args:
+            i_load (np.ndarray): current applied at each step
+            dt (np.ndarray): delta of time of each step
+        """
+        n = len(i_load)
+        r0 = self.r0.resistance
+        r1 = self.rc.resistance
+        c = self.rc.capacity
+        v_ocv = self.ocv_gen.ocv_potential
+
+        i_load = np.asarray(i_load, dtype=float)
+        if self._sign_convention == 'passive':
+            i_load = -i_load
+
+        # V_rc[k] = (V_rc[k-1] / dt + I / c) / (1/dt + 1/(c*r1))
+        denominator = 1/dt + 1 / (c*r1)
+        v_r0 = i_load * r0
+        v_rc = linear_recurrence(alpha=(1/dt) / denominator, beta=(i_load / c) / denominator,
+                                 y0=self.rc.get_v_series(k=-1))
+        v = v_ocv - v_r0 - v_rc
+
+        i_r1 = v_rc / r1
+        i_c = i_load - i_r1
+
+        power = v * i_load
+        if self._sign_convention == 'passive':
+            power = -power
+
+        # Update the collections of variables of ECM components
+        self.r0.extend_step_variables(r0=np.full(n, r0), v_r0=v_r0)
+        self.rc.extend_step_variables(r=np.full(n, r1), c=np.full(n, c), v_rc=v_rc, i_r=i_r1, i_c=i_c)
+        self.ocv_gen.extend_v(np.full(n, v_ocv))
+        self.extend_v_load(v)
+        self.extend_i_load(i_load)
+        self.extend_power(power)
+
+        return {'voltage': v,
+                'current': i_load,
+                'power': power,
+                'v_oc': np.full(n, v_ocv),
+                'r0': np.full(n, r0),
+                'r1': np.full(n, r1),
+                'c': np.full(n, c),
+                'v_r0': v_r0,
+                'v_rc': v_rc,
+                'dissipated_heat': r0 * i_load**2 + r1 * i_r1**2
+                }
+
     def compute_generated_heat(self, k=-1):
         """
         Compute the generated heat that can be used to feed the thermal model (when required).
@@ -217,6 +286,7 @@ class SecondOrderThevenin(ElectricalModel):
     def __init__(self,
                  components_settings: dict,
                  sign_convention='active',
+                 series_capacity=None,
                  **kwargs
                  ):
         """
@@ -224,21 +294,26 @@ class SecondOrderThevenin(ElectricalModel):
         Args:
             components_settings ():
             sign_convention ():
+            series_capacity (int, None): number of past values retained by each collection (all of them if None)
             **kwargs ():
         """
-        super().__init__(name='Second Order Thevenin')
+        super().__init__(name='Second Order Thevenin', series_capacity=series_capacity)
         self._sign_convention = sign_convention
 
         self._init_components = instantiate_variables(components_settings)
 
-        self.r0 = Resistor(name='R0', resistance=self._init_components['r0'])
-        self.rc1 = ResistorCapacitorParallel(name='RC1', resistance=self._init_components['r1'], capacity=self._init_components['c1'])
-        self.rc2 = ResistorCapacitorParallel(name='RC2', resistance=self._init_components['r2'], capacity=self._init_components['c2'])
-        self.ocv_gen = OCVGenerator(name='OCV', ocv_potential=self._init_components['v_ocv'])
+        self.r0 = Resistor(name='R0', resistance=self._init_components['r0'],
+                           series_capacity=series_capacity)
+        self.rc1 = ResistorCapacitorParallel(name='RC1', resistance=self._init_components['r1'], capacity=self._init_components['c1'],
+                                             series_capacity=series_capacity)
+        self.rc2 = ResistorCapacitorParallel(name='RC2', resistance=self._init_components['r2'], capacity=self._init_components['c2'],
+                                             series_capacity=series_capacity)
+        self.ocv_gen = OCVGenerator(name='OCV', ocv_potential=self._init_components['v_ocv'],
+                                    series_capacity=series_capacity)
 
     def reset_model(self, **kwargs):
-        self._v_load_series = []
-        self._i_load_series = []
+        self._v_load_series = self._new_series()
+        self._i_load_series = self._new_series()
         self.r0.reset_data()
         self.rc1.reset_data()
         self.rc2.reset_data()
@@ -409,6 +484,78 @@ class SecondOrderThevenin(ElectricalModel):
         else:
             return self.step_current_driven(i_load=p_load / self._v_load_series[-1], dt=dt, k=k, p_load=p_load)
 
+    @property
+    def is_fusable(self):
+        """
+        The whole profile can be solved at once only if parameters don't depend on the state of the battery
+        """
+        return all(isinstance(var, Scalar) for var in self._init_components.values())
+
+    def solve_current_profile(self, i_load, dt):
+        """
+        CC mode over a whole profile: since parameters are constant, V_rc1 and V_rc2 are first order linear
+        recurrences that are solved at once instead of step by step. Results are equal to the ones of
+        step_current_driven applied to each sample of the profile.
+
+        Args:
+            i_load (np.ndarray): current applied at each step
+            dt (np.ndarray): delta of time of each step
+        """
+        n = len(i_load)
+        r0 = self.r0.resistance
+        r1 = self.rc1.resistance
+        c1 = self.rc1.capacity
+        r2 = self.rc2.resistance
+        c2 = self.rc2.capacity
+        v_ocv = self.ocv_gen.ocv_potential
+
+        i_load = np.asarray(i_load, dtype=float)
+        if self._sign_convention == 'passive':
+            i_load = -i_load
+
+        # V_rc[k] = (V_rc[k-1] / dt + I / c) / (1/dt + 1/(c*r)) for both the RC parallels
+        denominator_1 = 1/dt + 1 / (c1 * r1)
+        denominator_2 = 1/dt + 1 / (c2 * r2)
+        v_r0 = i_load * r0
+        v_rc1 = linear_recurrence(alpha=(1/dt) / denominator_1, beta=(i_load / c1) / denominator_1,
+                                  y0=self.rc1.get_v_series(k=-1))
+        v_rc2 = linear_recurrence(alpha=(1/dt) / denominator_2, beta=(i_load / c2) / denominator_2,
+                                  y0=self.rc2.get_v_series(k=-1))
+        v = v_ocv - v_r0 - v_rc1 - v_rc2
+
+        i_r1 = v_rc1 / r1
+        i_r2 = v_rc2 / r2
+        i_c1 = i_load - i_r1
+        i_c2 = i_load - i_r2
+
+        power = v * i_load
+        if self._sign_convention == 'passive':
+            power = -power
+
+        # Update the collections of variables of ECM components
+        self.r0.extend_step_variables(r0=np.full(n, r0), v_r0=v_r0)
+        self.rc1.extend_step_variables(r=np.full(n, r1), c=np.full(n, c1), v_rc=v_rc1, i_r=i_r1, i_c=i_c1)
+        self.rc2.extend_step_variables(r=np.full(n, r2), c=np.full(n, c2), v_rc=v_rc2, i_r=i_r2, i_c=i_c2)
+        self.ocv_gen.extend_v(np.full(n, v_ocv))
+        self.extend_v_load(v)
+        self.extend_i_load(i_load)
+        self.extend_power(power)
+
+        return {'voltage': v,
+                'current': i_load,
+                'power': power,
+                'v_oc': np.full(n, v_ocv),
+                'r0': np.full(n, r0),
+                'r1': np.full(n, r1),
+                'c1': np.full(n, c1),
+                'r2': np.full(n, r2),
+                'c2': np.full(n, c2),
+                'v_r0': v_r0,
+                'v_rc1': v_rc1,
+                'v_rc2': v_rc2,
+                'dissipated_heat': r0 * i_load**2 + r1 * i_r1**2 + r2 * i_r2**2
+                }
+
     def compute_generated_heat(self, k=-1):
         """
         Compute the generated heat that can be used to feed the thermal model (when required).
@@ -1,3 +1,7 @@
+from src.digital_twin.parameters.variables import Scalar
+from src.utils.series_buffer import SeriesBuffer
+
+
 class ECMComponent:
     """
     Generic component of Thevenin equivalent circuits.
@@ -7,26 +11,34 @@ class ECMComponent:
     :param name: identifier of the component
     :type name: str
 
+    :param series_capacity: number of past values retained by each collection (all of them if None)
+    :type series_capacity: int or None
+
     Attributes
     ----------
     _v_series: collection of all the past component voltages
     _t_series: collection of all the past discrete steps of time
+    _params_snapshot: parameters evaluated for the current state (temp, soc, soh) of the component
 
     Purpose
     -------
     This class builds a generic component of the Thevenin equivalent circuit and presents common attributes and
     collections that can be useful in each single element of the circuit (Resistor, RCParallel, V_OCV generator).
     """
-    def __init__(self, name):
+    def __init__(self, name, series_capacity=None):
         self._name = name
+        self._series_capacity = series_capacity
 
         # Dependency variable of components
         self._temp = None
         self._soc = None
         self._soh = None
 
+        # Parameters are evaluated once for each state of the component
+        self._params_snapshot = {}
+
         # Collections related to the specific component
-        self._v_series = []
+        self._v_series = self._new_series()
 
     @property
     def name(self):
@@ -46,6 +58,8 @@ class ECMComponent:
 
     @temp.setter
     def temp(self, value: float):
+        if value != self._temp:
+            self._params_snapshot = {}
         self._temp = value
 
     @soc.setter
@@ -53,6 +67,8 @@ class ECMComponent:
         assert 0 <= value <= 1, \
             "The value of the State of Charge (SoC) passed to {} is wrong. " \
             "It has to be comprised between 0 and 1. The current value is {}.".format(self.name, value)
+        if value != self._soc:
+            self._params_snapshot = {}
         self._soc = value
 
     @soh.setter
@@ -60,8 +76,38 @@ class ECMComponent:
         assert 0 <= value <= 1, \
             "The value of the State of Health (SoH) passed to {} is wrong. " \
             "It has to be comprised between 0 and 1. The current value is {}.".format(self.name, value)
+        if value != self._soh:
+            self._params_snapshot = {}
         self._soh = value
 
+    def _get_param_value(self, label: str, param):
+        """
+        Evaluate a parameter of the component for its current state. Depending on the x_names (inputs of the
+        function), we retrieve components attribute among {SoC, SoH, Temp}: the value is stored in the snapshot
+        of parameters, so that it is computed only once until the state of the component changes.
+
+        Args:
+            label (str): name of the parameter
+            param (Scalar, ParametricFunction, LookupTableFunction): variable describing the parameter
+        """
+        if label not in self._params_snapshot:
+            input_vars = {}
+
+            if not isinstance(param, Scalar):
+                try:
+                    input_vars = {name: getattr(self, name) for name in param.x_names}
+                except:
+                    raise Exception("Cannot retrieve required input variables to compute {} for {}!"
+                                    .format(label, self.name))
+
+            self._params_snapshot[label] = param.get_value(input_vars=input_vars)
+
+        return self._params_snapshot[label]
+
+    def _set_param_value(self, param, new_value):
+        param.set_value(new_value)
+        self._params_snapshot = {}
+
     def get_v_series(self, k=None):
         """
         Getter of the specific value at step K, if specified, otherwise of the entire collection
@@ -76,8 +122,11 @@ class ECMComponent:
                 raise IndexError("Voltage V of {} at step K not computed yet".format(self._name))
         return self._v_series
 
+    def _new_series(self):
+        return SeriesBuffer(capacity=self._series_capacity)
+
     def reset_data(self):
-        self._v_series = []
+        self._v_series = self._new_series()
 
     def init_component(self, v=0):
         self.update_v(v)
@@ -85,4 +134,7 @@ class ECMComponent:
     def update_v(self, value: float):
         self._v_series.append(value)
 
+    def extend_v(self, values: list):
+        self._v_series.extend(values)
+
 
@@ -15,26 +15,18 @@ class OCVGenerator(ECMComponent):
     def __init__(self,
                  name,
                  ocv_potential: Union[Scalar, ParametricFunction, LookupTableFunction],
+                 series_capacity: int = None
                  ):
-        super().__init__(name, )
+        super().__init__(name, series_capacity=series_capacity)
         self._ocv_potential = ocv_potential
 
     @property
     def ocv_potential(self):
-        input_vars = {}
-
-        if not isinstance(self._ocv_potential, Scalar):
-            try:
-                input_vars = {name: getattr(self, name) for name in self._ocv_potential.x_names}
-            except:
-                raise Exception(
-                    "Cannot retrieve required input variables to compute resistance for {}!".format(self.name))
-
-        return self._ocv_potential.get_value(input_vars=input_vars)
+        return self._get_param_value('ocv potential', self._ocv_potential)
 
     @ocv_potential.setter
     def ocv_potential(self, new_value):
-        self._ocv_potential.set_value(new_value)
+        self._set_param_value(self._ocv_potential, new_value)
 
     def init_component(self, v=None):
         """
@@ -19,8 +19,9 @@ class ResistorCapacitorParallel(ECMComponent):
                  name,
                  resistance: Union[Scalar, ParametricFunction, LookupTableFunction],
                  capacity: Union[Scalar, ParametricFunction, LookupTableFunction],
+                 series_capacity: int = None
                  ):
-        super().__init__(name)
+        super().__init__(name, series_capacity=series_capacity)
         self._resistance = resistance
         self._capacity = capacity
         self._tau = 0
@@ -30,11 +31,11 @@ class ResistorCapacitorParallel(ECMComponent):
         # self.n_c = n_c
 
         # Collections
-        self._i_r_series = []
-        self._i_c_series = []
-        self._r_series = []
-        self._c_series = []
-        self._tau_series = []
+        self._i_r_series = self._new_series()
+        self._i_c_series = self._new_series()
+        self._r_series = self._new_series()
+        self._c_series = self._new_series()
+        self._tau_series = self._new_series()
 
     @property
     def resistance(self):
@@ -43,16 +44,7 @@ class ResistorCapacitorParallel(ECMComponent):
         among {SoC, SoH, Temp}.
         If R1 is a scalar, we don't need to provide any input.
         """
-        input_vars = {}
-
-        if not isinstance(self._resistance, Scalar):
-            try:
-                input_vars = {name: getattr(self, name) for name in self._resistance.x_names}
-            except:
-                raise Exception(
-                    "Cannot retrieve required input variables to compute resistance for {}!".format(self.name))
-
-        return self._resistance.get_value(input_vars=input_vars)
+        return self._get_param_value('resistance', self._resistance)
 
     @property
     def capacity(self):
@@ -61,25 +53,15 @@ class ResistorCapacitorParallel(ECMComponent):
         among {SoC, SoH, Temp}.
         If C is a scalar, we don't need to provide any input.
         """
-        input_vars = {}
-
-        if not isinstance(self._capacity, Scalar):
-            try:
-                input_vars = {name: getattr(self, name) for name in self._capacity.x_names}
-            except:
-                raise Exception(
-                    "Cannot retrieve required input variables to compute capacity for {}!".format(self.name))
-
-        return self._capacity.get_value(input_vars=input_vars)
+        return self._get_param_value('capacity', self._capacity)
 
     @resistance.setter
     def resistance(self, new_value):
-        self._resistance.set_value(new_value)
-        print()
+        self._set_param_value(self._resistance, new_value)
 
     @capacity.setter
     def capacity(self, new_value):
-        self._capacity.set_value(new_value)
+        self._set_param_value(self._capacity, new_value)
 
     def get_r_series(self, k=None):
         """
@@ -138,12 +120,12 @@ class ResistorCapacitorParallel(ECMComponent):
         return self._i_c_series
 
     def reset_data(self):
-        self._v_series = []
-        self._i_r_series = []
-        self._i_c_series = []
-        self._r_series = []
-        self._c_series = []
-        self._tau_series = []
+        self._v_series = self._new_series()
+        self._i_r_series = self._new_series()
+        self._i_c_series = self._new_series()
+        self._r_series = self._new_series()
+        self._c_series = self._new_series()
+        self._tau_series = self._new_series()
 
     def init_component(self, r=None, c=None, i_c=0, i_r=0, v_rc=None):
         """
@@ -234,3 +216,13 @@ class ResistorCapacitorParallel(ECMComponent):
         self._update_i_r_series(i_r)
         self._update_i_c_series(i_c)
 
+    def extend_step_variables(self, r: list, c: list, v_rc: list, i_r: list, i_c: list):
+        """
+        Extend the collections of variables with the results of several steps computed at once
+        """
+        self._r_series.extend(r)
+        self._c_series.extend(c)
+        self.extend_v(v_rc)
+        self._i_r_series.extend(i_r)
+        self._i_c_series.extend(i_c)
+
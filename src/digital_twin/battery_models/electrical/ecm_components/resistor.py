@@ -19,11 +19,12 @@ class Resistor(ECMComponent):
     def __init__(self,
                  name: str,
                  resistance: Union[Scalar, ParametricFunction, LookupTableFunction],
+                 series_capacity: int = None
                  ):
-        super().__init__(name)
+        super().__init__(name, series_capacity=series_capacity)
         self._resistance = resistance
         # Collections
-        self._r0_series = []
+        self._r0_series = self._new_series()
 
     @property
     def resistance(self):
@@ -32,23 +33,15 @@ class Resistor(ECMComponent):
         among {SoC, SoH, Temp}.
         If R0 is a scalar, we don't need to provide any input.
         """
-        input_vars = {}
-
-        if not isinstance(self._resistance, Scalar):
-            try:
-                input_vars = {name: getattr(self, name) for name in self._resistance.x_names}
-            except:
-                raise Exception("Cannot retrieve required input variables to compute resistance for {}!".format(self.name))
-
-        return self._resistance.get_value(input_vars=input_vars)
+        return self._get_param_value('resistance', self._resistance)
 
     @resistance.setter
     def resistance(self, new_value):
-        self._resistance.set_value(new_value)
+        self._set_param_value(self._resistance, new_value)
 
     def reset_data(self):
-        self._v_series = []
-        self._r0_series = []
+        self._v_series = self._new_series()
+        self._r0_series = self._new_series()
 
     def init_component(self, v=None, r0=None):
         """
@@ -112,3 +105,10 @@ class Resistor(ECMComponent):
         self._update_r0_series(r0)
         self.update_v(v_r0)
 
+    def extend_step_variables(self, r0: list, v_r0: list):
+        """
+        Extend the collections of variables with the results of several steps computed at once
+        """
+        self._r0_series.extend(r0)
+        self.extend_v(v_r0)
+
@@ -1,6 +1,8 @@
 import abc
 from abc import ABCMeta
 
+from src.utils.series_buffer import SeriesBuffer
+
 
 class GenericModel(metaclass=ABCMeta):
     """
@@ -39,12 +41,13 @@ class ElectricalModel(GenericModel):
     """
 
     """
-    def __init__(self, name: str):
+    def __init__(self, name: str, series_capacity: int = None):
         self._name = name
         self._params = []
-        self._v_load_series = []
-        self._i_load_series = []
-        self._power_series = []
+        self._series_capacity = series_capacity
+        self._v_load_series = self._new_series()
+        self._i_load_series = self._new_series()
+        self._power_series = self._new_series()
         # self._times = []
 
     @property
@@ -54,6 +57,19 @@ class ElectricalModel(GenericModel):
     @property
     def param_names(self):
         return self._params
+
+    def _new_series(self):
+        """
+        Collection of a variable of the model, which keeps only the last values if a series capacity is given
+        """
+        return SeriesBuffer(capacity=self._series_capacity)
+
+    @property
+    def is_fusable(self):
+        """
+        Whether the model can solve a whole current profile at once (see solve_current_profile)
+        """
+        return False
     
     def reset_model(self, **kwargs):
         pass
@@ -130,6 +146,15 @@ class ElectricalModel(GenericModel):
     def update_power(self, value: float):
         self._power_series.append(value)
 
+    def extend_v_load(self, values: list):
+        self._v_load_series.extend(values)
+
+    def extend_i_load(self, values: list):
+        self._i_load_series.extend(values)
+
+    def extend_power(self, values: list):
+        self._power_series.extend(values)
+
     # def update_times(self, value:int):
     #     if self.units_checker:
     #         self._times.append(check_data_unit(value, Unit.SECOND))
@@ -151,6 +176,13 @@ class ThermalModel(GenericModel):
     def name(self):
         return self._name
 
+    @property
+    def is_fusable(self):
+        """
+        Whether the model can compute the temperature of a whole profile at once (see compute_temp_profile)
+        """
+        return False
+
     def reset_model(self, **kwargs):
         pass
 
@@ -163,6 +195,9 @@ class ThermalModel(GenericModel):
     def compute_temp(self, **kwargs):
         pass
 
+    def compute_temp_profile(self, **kwargs):
+        raise NotImplementedError
+
     def get_results(self, **kwargs):
         """
         Returns a dictionary with all final results
@@ -206,6 +241,12 @@ class ThermalModel(GenericModel):
     def update_heat(self, value: float):
         self._heat_series.append(value)
 
+    def extend_temp(self, values: list):
+        self._temp_series.extend(values)
+
+    def extend_heat(self, values: list):
+        self._heat_series.extend(values)
+
 
 class AgingModel(GenericModel):
     """
@@ -231,6 +272,19 @@ class AgingModel(GenericModel):
     def compute_degradation(self, **kwargs):
         pass
 
+    def get_cyclic_damage(self):
+        """
+        Cumulative damage caused by cycling up to the last computation of the degradation.
+        """
+        raise NotImplementedError
+
+    def add_cyclic_damage(self, value: float):
+        """
+        Add the damage of cycles that haven't been simulated (e.g. extrapolated by an accelerated aging study), which
+        is considered from the next computation of the degradation.
+        """
+        raise NotImplementedError
+
     def get_results(self, **kwargs):
         pass
 
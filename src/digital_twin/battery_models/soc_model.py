@@ -1,6 +1,12 @@
+import numpy as np
+
+from src.utils.recurrences import clipped_cumsum
+
+
 class SOCEstimator:
     """
-
+    Estimator of the State of Charge. The SoC can be either a scalar or an array, with an entry for each
+    battery of a fleet simulated by a batched model.
     """
     def __init__(self, 
                  capacity: float,
@@ -50,10 +56,26 @@ class SOCEstimator:
 
         return self._soc
 
+    def compute_soc_profile(self, soc_, i, dt):
+        """
+        Coulomb Counting over a whole profile, cropping the SoC at each step as compute_soc does
+        """
+        if self._estimation_mode == "CC":
+            soc = clipped_cumsum(np.asarray(i) / (self._c_max * 3600) * dt, y0=soc_, low=0, high=1)
+            self._soc = soc[-1]
+        else:
+            raise Exception("Required mode for SoC estimation not existing or not implemented yet.")
+
+        return soc
+
     def crop_soc(self):
         """
 
         """
+        if np.ndim(self._soc) > 0:
+            self._soc = np.clip(self._soc, 0, 1)
+            return
+
         if self._soc < 0:
             self._soc = 0
 
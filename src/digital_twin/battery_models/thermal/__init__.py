@@ -1,5 +1,11 @@
 from .dummy import DummyThermal
 from .rc import RCThermal
 from .r2c import R2CThermal
-from .mlp_network import MLPThermal
 
+
+def __getattr__(name: str):
+    # The MLP model depends on torch, which is imported only when the model is actually used
+    if name == 'MLPThermal':
+        from .mlp_network import MLPThermal
+        return MLPThermal
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
@@ -1,3 +1,5 @@
+import numpy as np
+
 from src.digital_twin.battery_models.generic_models import ThermalModel
 
 
@@ -34,4 +36,17 @@ class DummyThermal(ThermalModel):
         assert kwargs['ground_temp'] is not None, "The '{}' model needs the ground temperature to compute " \
             "the battery temperature. If you are running a scheduled simulation or a cyclic " \
             "driven simulation, you should adopt a different thermal model.".format(self.name)
-        return kwargs['ground_temp']
\ No newline at end of file
+        return kwargs['ground_temp']
+
+    @property
+    def is_fusable(self):
+        return True
+
+    def compute_temp_profile(self, **kwargs):
+        """
+        Copy the ground temperature of a whole profile
+        """
+        assert kwargs['ground_temp'] is not None and not np.isnan(kwargs['ground_temp']).any(), \
+            "The '{}' model needs the ground temperature to compute the battery temperature at each step of the " \
+            "profile.".format(self.name)
+        return np.asarray(kwargs['ground_temp'], dtype=float)
@@ -1,74 +1,102 @@
-import pandas as pd
+from collections import deque
 
-from src.digital_twin.battery_models.generic_models import ThermalModel
-import joblib
-import torch
-import torch.nn as nn
 import numpy as np
-from torch.utils.data import DataLoader, Dataset, ConcatDataset
+
+from src.digital_twin.battery_models.generic_models import ThermalModel
 
 
-class MLPThermal(ThermalModel):
+def load_torch_weights(model_state: str):
+    """
+    Load the weights of the linear layers from a state dict of the torch RegressionModel (layers.<i>.weight and
+    layers.<i>.bias), sorted by layer.
+
+    Args:
+        model_state (str): path of the state dict saved with torch.save()
+
+    Returns: the lists of weight matrices and of bias vectors, as float64 numpy arrays
+    """
+    try:
+        import torch
+    except ImportError:
+        raise Exception("torch is required to load the state dict '{}': export it once with "
+                        "MLPThermal.save_weights() and set the '.npz' file as 'model_state'.".format(model_state))
+
+    state = torch.load(model_state, map_location='cpu')
+    layers = sorted({int(key.split('.')[1]) for key in state.keys()})
+    weights = [state['layers.{}.weight'.format(i)].double().numpy() for i in layers]
+    biases = [state['layers.{}.bias'.format(i)].double().numpy() for i in layers]
+    return weights, biases
+
+
+def fuse_scaler(weights: list, biases: list, scaler):
+    """
+    Fold the feature scaling into the first layer of the network. The scalers of sklearn employed for the inputs
+    (MinMaxScaler, StandardScaler) transform each feature as x * a + b, hence W @ (x * a + b) + c is computed as
+    (W * a) @ x + (W @ b + c).
+
+    Args:
+        weights (list): weight matrices of the layers
+        biases (list): bias vectors of the layers
+        scaler: fitted sklearn scaler of the inputs
     """
+    n_features = weights[0].shape[1]
+    offset = scaler.transform(np.zeros((1, n_features)))[0]
+    scale = scaler.transform(np.ones((1, n_features)))[0] - offset
 
+    weights, biases = list(weights), list(biases)
+    biases[0] = biases[0] + weights[0] @ offset
+    weights[0] = weights[0] * scale
+    return weights, biases
+
+
+class MLPThermal(ThermalModel):
     """
-    class SimpleDataset(Dataset):
-        def __init__(self, x, y):
-            super().__init__()
-            self.x = x
-            self.y = y
-
-        def __len__(self):
-            return len(self.x)
-
-        def __getitem__(self, idx):
-            return self.x[idx], self.y[idx]
-
-    # Define the neural network model
-    class RegressionModel(nn.Module):
-
-        def __init__(self, input_size, hidden_size, output_size):
-            super().__init__()
-            self.layers = nn.Sequential(
-                nn.Linear(input_size, hidden_size),
-                nn.ReLU(),
-                nn.Linear(hidden_size, hidden_size),
-                nn.ReLU(),
-                nn.Linear(hidden_size, output_size)
-            )
-
-        def forward(self, x):
-            return self.layers(x)
+    Data-driven thermal model, where the temperature of the battery is predicted by a multilayer perceptron with ReLU
+    activations from the current, the dissipated heat, the ambient temperature and the rolling mean of the last 25
+    ground temperatures.
 
+    The network is trained with torch, but inference runs on numpy: the weights of the state dict are loaded at
+    init, with the scaler of the inputs folded into the first layer. The weights can be saved to a '.npz' file
+    (see save_weights()) and used as 'model_state', so that neither torch nor the scaler are needed.
+    """
     def __init__(self, components_settings: dict, **kwargs):
         super().__init__(name='MLP_thermal')
         self._settings = components_settings
-        self._ground_temps = []
-        
-        #if 'ground_temps' in kwargs:
-        #    self._ground_temps = kwargs['ground_temps']
-        #    self._rolling_25 = pd.Series(self._ground_temps).rolling(window=25, min_periods=1).mean()
-        #else:
-        #    raise AttributeError("The parameter to initialize the attribute of DummyThermal has not benn passed!")
+        # Window of the last ground temperatures, with their running sum
+        self._ground_temps = deque(maxlen=25)
+        self._ground_sum = 0.
+        self._n_ground_temps = 0
 
         self._soc = None
 
-        self._device = torch.device(
-            "cuda" if torch.cuda.is_available() and self._settings['cuda'] else
-            "mps" if torch.backends.mps.is_available() and self._settings['cuda'] else "cpu")
+        if self._settings['model_state'].endswith('.npz'):
+            with np.load(self._settings['model_state']) as data:
+                n_layers = len(data.files) // 2
+                self._weights = [data['weight_{}'.format(i)] for i in range(n_layers)]
+                self._biases = [data['bias_{}'.format(i)] for i in range(n_layers)]
+        else:
+            import joblib
+            weights, biases = load_torch_weights(self._settings['model_state'])
+            self._weights, self._biases = fuse_scaler(weights, biases, scaler=joblib.load(self._settings['scaler']))
 
-        self._model = self.RegressionModel(input_size=self._settings['input_size'],
-                                           hidden_size=self._settings['hidden_size'],
-                                           output_size=self._settings['output_size']
-                                           ).to(self._device)
-
-        self._model.load_state_dict(torch.load(self._settings['model_state']))
-        self._scaler = joblib.load(self._settings['scaler'])
+        if self._weights[0].shape[1] != self._settings['input_size'] or \
+                self._weights[-1].shape[0] != self._settings['output_size']:
+            raise Exception("The weights of the MLP thermal model do not match the given input and output sizes!")
 
     @property
     def soc(self):
         return self._soc
 
+    def save_weights(self, file: str):
+        """
+        Save the weights of the network, with the scaler of the inputs already folded in, to a '.npz' file.
+
+        Args:
+            file (str): path of the '.npz' file
+        """
+        np.savez(file, **{'weight_{}'.format(i): w for i, w in enumerate(self._weights)},
+                 **{'bias_{}'.format(i): b for i, b in enumerate(self._biases)})
+
     def reset_model(self, **kwargs):
         self._temp_series = []
 
@@ -85,27 +113,40 @@ class MLPThermal(ThermalModel):
     def load_battery_state(self, **kwargs):
         self._soc = kwargs['soc']
 
-    def compute_temp(self, **kwargs):
+    def predict(self, inputs):
         """
+        Forward pass of the network on unscaled inputs.
 
+        Args:
+            inputs (np.ndarray): inputs of the network, with shape (input_size,) or (n_samples, input_size)
         """
-        self._ground_temps.append(kwargs['ground_temp'])
-        rolling_25 = np.mean(self._ground_temps[-25:])
-        #rolling_25 = np.mean(self._ground_temps[-25 + kwargs['k'] : kwargs['k']])
-        inputs = [kwargs['i'],  kwargs['q'], kwargs['T_amb'], rolling_25]
-
-        inputs = self._scaler.transform(np.array(inputs).reshape(1, -1))
-        inputs = torch.tensor(inputs, dtype=torch.float32, device=self._device)
+        x = np.asarray(inputs, dtype=float)
+        for weight, bias in zip(self._weights[:-1], self._biases[:-1]):
+            x = np.maximum(x @ weight.T + bias, 0.)
+        return x @ self._weights[-1].T + self._biases[-1]
 
-        #print(inputs)
-
-        with torch.no_grad():
-            # Generate prediction
-            prediction = self._model(inputs).squeeze().tolist()
-            #print(prediction)
+    def _rolling_ground_temp(self, ground_temp: float):
+        """
+        Mean of the window of the last ground temperatures after adding the given one. The running sum is updated
+        with the new temperature and the evicted one, and computed again from the window each time the window is
+        renewed, so that rounding errors don't accumulate.
+        """
+        if len(self._ground_temps) == self._ground_temps.maxlen:
+            self._ground_sum -= self._ground_temps[0]
+        self._ground_temps.append(ground_temp)
+        self._ground_sum += ground_temp
 
-        return prediction
+        self._n_ground_temps += 1
+        if self._n_ground_temps % self._ground_temps.maxlen == 0:
+            self._ground_sum = sum(self._ground_temps)
 
+        return self._ground_sum / len(self._ground_temps)
 
+    def compute_temp(self, **kwargs):
+        """
 
+        """
+        rolling_25 = self._rolling_ground_temp(kwargs['ground_temp'])
+        inputs = [kwargs['i'],  kwargs['q'], kwargs['T_amb'], rolling_25]
 
+        return self.predict(inputs).squeeze().tolist()
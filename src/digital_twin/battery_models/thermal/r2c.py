@@ -1,5 +1,8 @@
+import numpy as np
+
 from src.digital_twin.battery_models.generic_models import ThermalModel
-from src.digital_twin.parameters import Scalar, instantiate_variables
+from src.digital_twin.parameters import Scalar, LookupTableFunction, instantiate_variables
+from src.utils.recurrences import linear_recurrence
 
 
 class R2CThermal(ThermalModel):
@@ -108,5 +111,37 @@ class R2CThermal(ThermalModel):
         t_surf = t_core + self.r_cond * (T_amb - t_core) / (self.r_cond + self.r_conv)
 
         return t_surf
-    
 
+    @property
+    def is_fusable(self):
+        """
+        The whole profile can be solved at once if parameters are constant or depend on the SoC only
+        """
+        return all(isinstance(var, Scalar) or (isinstance(var, LookupTableFunction) and list(var.x_names) == ['soc'])
+                   for var in [self._c_term, self._r_cond, self._r_conv, self._dv_dT])
+
+    def compute_temp_profile(self, q, i, T_amb, dt, soc, **kwargs):
+        """
+        Compute the temperature of a whole profile at once. The surface temperature is an affine function of the
+        core one, so the equation of compute_temp is a first order linear recurrence on the surface temperature.
+
+        Args:
+            q (np.ndarray): power dissipated adopted as heat at each step
+            i (np.ndarray): actual current in the circuit at each step
+            T_amb (float): ambient temperature
+            dt (np.ndarray): delta of time of each step
+            soc (np.ndarray): SoC of the battery at the beginning of each step
+        """
+        c_term = self._c_term.get_values(input_vars={'soc': soc})
+        r_cond = self._r_cond.get_values(input_vars={'soc': soc})
+        r_conv = self._r_conv.get_values(input_vars={'soc': soc})
+        dv_dT = self._dv_dT.get_values(input_vars={'soc': soc})
+
+        denominator = c_term / dt + 1 / (r_cond + r_conv) - dv_dT * np.asarray(i)
+        surf_ratio = 1 - r_cond / (r_cond + r_conv)
+
+        # T_surf[k] = surf_ratio * T_core[k] + (1 - surf_ratio) * T_amb, with T_core[k] depending on T_surf[k-1]
+        return linear_recurrence(alpha=surf_ratio * c_term / dt / denominator,
+                                 beta=surf_ratio * (T_amb / (r_cond + r_conv) + np.asarray(q)) / denominator
+                                      + (1 - surf_ratio) * T_amb,
+                                 y0=self.get_temp_series(k=-1))
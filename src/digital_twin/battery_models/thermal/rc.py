@@ -1,5 +1,8 @@
+import numpy as np
+
 from src.digital_twin.battery_models.generic_models import ThermalModel
 from src.digital_twin.parameters import Scalar, instantiate_variables
+from src.utils.recurrences import linear_recurrence
 
 
 class RCThermal(ThermalModel):
@@ -67,3 +70,25 @@ class RCThermal(ThermalModel):
         term_3 = T_amb * dt
 
         return (term_1 + term_2 + term_3) / (self.r_term * self.c_term + dt)
+
+    @property
+    def is_fusable(self):
+        return isinstance(self._r_term, Scalar) and isinstance(self._c_term, Scalar)
+
+    def compute_temp_profile(self, q, T_amb, dt, **kwargs):
+        """
+        Compute the temperature of a whole profile at once, solving the equation of compute_temp as a first order
+        linear recurrence.
+
+        Inputs:
+        :param q: power dissipated adopted as heat at each step
+        :param T_amb: ambient temperature
+        :param dt: delta of time of each step
+        """
+        r_term = self.r_term
+        c_term = self.c_term
+        denominator = r_term * c_term + dt
+
+        return linear_recurrence(alpha=r_term * c_term / denominator,
+                                 beta=(np.asarray(q) * r_term * dt + T_amb * dt) / denominator,
+                                 y0=self.get_temp_series(k=-1))
@@ -1,4 +1,13 @@
-from .battery_models import *
+import logging
+import numpy as np
+
+from .battery_models import get_model_class
+from .battery_models.soc_model import SOCEstimator
+from .battery_models.aging.worker import AgingWorker
+from src.utils.running_stats import RunningMean
+from src.utils.step_recorder import StepRecorder
+
+logger = logging.getLogger('ErNESTO-DT')
 
 
 class BatteryEnergyStorageSystem:
@@ -45,6 +54,12 @@ class BatteryEnergyStorageSystem:
         self._v_min = battery_options['params']['v_min']
         self._temp_ambient = battery_options['params']['temp_ambient']
         
+        # Number of batteries simulated at once by a batched electrical model (fleet of identical batteries)
+        self.n_batteries = battery_options['n_batteries'] if 'n_batteries' in battery_options.keys() else 1
+
+        # Number of past steps retained by the collections of the electrical model (whole history if None)
+        self.series_capacity = battery_options['series_capacity'] if 'series_capacity' in battery_options.keys() else None
+
         # Bounds of operating conditions of the battery
         self.soc_min = battery_options['bounds']['soc']['low'] if 'bounds' in battery_options.keys() else 0.
         self.soc_max = battery_options['bounds']['soc']['high'] if 'bounds' in battery_options.keys() else 1.
@@ -55,12 +70,20 @@ class BatteryEnergyStorageSystem:
         self._reset_soc_every = battery_options['reset_soc_every'] if 'reset_soc_every' in battery_options['params'].keys() else None
         self._check_soh_every = check_soh_every if check_soh_every is not None else 3600
 
+        # Maximum number of aging checks computed asynchronously by a worker (synchronous aging if None)
+        self._aging_max_lag = battery_options['aging_max_lag'] if 'aging_max_lag' in battery_options.keys() else None
+        self._aging_worker = None
+
         # Collection where will be stored the simulation variables
         self.soc_series = []
         self.soh_series = []
         self.t_series = []
         self.c_max_series = []
 
+        # Running means of SoC and temperature consumed by the aging model, updated at each step
+        self._soc_mean = RunningMean()
+        self._temp_mean = RunningMean()
+
         # Instantiate models
         self._build_models()
 
@@ -91,25 +114,36 @@ class BatteryEnergyStorageSystem:
         """
         for model_config in self.models_settings:
             if model_config['type'] == 'electrical':
-                self._electrical_model = globals()[model_config['class_name']](components_settings=model_config['components'],
-                                                                               sign_convention=self._sign_convention)
+                model_class = get_model_class(model_config['class_name'])
+                self._electrical_model = model_class(components_settings=model_config['components'],
+                                                     sign_convention=self._sign_convention,
+                                                     n_batteries=self.n_batteries,
+                                                     series_capacity=self.series_capacity)
                 self.models.append(self._electrical_model)
 
+                if getattr(self._electrical_model, 'n_batteries', 1) != self.n_batteries:
+                    raise Exception("The electrical model {} cannot simulate a fleet of {} batteries, choose a batched "
+                                    "model instead.".format(model_config['class_name'], self.n_batteries))
+
             elif model_config['type'] == 'thermal':
                 components = model_config['components'] if 'components' in model_config.keys() else None
                 #kwargs = {'ground_temps': self._ground_data['temperature'] if 'temperature' in self._ground_data else None}
-                self._thermal_model = globals()[model_config['class_name']](components_settings=components)
+                self._thermal_model = get_model_class(model_config['class_name'])(components_settings=components)
                 self.models.append(self._thermal_model)
 
             elif model_config['type'] == 'aging':
-                self._aging_model = globals()[model_config['class_name']](components_settings=model_config['components'],
-                                                                          stress_models=model_config['stress_models'],
-                                                                          init_soc=self._init_conditions['soc'])
+                model_class = get_model_class(model_config['class_name'])
+                self._aging_model = model_class(components_settings=model_config['components'],
+                                                stress_models=model_config['stress_models'],
+                                                init_soc=self._init_conditions['soc'])
                 self.models.append(self._aging_model)
 
             else:
                 raise Exception("The 'type' of {} you are trying to instantiate is wrong!"\
                                 .format(model_config['class_name']))
+
+        if self._aging_model is not None and self.n_batteries > 1:
+            raise NotImplementedError("Aging models cannot be employed with a fleet of batteries yet.")
         
         # Instantiation of battery state estimators
         self._soc_model = SOCEstimator(capacity=self.nominal_capacity, soc_max=self.soc_max, soc_min=self.soc_min)
@@ -122,6 +156,9 @@ class BatteryEnergyStorageSystem:
         self.soh_series = []
         self.t_series = []
         self.c_max_series = []
+        self._soc_mean.clear()
+        self._temp_mean.clear()
+        self.close()
 
         for model in self.models:
             model.reset_model(**reset_info)
@@ -142,6 +179,21 @@ class BatteryEnergyStorageSystem:
 
             model.init_model(**self._init_conditions)
 
+        self._soc_mean.update(self.soc_series[-1])
+        if self._thermal_model is not None:
+            self._temp_mean.update(self._thermal_model.get_temp_series(k=-1))
+
+        if self._aging_model is not None and self._aging_max_lag is not None:
+            self._aging_worker = AgingWorker(aging_model=self._aging_model, max_lag=self._aging_max_lag)
+
+    def close(self):
+        """
+        Wait for the aging checks still pending and stop the aging worker, if any.
+        """
+        if self._aging_worker is not None:
+            self._aging_worker.close()
+            self._aging_worker = None
+
     def step(self, load: float, dt: float, k: int, ground_temp: float = None):
         """
         Perform a step of the simulation by applying the load to the battery and updating the state of the system.
@@ -181,15 +233,29 @@ class BatteryEnergyStorageSystem:
         self._thermal_model.update_temp(value=curr_temp)
         self._thermal_model.update_heat(value=dissipated_heat)
         self.soc_series.append(curr_soc)
+        self._soc_mean.update(curr_soc)
+        self._temp_mean.update(curr_temp)
 
         # Compute SoH of the system if a model has been selected, SoH=constant otherwise
         curr_soh = self.soh_series[-1]
         if self._aging_model is not None and k % self._check_soh_every == 0:
-            print("Aging step")
-            curr_soh = self.soh_series[0] - self._aging_model.compute_degradation(soc_history=self.soc_series,
-                                                                                  temp_history=self._thermal_model.get_temp_series(),
-                                                                                  elapsed_time=self.t_series[-1],
-                                                                                  k=k)
+            aging_kwargs = {'elapsed_time': self.t_series[-1], 'k': k,
+                            'avg_soc': self._soc_mean.mean, 'avg_temp': self._temp_mean.mean}
+
+            if self._aging_worker is not None:
+                self._aging_worker.submit(soc_series=self.soc_series,
+                                          temp_series=self._thermal_model.get_temp_series(), **aging_kwargs)
+            else:
+                logger.debug("Aging step at iteration {}".format(k))
+                curr_soh = self.soh_series[0] - self._aging_model.compute_degradation(soc_history=self.soc_series,
+                                                                                      temp_history=self._thermal_model.get_temp_series(),
+                                                                                      **aging_kwargs)
+
+        # With asynchronous aging, the SoH is updated as soon as the worker publishes a new degradation
+        if self._aging_worker is not None:
+            _, degradation = self._aging_worker.poll()
+            if degradation is not None:
+                curr_soh = self.soh_series[0] - degradation
         self.soh_series.append(curr_soh)
         
         # Update the maximum capacity of the battery and the SoC model since the battery capacity fades with SoH
@@ -204,19 +270,215 @@ class BatteryEnergyStorageSystem:
         # Reset the SoC estimation to avoid an error drift of the SoC estimation. TODO: move this in the SoC model maybe?
         if self._reset_soc_every is not None and k % self._reset_soc_every == 0:
             self.soc_series[-1] = self._soc_model.reset_soc(v=v_out, v_max=self._v_max, v_min=self._v_min)
+            self._soc_mean.replace_last(self.soc_series[-1])
 
-    def get_status_table(self):
+    @property
+    def aging_model(self):
+        return self._aging_model
+
+    def get_aging_state(self):
         """
-        Collect the status of the battery and its components at the current time step.
-        Used to update the queues of the writer.
+        Current SoH and cumulative cyclic damage of the battery, used to measure the aging of a simulated cycle.
+        """
+        if self._aging_worker is not None:
+            return self.soh_series[-1], self._aging_worker.call('get_cyclic_damage')
+        return self.soh_series[-1], self._aging_model.get_cyclic_damage()
+
+    def check_aging(self, k: int, elapsed_time: float):
         """
-        status_dict = {'time': self.t_series[-1], 'soc': self.soc_series[-1], 'soh': self.soh_series[-1], 'c_max': self.c_max_series[-1]}
+        Compute the degradation at the current step regardless of check_soh_every, updating the SoH of the last step.
+
+        Args:
+            k (int): current iteration of the simulation
+            elapsed_time (float): time elapsed from the start of the simulation
+        """
+        aging_kwargs = {'elapsed_time': elapsed_time, 'k': k,
+                        'avg_soc': self._soc_mean.mean, 'avg_temp': self._temp_mean.mean}
+
+        if self._aging_worker is not None:
+            self._aging_worker.submit(soc_series=self.soc_series,
+                                      temp_series=self._thermal_model.get_temp_series(), **aging_kwargs)
+            self._aging_worker.wait()
+            _, degradation = self._aging_worker.poll()
+        else:
+            degradation = self._aging_model.compute_degradation(soc_history=self.soc_series,
+                                                                temp_history=self._thermal_model.get_temp_series(),
+                                                                **aging_kwargs)
+
+        curr_soh = self.soh_series[0] - degradation
+        curr_c_max = self.nominal_capacity * curr_soh
+        self.soh_series[-1] = curr_soh
+        self.c_max_series[-1] = curr_c_max
+        self._soc_model.c_max = curr_c_max
 
         for model in self.models:
-            status_dict.update(model.get_results(**{'k': -1}))
+            model.load_battery_state(temp=self._thermal_model.get_temp_series(k=-1), soc=self.soc_series[-1],
+                                     soh=curr_soh)
+
+    def skip_cycles(self, n_cycles: int, cycle_steps: int, cyclic_damage: float):
+        """
+        Account for the aging of cycles that are not simulated, assuming that they are equal to the last simulated
+        one: their cyclic damage is added to the aging model and their SoC and temperature to the calendar aging
+        means. The elapsed time has to be advanced by the caller, before the next check of the aging.
+
+        Args:
+            n_cycles (int): number of skipped cycles
+            cycle_steps (int): number of steps of the last simulated cycle
+            cyclic_damage (float): cyclic damage of the last simulated cycle
+        """
+        if self._aging_worker is not None:
+            self._aging_worker.call('add_cyclic_damage', n_cycles * cyclic_damage)
+        else:
+            self._aging_model.add_cyclic_damage(n_cycles * cyclic_damage)
+        self._soc_mean.merge(mean=np.mean(self.soc_series[-cycle_steps:]), count=n_cycles * cycle_steps)
+        self._temp_mean.merge(mean=np.mean(self._thermal_model.get_temp_series()[-cycle_steps:]),
+                              count=n_cycles * cycle_steps)
+
+    @property
+    def can_solve_profile(self):
+        """
+        Whether a whole current profile can be simulated at once by solve_profile(), i.e. the models don't
+        depend on the state of the battery in a way that requires stepping sample by sample.
+        """
+        return self._load_var == 'current' and \
+            self._aging_model is None and \
+            self._reset_soc_every is None and \
+            self.n_batteries == 1 and \
+            self._electrical_model.is_fusable and \
+            self._thermal_model.is_fusable
+
+    def solve_profile(self, load: np.ndarray, dt: np.ndarray, ground_temp: np.ndarray = None):
+        """
+        Simulate a whole current profile at once, with the same results of calling step() for each of its samples.
+        The collections of the battery and of its models are updated as well.
+
+        Args:
+            load (np.ndarray): current applied to the battery at each step.
+            dt (np.ndarray): delta of time of each step.
+            ground_temp (np.ndarray, optional): ground temperature of each step to consider in the thermal model.
+
+        Returns:
+            dict: the status table of each step, with the same variables of get_status_table() except for the time.
+        """
+        assert self.can_solve_profile, "The battery cannot simulate the whole profile at once with the current " \
+            "configuration, use step() instead."
+
+        load = np.asarray(load, dtype=float)
+        dt = np.asarray(dt, dtype=float)
+        n = len(load)
+        if n == 0:
+            return {}
+
+        electrical_results = self._electrical_model.solve_current_profile(i_load=load, dt=dt)
+        dissipated_heat = electrical_results.pop('dissipated_heat')
+
+        # SoC doesn't depend on the temperature, which needs the SoC at the beginning of each step
+        soc = self._soc_model.compute_soc_profile(soc_=self.soc_series[-1], i=load, dt=dt)
+        prev_soc = np.concatenate(([self.soc_series[-1]], soc[:-1]))
+
+        temp = self._thermal_model.compute_temp_profile(q=dissipated_heat, i=load, T_amb=self._temp_ambient, dt=dt,
+                                                        soc=prev_soc, ground_temp=ground_temp)
+        self._thermal_model.extend_temp(temp.tolist())
+        self._thermal_model.extend_heat(dissipated_heat.tolist())
+
+        # Without aging, SoH and maximum capacity stay constant
+        curr_soh = self.soh_series[-1]
+        curr_c_max = self.nominal_capacity * curr_soh
+        self._soc_model.c_max = curr_c_max
+        self.soc_series.extend(soc.tolist())
+        self._soc_mean.extend(soc)
+        self._temp_mean.extend(temp)
+        self.soh_series.extend([curr_soh] * n)
+        self.c_max_series.extend([curr_c_max] * n)
+
+        for model in self.models:
+            model.load_battery_state(temp=temp[-1], soc=soc[-1], soh=curr_soh)
+
+        status_dict = {'soc': soc, 'soh': np.full(n, curr_soh), 'c_max': np.full(n, curr_c_max)}
+        for model in self.models:
+            if model is self._electrical_model:
+                status_dict.update(electrical_results)
+            else:
+                status_dict.update({'temperature': temp, 'heat': dissipated_heat})
 
         return status_dict
 
+    def _status_getters(self):
+        """
+        Name and getter of the current value of each variable of the status of the battery and its components.
+        """
+        getters = [('time', lambda: self.t_series[-1]),
+                   ('soc', lambda: self.soc_series[-1]),
+                   ('soh', lambda: self.soh_series[-1]),
+                   ('c_max', lambda: self.c_max_series[-1])]
+
+        for model in self.models:
+            # Results of an asynchronous aging model are the last ones published by the worker
+            if model is self._aging_model and self._aging_worker is not None:
+                getters += [(key, lambda key=key: self._aging_worker.results[key])
+                            for key in self._aging_worker.results.keys()]
+            else:
+                getters += [(key, lambda series=series: series[-1]) for key, series in model.get_results().items()]
+
+        return getters
+
+    def get_status_table(self, variables: list = None):
+        """
+        Collect the status of the battery and its components at the current time step.
+        To record the status at each step, use the recorder built by build_status_recorder() instead.
+
+        Args:
+            variables (list, None): variables of the status to collect (all of them if None)
+        """
+        status_dict = {key: getter() for key, getter in self._status_getters()
+                       if variables is None or key in variables}
+
+        # With a fleet of batteries, each variable is split in a column for each battery
+        if self.n_batteries > 1:
+            fleet_dict = {}
+            for key, value in status_dict.items():
+                if np.ndim(value) > 0:
+                    fleet_dict.update({'{}_{}'.format(key, j): value[j] for j in range(self.n_batteries)})
+                else:
+                    fleet_dict[key] = value
+            status_dict = fleet_dict
+
+        return status_dict
+
+    def build_status_recorder(self, on_chunk, chunk_size: int = 10000, variables: list = None,
+                              aggregates: dict = None, stride: int = 1, period: float = None):
+        """
+        Build a recorder of the same status of get_status_table(), with a slot for each variable that is filled by
+        reading the last value of its series at each step. It has to be built after the initialization of the battery,
+        since the series of the models are bound to the slots.
+
+        Args:
+            on_chunk (callable): consumer of the chunks of recorded status, e.g. the writer
+            chunk_size (int): number of rows of each chunk
+            variables (list, None): variables of the status to record (all of them if None)
+            aggregates (dict, None): aggregates ('mean', 'min', 'max') to record for each variable over the steps
+                between two rows, also for variables not listed in 'variables'
+            stride (int): number of steps between two recorded rows
+            period (float, None): minimum interval of simulated time between two recorded rows
+        """
+        aggregates = aggregates if aggregates is not None else {}
+        recorder = StepRecorder(on_chunk=on_chunk, chunk_size=chunk_size, stride=stride, period=period,
+                                clock=lambda: self.t_series[-1])
+
+        available = []
+        for key, getter in self._status_getters():
+            available.append(key)
+            instant = variables is None or key in variables
+            if instant or key in aggregates:
+                recorder.register(key, getter, instant=instant, aggregates=aggregates.get(key))
+
+        unknown = [key for key in list(variables or []) + list(aggregates.keys()) if key not in available]
+        if unknown:
+            raise Exception("Variables {} cannot be recorded, since they are not computed by the battery. Choose "
+                            "among {}.".format(unknown, available))
+
+        return recorder
+
     def build_results_table(self):
         """
         Collct results of the entire simulation and return them in a dictionary.
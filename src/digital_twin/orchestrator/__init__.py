@@ -1,2 +1,2 @@
-from .loader import DataLoader, DrivenLoader, ScheduledLoader, StreamLoader
-from .writer import DataWriter
\ No newline at end of file
+from .loader import DataLoader, DrivenLoader, ChunkedDrivenLoader, ScheduledLoader, StreamLoader
+from .writer import DataWriter, read_output, read_output_index
\ No newline at end of file
@@ -1,11 +1,68 @@
-from src.preprocessing.data_preparation import load_data_from_csv, sync_data_with_step
+from src.preprocessing.data_preparation import load_data_from_csv, sync_data_with_step, iter_data_from_csv, \
+    resample_on_grid
 from src.preprocessing.schedule.schedule import Schedule
 import logging
+import numpy as np
 
 logger = logging.getLogger('ErNESTO-DT')
 
 
 
+class CyclicView:
+    """
+    Read-only sequence repeating the values of a profile for a number of cycles, without copying them. The i-th item
+    is the value at the offset i % len(values) of the cycle i // len(values), increased by 'shift' for each cycle
+    (e.g. the duration of the profile for the times), so that the memory used doesn't depend on the number of cycles.
+    """
+    def __init__(self, values, n_cycles: int, shift: float = 0):
+        """
+        Args:
+            values (list, np.ndarray): values of a single cycle
+            n_cycles (int): number of repetitions of the values
+            shift (float): increment of the values at each cycle
+        """
+        self._values = values
+        self._n_cycles = n_cycles
+        self._shift = shift
+
+    @property
+    def cycle_length(self):
+        return len(self._values)
+
+    def __len__(self):
+        return len(self._values) * self._n_cycles
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            # A slice of the repeated values is returned as a numpy array, indexing only the steps of the slice
+            steps = np.arange(*i.indices(len(self)))
+            cycles, offsets = np.divmod(steps, len(self._values))
+            values = np.asarray(self._values)[offsets]
+            return np.where(cycles > 0, values + self._shift * cycles, values) if self._shift else values
+
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("Index {} out of the {} items of the cyclic view.".format(i, len(self)))
+
+        cycle, offset = divmod(i, len(self._values))
+        return self._values[offset] + self._shift * cycle if cycle > 0 else self._values[offset]
+
+    def __iter__(self):
+        yield from self._values
+        for cycle in range(1, self._n_cycles):
+            shift = self._shift * cycle
+            for value in self._values:
+                yield value + shift
+
+    def __array__(self, dtype=None, copy=None):
+        """
+        Materialize all the cycles in a numpy array, when the whole repeated profile is needed at once.
+        """
+        values = np.asarray(self._values, dtype=dtype)
+        return np.concatenate([values] + [values + self._shift * cycle for cycle in range(1, self._n_cycles)])
+
+
 class DataLoader:
     """
     Class handling the functions to collect data from input file or stream and provide
@@ -80,6 +137,9 @@ class DrivenLoader(DataLoader):
     """
     Loader of data of experiments which are driven by a specific profile.
     """
+    # The whole profile is available through get_all_data()
+    in_memory = True
+
     def __init__(self, config: dict):
         super().__init__()
 
@@ -94,19 +154,28 @@ class DrivenLoader(DataLoader):
                 load_data_from_csv(csv_file=config['input']['ground_data']['file'],
                                    vars_to_retrieve=config['input']['ground_data']['vars'],
                                    time_format=config['input']['ground_data']['time_format'],
+                                   cache=config['input']['ground_data'].get('cache', True),
                                    iterations=config['iterations'])
                 )
         
         if 'timestep' in config and config['timestep'] is not None:
             self._timestep = config['timestep']
-            self._times, self._data = sync_data_with_step(times=self._times.copy(),
-                                                          data=self._data.copy(),
-                                                          sim_step=self._timestep)
+            self._times, self._data = sync_data_with_step(times=self._times,
+                                                          data=self._data,
+                                                          sim_step=self._timestep,
+                                                          interp=config.get('interp_ground_data') or False,
+                                                          max_gap=config.get('max_ground_gap'))
         else:
             self._timestep = None
         
-        self._data['time'] = [t - self._times[0] for t in self._times]
-        self._duration = self._times[-1] - self._times[0]
+        # The data are kept as numpy arrays (memory-mapped when read from the cache of the ground data)
+        self._data['time'] = self._times - self._times[0]
+        self._duration = (self._times[-1] - self._times[0]).item()
+
+        # Repetitions of the input profile, with the duration and the number of samples of each one
+        self._n_cycles = 1
+        self._cycle_duration = self._duration
+        self._cycle_length = len(self._data['time'])
         
         # If the input data has to be repeated for multiple cycles then the load_var and time are extended
         if 'cycle_for' in config['input'] and config['input']['cycle_for'] > 1:
@@ -115,12 +184,11 @@ class DrivenLoader(DataLoader):
                                 "the variables other than the load one will become meaningless and " \
                                 "will be dropped.")
             
-            # Extend the input data for the number of cycles, the other variables are dropped
-            self._data[self._input_var] = self._data[self._input_var] * config['input']['cycle_for']
-            self._data['time'].extend([t + self._duration * i for i in range(1, config['input']['cycle_for']) for t in self._data['time']])
-            
-            self._data = {self._input_var: self._data[self._input_var], 'time': self._data['time']}
+            # Repeat the input data for the number of cycles without copying them, the other variables are dropped
+            self._data = {self._input_var: CyclicView(self._data[self._input_var], config['input']['cycle_for']),
+                          'time': CyclicView(self._data['time'], config['input']['cycle_for'], shift=self._duration)}
             self._duration = self._duration * config['input']['cycle_for']
+            self._n_cycles = config['input']['cycle_for']
         
     @property
     def input_var(self):
@@ -137,6 +205,18 @@ class DrivenLoader(DataLoader):
     @property
     def ground_vars(self):
         return self._ground_vars
+
+    @property
+    def n_cycles(self):
+        return self._n_cycles
+
+    @property
+    def cycle_duration(self):
+        return self._cycle_duration
+
+    @property
+    def cycle_length(self):
+        return self._cycle_length
     
     def __getitem__(self, var:str):
         return self._data[var]    
@@ -151,8 +231,20 @@ class DrivenLoader(DataLoader):
         """
         Yields i-th time instant and data read from csv
         """
-        for i in range(len(self._data[self._input_var])):
-            yield {key: self._data[key][i] for key in self._data.keys()}
+        keys = list(self._data.keys())
+        for chunk in self.iter_columns(chunk_size=10000):
+            for values in zip(*[chunk[key].tolist() for key in keys]):
+                yield dict(zip(keys, values))
+
+    def iter_columns(self, chunk_size: int):
+        """
+        Yields the data in chunks of consecutive samples, each one as a dictionary of numpy arrays
+
+        Args:
+            chunk_size (int): number of samples of each chunk
+        """
+        for start in range(0, len(self), chunk_size):
+            yield {key: np.asarray(values[start:start + chunk_size]) for key, values in self._data.items()}
 
     def get_all_data(self):
         return self._data
@@ -162,6 +254,120 @@ class DrivenLoader(DataLoader):
         del self._times
 
 
+class ChunkedDrivenLoader(DrivenLoader):
+    """
+    Loader of a driven profile which is read from the ground file in chunks of rows, instead of being loaded in memory
+    all at once, so that the memory used doesn't depend on the length of the profile. The samples provided by
+    collection() are the same as the ones of the DrivenLoader, but the whole profile is not available through
+    get_all_data(). Each chunk is converted to the internal units and resampled on the grid of the timestep (if any)
+    separately, keeping the last sample of the previous chunk to fill the grid across the boundary.
+    """
+    in_memory = False
+
+    def __init__(self, config: dict):
+        DataLoader.__init__(self)
+        ground_data = config['input']['ground_data']
+
+        self._input_var = ground_data['load']
+        assert self._input_var in self.INPUT_VARS, "Provided loaded variables is not compliant "  \
+            "with the simulator settings."
+        self._ground_vars = [item['var'] for item in ground_data['vars']]
+        self._read_options = dict(csv_file=ground_data['file'],
+                                  chunk_size=ground_data['chunk_size'],
+                                  time_format=ground_data['time_format'],
+                                  iterations=config['iterations'])
+        self._vars = ground_data['vars']
+
+        self._timestep = config['timestep'] if 'timestep' in config else None
+        self._interp = config.get('interp_ground_data') or False
+        self._max_gap = config.get('max_ground_gap')
+
+        # A first pass on the timestamps gives the duration and the number of samples of the profile
+        self._start_time, last_time, n_rows = None, None, 0
+        for chunk in iter_data_from_csv(vars_to_retrieve=[], **self._read_options):
+            if self._start_time is None:
+                self._start_time = chunk['time'][0]
+            last_time = chunk['time'][-1]
+            n_rows += len(chunk['time'])
+
+        self._cycle_duration = last_time - self._start_time
+        self._cycle_length = n_rows
+        if self._timestep is not None:
+            # The profile ends at the last time of the grid of the timestep
+            self._cycle_length = int(np.floor(self._cycle_duration / self._timestep + 1e-9)) + 1
+            self._cycle_duration = (self._start_time + (self._cycle_length - 1) * self._timestep) - self._start_time
+
+        # The profile is read again for each repetition, with the load variable only
+        self._n_cycles = 1
+        self._keys = self._ground_vars
+        if 'cycle_for' in config['input'] and config['input']['cycle_for'] > 1:
+            if len(self._ground_vars) > 1:
+                logger.warning("If you want to repeat the input data for multiple consequent times, " \
+                                "the variables other than the load one will become meaningless and " \
+                                "will be dropped.")
+            self._n_cycles = config['input']['cycle_for']
+            self._keys = [self._input_var]
+        self._duration = self._cycle_duration * self._n_cycles
+
+    def _chunks(self):
+        """
+        Yields the times (relative to the first timestamp) and the values of the variables of each chunk
+        """
+        prev = None
+        next_step = 0
+        for chunk in iter_data_from_csv(vars_to_retrieve=self._vars, **self._read_options):
+            times = chunk.pop('time')
+            if self._timestep is None:
+                yield times - self._start_time, chunk
+                continue
+
+            if prev is not None:
+                times = np.concatenate(([prev[0]], times))
+                chunk = {key: np.concatenate(([prev[1][key]], values)) for key, values in chunk.items()}
+            prev = (times[-1], {key: values[-1] for key, values in chunk.items()})
+
+            # Times of the grid reached by the chunk and not provided yet
+            last_step = int(np.floor((times[-1] - self._start_time) / self._timestep + 1e-9))
+            grid = self._start_time + np.arange(next_step, last_step + 1) * self._timestep
+            next_step = last_step + 1
+            yield grid - self._start_time, resample_on_grid(times, chunk, grid, tol=1e-9 * self._timestep,
+                                                            interp=self._interp, max_gap=self._max_gap)
+
+    def __getitem__(self, var: str):
+        raise Exception("The data of a profile read in chunks cannot be accessed all at once.")
+
+    def __len__(self):
+        return self._cycle_length * self._n_cycles
+
+    def collection(self):
+        """
+        Yields i-th time instant and data read from csv
+        """
+        keys = self._keys + ['time']
+        for chunk in self.iter_columns():
+            for values in zip(*[chunk[key].tolist() for key in keys]):
+                yield dict(zip(keys, values))
+
+    def iter_columns(self, chunk_size: int = None):
+        """
+        Yields the data chunk by chunk, as read from the file, each one as a dictionary of numpy arrays
+
+        Args:
+            chunk_size (int): ignored, the chunks have the size given in the configuration of the ground data
+        """
+        for cycle in range(self._n_cycles):
+            for times, chunk in self._chunks():
+                columns = {key: chunk[key] for key in self._keys}
+                columns['time'] = times + self._cycle_duration * cycle if cycle > 0 else times
+                yield columns
+
+    def get_all_data(self):
+        raise Exception("The data of a profile read in chunks cannot be accessed all at once.")
+
+    def destroy(self):
+        pass
+
+
 class StreamLoader(DataLoader):
     """
     
@@ -8,7 +8,7 @@ from rich.pretty import pretty_repr
 
 from src.preprocessing.schema import read_yaml
 from src.preprocessing.data_preparation import validate_parameters_unit
-from src.digital_twin.orchestrator import DataLoader
+from src.digital_twin.orchestrator import DataLoader, ChunkedDrivenLoader
 from src.digital_twin.orchestrator import DataWriter
 from src.digital_twin.orchestrator.simulation import BaseSimulator
 
@@ -51,8 +51,17 @@ class DTOrchestrator:
         self._results = None
         
         # Entities useful for the simulation
-        self._data_loader = DataLoader.get_instance(mode=kwargs['mode'])(self._settings)
-        self._data_writer = DataWriter(output_folder=self._output_folder)
+        if kwargs['mode'] == 'driven' and self._settings['input']['ground_data'].get('chunk_size') is not None:
+            # Ground files read in chunks are streamed instead of being loaded in memory
+            self._data_loader = ChunkedDrivenLoader(self._settings)
+        else:
+            self._data_loader = DataLoader.get_instance(mode=kwargs['mode'])(self._settings)
+        output = self._settings['output'] if 'output' in self._settings else {}
+        output_format = output['format'] if 'format' in output else 'csv'
+        self._data_writer = DataWriter(output_folder=self._output_folder,
+                                       variables=output['variables'] if 'variables' in output else None,
+                                       output_format=output_format,
+                                       **(output[output_format] if output_format in output else {}))
         self._simulator = BaseSimulator.get_instance(mode=kwargs['mode'])(model_config=self._models_configs,
                                                                           sim_config=self._settings,
                                                                           data_loader=self._data_loader,
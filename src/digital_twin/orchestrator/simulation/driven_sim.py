@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import logging
 from tqdm import tqdm
@@ -26,10 +27,19 @@ class DrivenSimulator(BaseSimulator):
         super().__init__()
         
         # Simulation variables
-        self._sample = None
         self._get_rest_after = sim_config['get_rest_after'] if 'get_rest_after' in sim_config and sim_config['get_rest_after'] is not None else 3600
         self._elapsed_time = -1
-        self._done = False
+        self._fused = sim_config['fused'] if 'fused' in sim_config else False
+
+        # Variables, decimation and aggregates of the recorded output (all the variables at each step by default)
+        output = sim_config['output'] if 'output' in sim_config else {}
+        self._output = {key: output[key] for key in ['variables', 'stride', 'period', 'aggregates']
+                        if key in output and output[key] is not None}
+        self._recorder = None
+
+        # Maximum SoH drop extrapolated across skipped cycles of a repeated profile (accelerated aging if not None)
+        self._accelerated_aging = sim_config['accelerated_aging'] if 'accelerated_aging' in sim_config else None
+        self._aging_error_bound = 0.
         
         # Instantiate the BESS environment
         self. _battery = BatteryEnergyStorageSystem(
@@ -49,38 +59,100 @@ class DrivenSimulator(BaseSimulator):
         self._battery.reset()
         self._battery.init()
         self._battery.load_var = self._loader.input_var
-        self._writer.add_simulated_data(self._battery.get_status_table())
+
+        self._recorder = self._battery.build_status_recorder(on_chunk=self._writer.add_simulated_chunk,
+                                                             chunk_size=self._writer.save_output_every,
+                                                             **self._output)
+        self._recorder.record()
+
+        if self._fused:
+            if self._battery.can_solve_profile and 'aggregates' not in self._output and self._loader.in_memory:
+                self._solve_fused()
+                self._recorder.flush()
+                logger.info("'Driven Simulation' ended without errors!")
+                return
+            logger.warning("The fused simulation is not available with the current configuration of the battery, "
+                           "of the output and of the ground data, the profile will be simulated step by step.")
+
+        if self._accelerated_aging is not None:
+            if self._battery.aging_model is not None and self._loader.n_cycles > 2 and self._loader.in_memory:
+                self._solve_accelerated()
+                self._recorder.flush()
+                logger.info("'Driven Simulation' ended without errors!")
+                return
+            logger.warning("The accelerated aging requires an aging model and a profile repeated for more than two "
+                           "cycles and loaded in memory, the whole profile will be simulated step by step.")
 
         k = 0
-        dt = self._loader.timestep if self._loader.timestep is not None else 1
-        prev_time = -1
+        prev_time = None
         pbar = tqdm(total=int(self._loader.duration), position=0, leave=True)
-        
-        inputs = self._loader.collection()
-        self._sample = next(inputs)
-        
-        # Main loop of the simulation
-        while not self._done:
-            
-            # Make a step in the simulation. If dt == 0 then no progresses have been made.
-            if dt != 0:
-                k, dt = self.step(k=k, dt=dt)    
-                pbar.update(dt)
-            
-            #print(self._sample['time'], self._battery.t_series[-1], dt, self._elapsed_time)
-            
-            # Check if the simulation is over, otherwise get the next sample.
-            if self._elapsed_time < self._loader.duration:
-                prev_time = self._sample['time']
-                self._sample = next(inputs)
-                dt = round(self._sample['time'] - prev_time, 2)
-            else:
-                self._done = True
-            
+
+        # Main loop of the simulation, on chunks of samples arranged in columns
+        for columns in self._loader.iter_columns(chunk_size=self._writer.save_output_every):
+            k, prev_time, done = self._simulate_samples(columns, k=k, prev_time=prev_time, pbar=pbar,
+                                                        duration=self._loader.duration)
+            if done:
+                break
+
         pbar.close()
+        self._recorder.flush()
         logger.info("'Driven Simulation' ended without errors!")
-            
-    def step(self, k: int, dt: float):
+
+    def _simulate_samples(self, columns: dict, k: int, prev_time=None, pbar=None, duration: float = None):
+        """
+        Simulate the steps of a chunk of consecutive samples, given as columns of the ground data. The deltas of time
+        between the samples are computed at once for the whole chunk (rounded as in the fused simulation) and the
+        samples with dt == 0 are skipped. The ground data of the samples recorded in the output are handed to the
+        writer as a single chunk.
+
+        Args:
+            columns (dict): arrays of the ground data of the samples, including their 'time'
+            k (int): current iteration of the simulation
+            prev_time (float, None): time of the previous sample (None before the first sample of the simulation)
+            pbar (tqdm, None): progress bar of the simulated time
+            duration (float, None): the simulation ends at the first sample reaching the duration (if given)
+
+        Returns: the iteration and the time of the last simulated sample, and whether the duration has been reached
+        """
+        times = columns['time']
+        n_samples = len(times)
+        if n_samples == 0:
+            return k, prev_time, False
+
+        if prev_time is None:
+            dts = [self._loader.timestep if self._loader.timestep is not None else 1]
+            dts.extend(np.round(np.diff(times), 2).tolist())
+        else:
+            dts = np.round(np.diff(times, prepend=prev_time), 2).tolist()
+        loads = columns[self._loader.input_var].tolist()
+        temps = columns['temperature'].tolist() if 'temperature' in columns else [None] * n_samples
+
+        start_time = self._elapsed_time
+        recorded = []
+        done = False
+        for i in range(n_samples):
+            # If dt == 0 then no progresses have been made
+            if dts[i] != 0:
+                k, is_recorded = self.step(k=k, dt=dts[i], load=loads[i], ground_temp=temps[i])
+                if is_recorded:
+                    recorded.append(i)
+
+            # Check if the simulation is over
+            if duration is not None and self._elapsed_time >= duration:
+                done = True
+                n_samples = i + 1
+                break
+
+        # Ground data are saved only for the samples recorded in the output
+        if recorded:
+            recorded = np.asarray(recorded)
+            self._writer.add_ground_chunk({key: values[recorded] for key, values in columns.items()})
+        if pbar is not None:
+            pbar.update(self._elapsed_time - start_time)
+
+        return k, times[n_samples - 1], done
+
+    def step(self, k: int, dt: float, load: float, ground_temp: float = None):
         """
         Execute a step of the simulation that can have a fixed or variable timestep.
         
@@ -93,6 +165,10 @@ class DrivenSimulator(BaseSimulator):
         Args:
             k (int): current iteration of the simulation
             dt (float): delta of time between the current and the previous sample
+            load (float): value of the load variable of the sample
+            ground_temp (float, None): ground temperature of the sample, if available
+
+        Returns: the next iteration and whether the step of the sample has been recorded in the output
         """
         # If the timestep is variable and the dt is too large, then rest the battery.
         if self._loader.timestep is None and dt > self._get_rest_after:
@@ -105,20 +181,143 @@ class DrivenSimulator(BaseSimulator):
             dt = 1
             k += 1
             
-            self._writer.add_simulated_data(self._battery.get_status_table())
+            self._recorder.record()
             
         # Normal operating step of the battery system.
-        ground_temp = self._sample['temperature'] if 'temperature' in self._sample else None
-        self._battery.step(load=self._sample[self._loader.input_var], dt=dt, k=k, ground_temp=ground_temp)
+        self._battery.step(load=load, dt=dt, k=k, ground_temp=ground_temp)
         
         self._elapsed_time += dt
         self._battery.t_series.append(self._elapsed_time)
         k += 1
         
-        self._writer.add_ground_data(self._sample)
-        self._writer.add_simulated_data(self._battery.get_status_table())
-        
-        return k, dt    
+        return k, self._recorder.record()
+
+    @property
+    def aging_error_bound(self):
+        return self._aging_error_bound
+
+    def _solve_accelerated(self):
+        """
+        Simulate a profile repeated for many cycles, simulating only some representative cycles in full and
+        extrapolating the aging of the skipped ones from the last simulated cycle.
+
+        After each simulated cycle, the cycles skipped are as many as the ones that make the SoH drop by at most
+        'soh_threshold' at the aging rate of the cycle, so that the battery is simulated again as soon as the
+        degradation has moved its state significantly. The error of the extrapolation is estimated by the change of
+        the aging rate between the cycles before and after each skip (as the error of a rectangle rule with respect
+        to a trapezoidal one) and reported as the bound of the error on the final SoH.
+        """
+        soh_threshold = self._accelerated_aging['soh_threshold']
+        n_cycles = self._loader.n_cycles
+        cycle_duration = self._loader.cycle_duration
+        data = self._loader.get_all_data()
+        cycle_columns = {key: np.asarray(values[:self._loader.cycle_length]) for key, values in data.items()}
+
+        k = 0
+        cycle = 0
+        n_simulated = 0
+        prev_time = None
+        prev_rate = None
+        last_skip = None
+        pbar = tqdm(total=n_cycles, position=0, leave=True)
+
+        while cycle < n_cycles:
+            soh_start, damage_start = self._battery.get_aging_state()
+            k_start = k
+
+            # Simulate the whole cycle, with the same steps of the main loop of solve()
+            columns = dict(cycle_columns, time=cycle_columns['time'] + cycle * cycle_duration)
+            k, prev_time, _ = self._simulate_samples(columns, k=k, prev_time=prev_time)
+
+            self._battery.check_aging(k=k, elapsed_time=self._elapsed_time)
+            soh_end, damage_end = self._battery.get_aging_state()
+            rate = soh_start - soh_end
+            cycle += 1
+            n_simulated += 1
+            pbar.update(1)
+
+            # The rate of the cycle after a skip tells how good the extrapolation has been
+            if last_skip is not None:
+                skipped, skip_rate = last_skip
+                self._aging_error_bound += 0.5 * skipped * abs(rate - skip_rate)
+                last_skip = None
+
+            # The last cycle is always simulated to estimate the error of the previous skip
+            n_skip = min(int(soh_threshold / rate), n_cycles - cycle - 1) if prev_rate is not None and rate > 0 else 0
+            if n_skip > 0:
+                self._battery.skip_cycles(n_cycles=n_skip, cycle_steps=k - k_start,
+                                          cyclic_damage=damage_end - damage_start)
+                self._elapsed_time += n_skip * cycle_duration
+                prev_time += n_skip * cycle_duration
+                self._battery.check_aging(k=k, elapsed_time=self._elapsed_time)
+
+                last_skip = (n_skip, rate)
+                cycle += n_skip
+                pbar.update(n_skip)
+
+            prev_rate = rate
+
+        pbar.close()
+        logger.info("Accelerated aging: {} cycles extrapolated out of {}, estimated error on the final SoH: {:.3e}"
+                    .format(n_cycles - n_simulated, n_cycles, self._aging_error_bound))
+
+    def _solve_fused(self):
+        """
+        Simulate the whole profile at once with the same steps of the main loop of solve(): samples with dt == 0
+        are skipped, a rest step is added before samples preceded by a lack of data and the simulation ends at the
+        first sample reaching the duration of the profile.
+        """
+        data = self._loader.get_all_data()
+        n_samples = len(data['time'])
+        times = np.asarray(data['time'], dtype=float)
+        loads = np.asarray(data[self._loader.input_var], dtype=float)
+
+        sample_dt = np.empty(n_samples)
+        sample_dt[0] = self._loader.timestep if self._loader.timestep is not None else 1
+        sample_dt[1:] = np.round(np.diff(times), 2)
+
+        is_step = sample_dt != 0
+        if self._loader.timestep is None:
+            is_rest = is_step & (sample_dt > self._get_rest_after)
+        else:
+            is_rest = np.zeros(n_samples, dtype=bool)
+
+        # Position of the step of each sample, after the rest step (if any)
+        steps_done = np.cumsum(is_step.astype(int) + is_rest.astype(int))
+        step_pos = steps_done[is_step] - 1
+        rest_pos = steps_done[is_rest] - 2
+
+        step_dt = np.empty(steps_done[-1])
+        step_load = np.zeros(steps_done[-1])
+        step_temp = np.full(steps_done[-1], np.nan)
+        step_dt[step_pos] = np.where(is_rest, 1, sample_dt)[is_step]
+        step_load[step_pos] = loads[is_step]
+        step_dt[rest_pos] = sample_dt[is_rest] - 1
+        if 'temperature' in data:
+            step_temp[step_pos] = np.asarray(data['temperature'], dtype=float)[is_step]
+
+        # Find the first sample reaching the duration of the profile
+        elapsed = np.cumsum(np.concatenate(([self._elapsed_time], step_dt)))
+        over = np.flatnonzero(elapsed[steps_done] >= self._loader.duration)
+        last_sample = over[0] if over.size else n_samples - 1
+        n_steps = steps_done[last_sample]
+
+        # The initial status of the battery has already been recorded as the first row of the simulated data
+        results = self._battery.solve_profile(load=step_load[:n_steps],
+                                              dt=step_dt[:n_steps],
+                                              ground_temp=step_temp[:n_steps] if 'temperature' in data else None)
+        self._elapsed_time = elapsed[n_steps]
+        self._battery.t_series.extend(elapsed[1:n_steps + 1].tolist())
+
+        results['time'] = elapsed[1:n_steps + 1]
+        recorded_steps = self._recorder.record_block(results, times=results['time'])
+
+        # Ground data are saved only for the samples whose step has been recorded
+        ground_samples = np.flatnonzero(is_step[:last_sample + 1])
+        ground_samples = ground_samples[np.isin(steps_done[ground_samples] - 1, recorded_steps)]
+        ground_chunk = {key: np.asarray(values)[ground_samples] for key, values in data.items()}
+
+        self._writer.write_chunk(ground_chunk, data_type='ground')
     
     def stop(self):
         """
@@ -130,6 +329,7 @@ class DrivenSimulator(BaseSimulator):
         """
         Quit every instance of the current simulation.
         """
+        self._battery.close()
         self._loader.destroy()
         self._writer.stop()
         self._writer.close()
@@ -39,6 +39,12 @@ class ScheduledSimulator(BaseSimulator):
         self._k = 0
         self._elapsed_time = 0
         self._done = False
+
+        # Variables, decimation and aggregates of the recorded output (all the variables at each step by default)
+        output = sim_config['output'] if 'output' in sim_config else {}
+        self._output = {key: output[key] for key in ['variables', 'stride', 'period', 'aggregates']
+                        if key in output and output[key] is not None}
+        self._recorder = None
         
         # Instantiate the BESS environment
         self. _battery = BatteryEnergyStorageSystem(
@@ -65,6 +71,9 @@ class ScheduledSimulator(BaseSimulator):
         logger.info("'Scheduled Simulation' started...")
         self._battery.reset()
         self._battery.init()
+        self._recorder = self._battery.build_status_recorder(on_chunk=self._writer.add_simulated_chunk,
+                                                             chunk_size=self._writer.save_output_every,
+                                                             **self._output)
         self._k = 0
 
         pbar = tqdm(total=len(self._loader), position=0, leave=True)
@@ -108,6 +117,7 @@ class ScheduledSimulator(BaseSimulator):
             self._instructions.append([event_start, self._elapsed_time])
 
         pbar.close()
+        self._recorder.flush()
         logger.info("'Scheduled Simulation' ended without errors!")
         self.done = True
             
@@ -189,8 +199,9 @@ class ScheduledSimulator(BaseSimulator):
         self._elapsed_time += self._loader.timestep
         self._k += 1
         
-        self._writer.add_ground_data(self._sample)
-        self._writer.add_simulated_data(self._battery.get_status_table())
+        # Ground data are saved only at the steps recorded in the output
+        if self._recorder.record():
+            self._writer.add_ground_data(self._sample)
             
     def stop(self):
         """
@@ -202,6 +213,7 @@ class ScheduledSimulator(BaseSimulator):
         """
         Quit every instance of the current simulation.
         """
+        self._battery.close()
         self._loader.destroy()
         self._writer.stop()
         self._writer.close()
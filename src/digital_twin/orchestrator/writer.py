@@ -1,138 +1,487 @@
 import os
-import time
 import threading
-import queue
+import numpy as np
 import pandas as pd
 import logging
+from collections import deque
 from pathlib import Path
 
 logger = logging.getLogger('ErNESTO-DT')
 
 
+class ChunkBuffer:
+    """
+    Bounded FIFO of chunks of data handed from the simulation to a writer thread.
+
+    Both sides wait on a condition instead of polling: the writer sleeps until a chunk is available, while the
+    simulation waits when 'max_chunks' chunks are pending, so that it cannot outrun the writer by more than a bounded
+    amount of memory (backpressure). Once closed, the remaining chunks are still handed to the writer.
+    """
+    def __init__(self, max_chunks: int = 8):
+        """
+        Args:
+            max_chunks (int): maximum number of chunks pending in the buffer
+        """
+        assert max_chunks >= 1, "The buffer has to hold at least one chunk."
+
+        self._max_chunks = max_chunks
+        self._chunks = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._error = None
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def put(self, chunk):
+        """
+        Add a chunk to the buffer, waiting until there is room for it.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._chunks) < self._max_chunks or self._closed)
+            if self._error is not None:
+                raise Exception("The writer of the data failed: {}".format(self._error)) from self._error
+            if self._closed:
+                raise Exception("Data cannot be added to a closed buffer.")
+
+            self._chunks.append(chunk)
+            self._condition.notify_all()
+
+    def get(self):
+        """
+        Get the oldest chunk of the buffer, waiting until one is available.
+
+        Returns: the chunk, or None if the buffer is closed and empty
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._chunks) > 0 or self._closed)
+            if not self._chunks:
+                return None
+
+            chunk = self._chunks.popleft()
+            self._condition.notify_all()
+            return chunk
+
+    def close(self, error: Exception = None):
+        """
+        Stop accepting new chunks, waking up both sides. An error of the writer is raised to the next put().
+        """
+        with self._condition:
+            self._closed = True
+            if error is not None:
+                self._error = error
+                self._chunks.clear()
+            self._condition.notify_all()
+
+    @property
+    def error(self):
+        return self._error
+
+
+class OutputBackend:
+    """
+    Format of the files where the data of the simulation are saved.
+
+    Each kind of data ('ground' and 'simulated') is appended chunk by chunk to its own sequence of files, named
+    'ground_<n>' and 'dataset_<n>'. A new file is started when the current one exceeds 'max_file_size' bytes: the
+    threshold could be not strictly respected, since the data is written in chunks, and it's just a way to avoid
+    huge files.
+    """
+    FORMATS = ['csv', 'parquet']
+    PREFIXES = {'ground': 'ground', 'simulated': 'dataset'}
+    extension = None
+
+    @classmethod
+    def get_instance(cls, output_format: str):
+        """
+        Get the subclass of the backend of the given format, checking if the format name is contained inside the
+        subclass name.
+        """
+        assert output_format in cls.FORMATS, "The output format {} does not exist, choose among {}."\
+            .format(output_format, cls.FORMATS)
+        return next(c for c in cls.__subclasses__() if output_format in c.__name__.lower())
+
+    def __init__(self, output_folder: Path, max_file_size: float = 1e9):
+        """
+        Args:
+            output_folder (Path): folder where the files will be saved.
+            max_file_size (float): size in bytes after which a new file is started.
+        """
+        self._output_folder = Path(output_folder)
+        self._max_file_size = max_file_size
+        self._counters = {data_type: 0 for data_type in self.PREFIXES.keys()}
+
+    def _path(self, data_type: str):
+        if data_type not in self.PREFIXES:
+            raise ValueError("Data type not recognized.")
+        return self._output_folder / '{}_{}.{}'.format(self.PREFIXES[data_type], self._counters[data_type],
+                                                       self.extension)
+
+    def append(self, df: pd.DataFrame, data_type: str):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CsvBackend(OutputBackend):
+    """
+    Plain text csv files, to which the rows of each chunk are appended.
+    """
+    extension = 'csv'
+
+    def append(self, df: pd.DataFrame, data_type: str):
+        path = self._path(data_type)
+        if os.path.exists(path) and os.path.getsize(path) > self._max_file_size:
+            # Split the file
+            self._counters[data_type] += 1
+            path = self._path(data_type)
+
+        df.to_csv(path, mode='a', header=not pd.io.common.file_exists(path), index=False)
+
+
+class ParquetBackend(OutputBackend):
+    """
+    Compressed columnar parquet files, where each chunk is written as a row group. Float columns are typed with the
+    chosen precision, except for the time, which is always saved in double precision as the integer columns. The
+    statistics stored for each row group in the footer of the files work as an index of the row groups by simulation
+    time, used by read_output() to load a time range without reading the whole run.
+
+    It requires the optional dependency pyarrow.
+    """
+    extension = 'parquet'
+
+    def __init__(self, output_folder: Path, max_file_size: float = 1e9, compression: str = 'zstd',
+                 float_dtype: str = 'float64'):
+        """
+        Args:
+            output_folder (Path): folder where the files will be saved.
+            max_file_size (float): size in bytes after which a new file is started.
+            compression (str): compression codec of the columns (e.g. 'zstd', 'snappy', 'gzip' or 'none').
+            float_dtype (str): precision of the float columns, 'float64' or 'float32'.
+        """
+        super().__init__(output_folder=output_folder, max_file_size=max_file_size)
+        assert float_dtype in ['float64', 'float32'], "The float columns can be saved as float64 or float32 only."
+
+        pa, pq = _import_pyarrow()
+        self._pa = pa
+        self._pq = pq
+        self._compression = compression
+        self._float_dtype = np.dtype(float_dtype)
+        self._writers = {}
+
+    def _to_table(self, df: pd.DataFrame):
+        columns = {}
+        for name in df.columns:
+            values = df[name].to_numpy()
+            # Integers are saved as doubles too, since a column can switch to floats in the following chunks
+            if values.dtype.kind in 'iu' or (values.dtype.kind == 'f' and name == 'time'):
+                values = values.astype(np.float64)
+            elif values.dtype.kind == 'f':
+                values = values.astype(self._float_dtype)
+            columns[name] = values
+        return self._pa.table(columns)
+
+    def append(self, df: pd.DataFrame, data_type: str):
+        table = self._to_table(df)
+
+        if data_type not in self._writers:
+            path = self._path(data_type)
+            self._writers[data_type] = (self._pq.ParquetWriter(path, table.schema, compression=self._compression),
+                                        path)
+        writer, path = self._writers[data_type]
+
+        # Chunks of the same file share the schema of the first one
+        writer.write_table(table.select(writer.schema.names).cast(writer.schema), row_group_size=table.num_rows)
+
+        if os.path.getsize(path) > self._max_file_size:
+            # Split the file
+            writer.close()
+            del self._writers[data_type]
+            self._counters[data_type] += 1
+
+    def close(self):
+        """
+        Write the footers of the files still open, which cannot be read before.
+        """
+        for writer, _ in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+
 class DataWriter:
     """
-    Class that writes the data to a csv file in a thread-safe way.
-    
-    The split in multiple files is done when the file size exceeds the maximum size, but it can happen that the
-    saved file overcome the maximum size because the data is written in chunks. Thus, the threshold could be not
-    strictly respected and it's just a way to avoid huge files.
+    Class that writes the data to files in a thread-safe way.
+
+    Rows are collected by the simulation into batches of 'save_output_every' rows, that are handed to the writer
+    threads as whole chunks through bounded buffers, together with the chunks already arranged in columns (e.g. by a
+    StepRecorder). If the writer falls behind, the simulation waits for it when the buffers are full.
+
+    The format of the files is chosen among the available OutputBackend (csv by default), which also split the
+    data in multiple files when they exceed the maximum size.
     """
     def __init__(self, 
                  output_folder: str, 
+                 variables: list = None,
+                 max_pending_chunks: int = 8,
+                 output_format: str = 'csv',
+                 **backend_options
                  ):
         """
         Args:
-            output_folder (str): path to the folder where the csv files will be saved.
+            output_folder (str): path to the folder where the files will be saved.
+            variables (list, None): variables of the ground data to save (all of them if None). Simulated data are
+                already restricted to the recorded variables by the simulator.
+            max_pending_chunks (int): maximum number of chunks of each kind of data waiting to be written.
+            output_format (str): format of the files, among OutputBackend.FORMATS.
+            **backend_options: options of the backend of the format (e.g. compression of parquet files).
         """
         self._output_folder = output_folder
-        self._ground_queue = queue.Queue()
-        self._sim_queue = queue.Queue()
-        self._stop_event = threading.Event()
+        self._variables = variables
+        self._ground_buffer = ChunkBuffer(max_chunks=max_pending_chunks)
+        self._sim_buffer = ChunkBuffer(max_chunks=max_pending_chunks)
+        self._write_lock = threading.Lock()
         
-        # Queue length before saving
+        # Number of rows collected before handing them to the writer
         self._save_output_every = 10000
-        
-        # Options to split huge csv files
-        self._max_csv_size = 1e9
-        self._ground_counter = 0
-        self._sim_counter = 0
+        self._ground_rows = []
+        self._sim_rows = []
         
         try:
             os.makedirs(self._output_folder, exist_ok=True)
         except NotADirectoryError as e:
             logger.error("It's not possible to create directory {}: {}".format(self._output_folder, e.args))
+
+        self._backend = OutputBackend.get_instance(output_format)(output_folder=self._output_folder,
+                                                                  **backend_options)
             
         self._threads = []
         self.start()
         
     def start(self):
         """
-        Start the threads that write data to the csv file.
+        Start the threads that write data to the files.
         """
-        self._threads.append(threading.Thread(target=self._run_writer, args=(self._ground_queue, 'ground')))
-        self._threads.append(threading.Thread(target=self._run_writer, args=(self._sim_queue, 'simulated')))
+        self._threads.append(threading.Thread(target=self._run_writer, args=(self._ground_buffer, 'ground')))
+        self._threads.append(threading.Thread(target=self._run_writer, args=(self._sim_buffer, 'simulated')))
         
         for thread in self._threads:
             thread.start()
 
-    def _run_writer(self, _queue: queue.Queue, queue_type: str):
+    def _run_writer(self, buffer: ChunkBuffer, data_type: str):
         """
-        Thread that writes the data to the csv file.
+        Thread that writes the chunks of the buffer to the files, until the buffer is closed and emptied.
 
         Args:
-            queue (queue.Queue): queue that has to store the data to be written to the csv file.
+            buffer (ChunkBuffer): buffer of the chunks of data to be written to the files.
+            data_type (str): type of data of the buffer.
         """
-        while not self._stop_event.is_set():
+        while True:
+            chunk = buffer.get()
+            if chunk is None:
+                break
+
             try:
-                if _queue.qsize() < self._save_output_every:
-                    time.sleep(0.1)
-                    continue
-                else:
-                    data = [_queue.get() for _ in range(self._save_output_every)]
-                    _queue.task_done()
-                    self._write_to_csv(data, data_type=queue_type)
-                    
-            except queue.Empty:
-                continue
-        
-        # Save the remaining data
-        data = [_queue.get() for _ in range(_queue.qsize())]
-        _queue.task_done()
-        self._write_to_csv(data, data_type=queue_type)        
-        
-    def _write_to_csv(self, data, data_type:str='ground'):
+                self._write_data(chunk, data_type=data_type)
+            except Exception as e:
+                logger.error("It's not possible to write the {} data: {}".format(data_type, e))
+                buffer.close(error=e)
+                break
+
+    def _write_data(self, data, data_type: str = 'ground'):
         """
-        Write data to a csv file.
-        The split in multiple files is done when the file size exceeds the maximum size, but it can happen that the
-        saved file overcome the maximum size because the data is written in chunks. Thus, the threshold could be not
-        strictly respected and it's just a way to avoid huge files.
-        
+        Write data to the files of the backend.
+
         Args:
-            data (dict): data to be written to the csv file
+            data (dict, list): columns of the data or list of rows to be written
             data_type (str): type of data to be written. Defaults to 'ground'.
         """
-        df = pd.DataFrame.from_records(data)
-            
-        if data_type == 'ground':
-            filename = 'ground_{}.csv'.format(self._ground_counter)
-            
-            if os.path.exists(self._output_folder / filename) and os.path.getsize(self._output_folder / filename) > self._max_csv_size:
-                # Split the file        
-                self._ground_counter += 1
-                filename = 'ground_{}.csv'.format(self._ground_counter)
-            
-        elif data_type == 'simulated':
-            filename = 'dataset_{}.csv'.format(self._sim_counter)
-            
-            if os.path.exists(self._output_folder / filename) and os.path.getsize(self._output_folder / filename) > self._max_csv_size:
-                # Split the file        
-                self._sim_counter += 1
-                filename = 'dataset_{}.csv'.format(self._sim_counter)
-            
-        else:
-            raise ValueError("Data type not recognized.")
-        
-        df.to_csv(self._output_folder / filename, 
-                    mode='a', 
-                    header=not pd.io.common.file_exists(self._output_folder / filename), 
-                    index=False)
-    
-    def add_ground_data(self, data):
-        self._ground_queue.put(data)
+        df = pd.DataFrame(data) if isinstance(data, dict) else pd.DataFrame.from_records(data)
+        if data_type == 'ground' and self._variables is not None:
+            df = df[[column for column in df.columns if column in self._variables]]
+
+        with self._write_lock:
+            self._backend.append(df, data_type=data_type)
+
+    def write_chunk(self, data: dict, data_type: str = 'ground'):
+        """
+        Write a whole chunk of data (e.g. the results of a fused simulation) bypassing the buffers.
+
+        Args:
+            data (dict): columns of the chunk to be written
+            data_type (str): type of data to be written. Defaults to 'ground'.
+        """
+        self._write_data(data, data_type=data_type)
+
+    @property
+    def save_output_every(self):
+        return self._save_output_every
+
+    def add_ground_data(self, data: dict):
+        """
+        Add a row of ground data, handed to the writer with the following ones every 'save_output_every' rows.
+        """
+        self._ground_rows.append(data)
+        if len(self._ground_rows) >= self._save_output_every:
+            self._ground_buffer.put(self._ground_rows)
+            self._ground_rows = []
         
-    def add_simulated_data(self, data):
-        self._sim_queue.put(data)
+    def add_simulated_data(self, data: dict):
+        """
+        Add a row of simulated data, handed to the writer with the following ones every 'save_output_every' rows.
+        """
+        self._sim_rows.append(data)
+        if len(self._sim_rows) >= self._save_output_every:
+            self._sim_buffer.put(self._sim_rows)
+            self._sim_rows = []
+
+    def add_ground_chunk(self, data: dict):
+        """
+        Hand a chunk of ground rows arranged in columns to the writer, after the rows added before it.
+
+        Args:
+            data (dict): columns of the chunk, with the same length
+        """
+        if self._ground_rows:
+            self._ground_buffer.put(self._ground_rows)
+            self._ground_rows = []
+        self._ground_buffer.put(data)
+
+    def add_simulated_chunk(self, data: dict):
+        """
+        Hand a chunk of simulated rows arranged in columns to the writer, after the rows added before it.
+
+        Args:
+            data (dict): columns of the chunk, with the same length
+        """
+        if self._sim_rows:
+            self._sim_buffer.put(self._sim_rows)
+            self._sim_rows = []
+        self._sim_buffer.put(data)
             
     def stop(self):
-        self._stop_event.set()
+        """
+        Hand the rows collected so far to the writer and stop accepting new data. The threads stop as soon as the
+        data already handed to them are written.
+        """
+        for buffer, rows in [(self._ground_buffer, self._ground_rows), (self._sim_buffer, self._sim_rows)]:
+            if rows and buffer.error is None:
+                buffer.put(rows)
+            buffer.close()
+        self._ground_rows, self._sim_rows = [], []
         
     def close(self):
         """
-        Wait for the threads to finish and then delete the queues.
+        Wait for the threads to write all the data handed to them and close the files.
         """
         for thread in self._threads:
             thread.join()
-            
-        del self._ground_queue
-        del self._sim_queue
+        self._backend.close()
+
+        for buffer in [self._ground_buffer, self._sim_buffer]:
+            if buffer.error is not None:
+                raise Exception("The writer of the data failed: {}".format(buffer.error)) from buffer.error
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise Exception("The parquet output format requires pyarrow, install it with 'pip install pyarrow' or "
+                        "choose the csv format.")
+    return pyarrow, pyarrow.parquet
+
+
+def _output_files(output_folder: str, data_type: str):
+    """
+    Files of the given kind of data saved in the output folder, in the order they have been written.
+    """
+    prefix = OutputBackend.PREFIXES[data_type]
+    for extension in ['parquet', 'csv']:
+        files = sorted(Path(output_folder).glob('{}_*.{}'.format(prefix, extension)),
+                       key=lambda path: int(path.stem.split('_')[-1]))
+        if files:
+            return files
+    raise FileNotFoundError("There isn't any {} data saved in {}.".format(data_type, output_folder))
+
+
+def read_output_index(output_folder: str, data_type: str = 'simulated'):
+    """
+    Index of the row groups of the parquet files of a run, read from the footers of the files only.
+
+    Args:
+        output_folder (str): folder of the results of the run
+        data_type (str): kind of data, 'simulated' or 'ground'
+
+    Returns: a dataframe with the file, the row group, its number of rows and its first and last time
+    """
+    _, pq = _import_pyarrow()
+
+    index = []
+    for path in _output_files(output_folder, data_type):
+        if path.suffix != '.parquet':
+            raise Exception("The index is available only for the parquet output format.")
+
+        metadata = pq.ParquetFile(path).metadata
+        time_column = metadata.schema.names.index('time')
+        for i in range(metadata.num_row_groups):
+            statistics = metadata.row_group(i).column(time_column).statistics
+            index.append({'file': path, 'row_group': i, 'n_rows': metadata.row_group(i).num_rows,
+                          'time_min': statistics.min if statistics is not None else np.nan,
+                          'time_max': statistics.max if statistics is not None else np.nan})
+
+    return pd.DataFrame(index, columns=['file', 'row_group', 'n_rows', 'time_min', 'time_max'])
+
+
+def read_output(output_folder: str, data_type: str = 'simulated', start: float = None, end: float = None,
+                columns: list = None):
+    """
+    Load the data saved by a run, restricted to the time range [start, end].
+
+    With the parquet output format, only the row groups overlapping the range are read, as found by their index.
+    With the csv output format, the files are scanned in chunks keeping only the rows within the range.
+
+    Args:
+        output_folder (str): folder of the results of the run
+        data_type (str): kind of data, 'simulated' or 'ground'
+        start (float, None): first time of the range (from the beginning of the run if None)
+        end (float, None): last time of the range (until the end of the run if None)
+        columns (list, None): columns to load (all of them if None)
+    """
+    start = -np.inf if start is None else start
+    end = np.inf if end is None else end
+    read_columns = None if columns is None else list(dict.fromkeys(['time'] + list(columns)))
+
+    chunks = []
+    files = _output_files(output_folder, data_type)
+    if files[0].suffix == '.parquet':
+        _, pq = _import_pyarrow()
+        index = read_output_index(output_folder, data_type)
+        index = index[~((index['time_max'] < start) | (index['time_min'] > end))]
+
+        for path, row_groups in index.groupby('file', sort=False)['row_group']:
+            table = pq.ParquetFile(path).read_row_groups(row_groups.tolist(), columns=read_columns)
+            chunks.append(table.to_pandas())
+    else:
+        # The times of a run increase through its files, so the scan stops at the first chunk after the range
+        past_end = False
+        for path in files:
+            with pd.read_csv(path, usecols=read_columns, chunksize=100000) as reader:
+                for chunk in reader:
+                    if chunk['time'].min() > end:
+                        past_end = True
+                        break
+                    chunks.append(chunk[(chunk['time'] >= start) & (chunk['time'] <= end)])
+                    if chunk['time'].max() > end:
+                        past_end = True
+                        break
+            if past_end:
+                break
+
+    if not chunks:
+        return pd.DataFrame(columns=read_columns)
 
+    df = pd.concat(chunks, ignore_index=True)
+    df = df[(df['time'] >= start) & (df['time'] <= end)].reset_index(drop=True)
+    return df if columns is None else df[list(columns)]
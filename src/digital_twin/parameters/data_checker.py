@@ -1,12 +1,13 @@
-import pint.util
-from pint import UnitRegistry
-ureg = UnitRegistry()
+from src.preprocessing.units import get_registry
 
 
-def check_data_unit(param, unit: ureg.Unit):
+def check_data_unit(param, unit):
     """
 
     """
+    # Pint is imported only when the quantities are checked
+    import pint
+
     # Param is Quantity
     if isinstance(param, pint.Quantity):
         new_magnitude = param.magnitude
@@ -38,10 +39,13 @@ def check_data_unit(param, unit: ureg.Unit):
         )
 
 
-def craft_data_unit(param, unit: ureg.Unit):
+def craft_data_unit(param, unit):
     """
 
     """
+    import pint
+    ureg = get_registry()
+
     # Param is float or int: convert it to float quantity
     if isinstance(param, float) or isinstance(param, int):
         return ureg.Quantity(float(param), unit)
@@ -0,0 +1,272 @@
+import itertools
+from bisect import bisect_right
+
+import numpy as np
+
+
+class GridInterpolator:
+    """
+    Multilinear (bilinear, trilinear, ...) interpolator of values sampled on a rectilinear grid. Inside the cells it
+    differs from the triangle-wise interpolation of scipy LinearNDInterpolator (see TriangulatedGridInterpolator).
+
+    Axes are precomputed once, so that each evaluation only needs to locate the grid cell containing the point
+    (bisection for a single point, np.searchsorted for arrays of points) and to weight the values at its corners.
+    Points outside the grid are clamped to its boundaries, i.e. the value of the nearest point of the grid
+    is extrapolated.
+    """
+    def __init__(self, axes: list, values: np.ndarray):
+        """
+        Args:
+            axes (list): strictly increasing coordinates of the grid along each dimension
+            values (np.ndarray): values at the grid points, with shape (len(axes[0]), len(axes[1]), ...)
+        """
+        self._axes = [np.asarray(axis, dtype=float) for axis in axes]
+        self._values = np.asarray(values, dtype=float)
+
+        assert self._values.shape == tuple(len(axis) for axis in self._axes), \
+            "The shape of the values doesn't match the axes of the grid."
+        assert all(len(axis) >= 2 and np.all(np.diff(axis) > 0) for axis in self._axes), \
+            "The axes of the grid have to be strictly increasing with at least two points."
+
+        # Python copies of the grid to evaluate single points without numpy overhead
+        self._axes_list = [axis.tolist() for axis in self._axes]
+        self._values_list = self._values.tolist()
+        self._corners = list(itertools.product((0, 1), repeat=len(self._axes)))
+
+    @classmethod
+    def from_points(cls, x_values: list, y_values: list):
+        """
+        Build the interpolator from scattered points, as the ones read from a lookup table (one row for each
+        combination of the inputs). Returns None if the points don't form a complete rectilinear grid.
+
+        Args:
+            x_values (list): coordinates of the points for each dimension
+            y_values (list): values at the points
+        """
+        x_values = [np.asarray(x, dtype=float) for x in x_values]
+        y_values = np.asarray(y_values, dtype=float)
+
+        axes, indices = [], []
+        for x in x_values:
+            axis, index = np.unique(x, return_inverse=True)
+            if len(axis) < 2:
+                return None
+            axes.append(axis)
+            indices.append(index)
+
+        # Each node of the grid has to appear exactly once
+        if len(y_values) != np.prod([len(axis) for axis in axes]):
+            return None
+
+        flat_index = np.ravel_multi_index(indices, [len(axis) for axis in axes])
+        if len(np.unique(flat_index)) != len(flat_index):
+            return None
+
+        values = np.empty(len(flat_index))
+        values[flat_index] = y_values
+        return cls(axes=axes, values=values.reshape([len(axis) for axis in axes]))
+
+    @property
+    def axes(self):
+        return self._axes
+
+    @staticmethod
+    def _locate_scalar(axis: list, x: float):
+        """
+        Index of the cell containing x and relative position of x within the cell (clamped to [0, 1])
+        """
+        if x <= axis[0]:
+            return 0, 0.
+        if x >= axis[-1]:
+            return len(axis) - 2, 1.
+
+        i = bisect_right(axis, x) - 1
+        return i, (x - axis[i]) / (axis[i + 1] - axis[i])
+
+    def _evaluate_scalar(self, point):
+        cells = [self._locate_scalar(axis, x) for axis, x in zip(self._axes_list, point)]
+
+        # Bilinear interpolation (e.g. temp x soc tables) is the most common case
+        if len(cells) == 2:
+            (i, t), (j, u) = cells
+            v = self._values_list
+            return (1. - t) * ((1. - u) * v[i][j] + u * v[i][j + 1]) + t * ((1. - u) * v[i + 1][j] + u * v[i + 1][j + 1])
+
+        res = 0.
+        for corner in self._corners:
+            weight = 1.
+            value = self._values_list
+            for (i, t), c in zip(cells, corner):
+                weight *= t if c else 1. - t
+                value = value[i + c]
+            res += weight * value
+
+        return res
+
+    def _evaluate_array(self, points):
+        points = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in points])
+
+        indices, weights = [], []
+        for axis, x in zip(self._axes, points):
+            x = np.clip(x, axis[0], axis[-1])
+            i = np.clip(np.searchsorted(axis, x, side='right') - 1, 0, len(axis) - 2)
+            indices.append(i)
+            weights.append((x - axis[i]) / (axis[i + 1] - axis[i]))
+
+        res = np.zeros(points[0].shape)
+        for corner in self._corners:
+            weight = np.ones(points[0].shape)
+            for t, c in zip(weights, corner):
+                weight *= t if c else 1. - t
+            res += weight * self._values[tuple(i + c for i, c in zip(indices, corner))]
+
+        return res
+
+    def __call__(self, *points):
+        """
+        Evaluate the interpolator at the given coordinates, one argument for each dimension of the grid. Each
+        coordinate can be either a scalar (the result is a float) or an array (the result is an array).
+        """
+        if all(isinstance(x, (float, int)) for x in points):
+            return self._evaluate_scalar(points)
+        if all(np.ndim(x) == 0 for x in points):
+            return self._evaluate_scalar([float(x) for x in points])
+        return self._evaluate_array(points)
+
+
+class TriangulatedGridInterpolator(GridInterpolator):
+    """
+    Interpolator of values sampled on a 2D rectilinear grid which gives the same results of scipy
+    LinearNDInterpolator (with NearestNDInterpolator outside the grid), without its simplex search at each call.
+
+    The Delaunay triangulation of the points, the same computed by LinearNDInterpolator, is inspected once to find
+    which diagonal splits each cell of the grid. Each evaluation locates the cell containing the point and
+    interpolates linearly on the triangle of the cell containing it. Points outside the grid take the value of the
+    nearest point of the grid.
+    """
+    def __init__(self, axes: list, values: np.ndarray, main_diagonals: np.ndarray):
+        """
+        Args:
+            axes (list): strictly increasing coordinates of the grid along each dimension
+            values (np.ndarray): values at the grid points, with shape (len(axes[0]), len(axes[1]))
+            main_diagonals (np.ndarray): whether each cell is split along the diagonal from its (0, 0) corner to
+                its (1, 1) corner (True) or along the other one (False)
+        """
+        super().__init__(axes=axes, values=values)
+        assert len(self._axes) == 2, "Only 2D grids can be interpolated on triangles."
+
+        self._main_diagonals = np.asarray(main_diagonals, dtype=bool)
+        assert self._main_diagonals.shape == (len(self._axes[0]) - 1, len(self._axes[1]) - 1), \
+            "The shape of the diagonals doesn't match the cells of the grid."
+        self._main_diagonals_list = self._main_diagonals.tolist()
+
+    @classmethod
+    def from_points(cls, x_values: list, y_values: list):
+        """
+        Build the interpolator from the points of a lookup table, triangulated as done by LinearNDInterpolator.
+        Returns None if the points don't form a complete rectilinear 2D grid or if the triangulation doesn't split
+        each cell of the grid in two triangles.
+
+        Args:
+            x_values (list): coordinates of the points for each dimension
+            y_values (list): values at the points
+        """
+        if len(x_values) != 2:
+            return None
+
+        grid = GridInterpolator.from_points(x_values=x_values, y_values=y_values)
+        if grid is None:
+            return None
+
+        # Same triangulation of LinearNDInterpolator, which depends on the order of the points
+        from scipy.spatial import Delaunay
+        points = np.column_stack([np.asarray(x, dtype=float) for x in x_values])
+        simplices = Delaunay(points).simplices
+
+        nodes = np.column_stack([np.searchsorted(axis, points[:, d]) for d, axis in enumerate(grid.axes)])
+        vertices = nodes[simplices]
+        cells = vertices.min(axis=1)
+        if not np.all(vertices.max(axis=1) - cells == 1):
+            return None
+
+        # Each triangle leaves out a corner of its cell: the (0, 1) or (1, 0) corner for the main diagonal
+        corners = vertices - cells[:, None, :]
+        missing = 6 - (corners[:, :, 0] * 2 + corners[:, :, 1]).sum(axis=1)
+        is_main = (missing == 1) | (missing == 2)
+
+        shape = (len(grid.axes[0]) - 1, len(grid.axes[1]) - 1)
+        flat_cells = np.ravel_multi_index(cells.T, shape)
+        if len(flat_cells) != 2 * np.prod(shape) or np.any(np.bincount(flat_cells, minlength=np.prod(shape)) != 2):
+            return None
+
+        main_diagonals = np.zeros(np.prod(shape), dtype=bool)
+        main_diagonals[flat_cells] = is_main
+        if np.any(np.bincount(flat_cells, weights=is_main, minlength=np.prod(shape)) == 1):
+            return None
+
+        return cls(axes=grid.axes, values=grid._values, main_diagonals=main_diagonals.reshape(shape))
+
+    @staticmethod
+    def _nearest_scalar(axis: list, x: float):
+        if x <= axis[0]:
+            return 0
+        if x >= axis[-1]:
+            return len(axis) - 1
+
+        i = bisect_right(axis, x) - 1
+        return i if x - axis[i] <= axis[i + 1] - x else i + 1
+
+    @staticmethod
+    def _triangle(v00, v01, v10, v11, t, u, main_diagonal):
+        """
+        Linear interpolation on the triangle of the cell containing the relative position (t, u).
+        """
+        if main_diagonal:
+            if u <= t:
+                return v00 + t * (v10 - v00) + u * (v11 - v10)
+            return v00 + u * (v01 - v00) + t * (v11 - v01)
+        if t + u <= 1.:
+            return v00 + t * (v10 - v00) + u * (v01 - v00)
+        return v11 + (1. - t) * (v01 - v11) + (1. - u) * (v10 - v11)
+
+    def _evaluate_scalar(self, point):
+        (x, y), (x_axis, y_axis), v = point, self._axes_list, self._values_list
+
+        if not (x_axis[0] <= x <= x_axis[-1] and y_axis[0] <= y <= y_axis[-1]):
+            return v[self._nearest_scalar(x_axis, x)][self._nearest_scalar(y_axis, y)]
+
+        (i, t), (j, u) = self._locate_scalar(x_axis, x), self._locate_scalar(y_axis, y)
+        return self._triangle(v[i][j], v[i][j + 1], v[i + 1][j], v[i + 1][j + 1], t, u,
+                              self._main_diagonals_list[i][j])
+
+    def _evaluate_array(self, points):
+        x, y = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in points])
+        x_axis, y_axis = self._axes
+
+        indices, weights = [], []
+        for axis, p in zip(self._axes, (x, y)):
+            p = np.clip(p, axis[0], axis[-1])
+            i = np.clip(np.searchsorted(axis, p, side='right') - 1, 0, len(axis) - 2)
+            indices.append(i)
+            weights.append((p - axis[i]) / (axis[i + 1] - axis[i]))
+        (i, j), (t, u) = indices, weights
+
+        v = self._values
+        main_diagonal = self._main_diagonals[i, j]
+        v00, v01, v10, v11 = v[i, j], v[i, j + 1], v[i + 1, j], v[i + 1, j + 1]
+        res = np.where(main_diagonal,
+                       np.where(u <= t, v00 + t * (v10 - v00) + u * (v11 - v10),
+                                v00 + u * (v01 - v00) + t * (v11 - v01)),
+                       np.where(t + u <= 1., v00 + t * (v10 - v00) + u * (v01 - v00),
+                                v11 + (1. - t) * (v01 - v11) + (1. - u) * (v10 - v11)))
+
+        # Points outside the grid take the value of the nearest point of the grid
+        outside = (x < x_axis[0]) | (x > x_axis[-1]) | (y < y_axis[0]) | (y > y_axis[-1])
+        if outside.any():
+            nearest = []
+            for axis, p in zip(self._axes, (x[outside], y[outside])):
+                k = np.clip(np.searchsorted(axis, p, side='right') - 1, 0, len(axis) - 2)
+                nearest.append(np.where(p - axis[k] <= axis[k + 1] - p, k, k + 1))
+            res[outside] = v[nearest[0], nearest[1]]
+
+        return res
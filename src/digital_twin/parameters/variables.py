@@ -1,7 +1,7 @@
 from typing import Union
 
 import numpy as np
-from scipy.interpolate import interp1d, LinearNDInterpolator, NearestNDInterpolator
+from src.digital_twin.parameters.interpolation import GridInterpolator, TriangulatedGridInterpolator
 from src.preprocessing.data_preparation import _validate_data_unit
 import pandas as pd
 
@@ -23,6 +23,13 @@ class GenericVariable:
     def get_value(self, input_vars: dict):
         raise NotImplementedError
 
+    def get_values(self, input_vars: dict):
+        """
+        Evaluate the variable for arrays of inputs at once (e.g. the states of a fleet of batteries or of a whole
+        profile), returning an array with the broadcast shape of the inputs.
+        """
+        raise NotImplementedError
+
     def set_value(self, new_value):
         raise NotImplementedError
 
@@ -39,6 +46,10 @@ class Scalar(GenericVariable):
     def get_value(self, input_vars: dict = None):
         return self._value
 
+    def get_values(self, input_vars: dict = None):
+        shape = np.broadcast_shapes(*[np.shape(value) for value in input_vars.values()]) if input_vars else ()
+        return np.full(shape, self._value, dtype=float)
+
     def set_value(self, new_value):
         self._value = new_value
 
@@ -88,7 +99,7 @@ class LookupTableFunction(GenericVariable):
 
     """
 
-    def __init__(self, name: str, y_values: list, x_names: list, x_values: list):
+    def __init__(self, name: str, y_values: list, x_names: list, x_values: list, interpolation: str = 'linear'):
         super().__init__(name)
         self.y_values = y_values
         self.x_names = x_names
@@ -97,13 +108,28 @@ class LookupTableFunction(GenericVariable):
         self._function = None
         self._backup_function = None
 
+        # scipy is imported only when a lookup table is actually built
         if len(x_names) == 1:
+            from scipy.interpolate import interp1d
             self._function = interp1d(x_values[0], y_values, fill_value='extrapolate')
 
         elif len(x_names) > 1:
-            x_points = [[l[i] for l in self.x_values] for i in range(len(self.x_values[0]))]
-            self._function = LinearNDInterpolator(points=np.array(x_points), values=np.array(self.y_values))
-            self._backup_function = NearestNDInterpolator(x=np.array(x_points), y=np.array(self.y_values))
+            # Tables sampled on a rectilinear grid (e.g. temp x soc) are interpolated with a dedicated engine, on
+            # the same triangles of LinearNDInterpolator unless multilinear interpolation is explicitly chosen
+            if interpolation == 'multilinear':
+                self._function = GridInterpolator.from_points(x_values=self.x_values, y_values=self.y_values)
+            elif interpolation == 'linear':
+                self._function = TriangulatedGridInterpolator.from_points(x_values=self.x_values,
+                                                                          y_values=self.y_values)
+            else:
+                raise Exception("The interpolation '{}' of {} doesn't exist! Choose between 'linear' and "
+                                "'multilinear'.".format(interpolation, name))
+
+            if self._function is None:
+                from scipy.interpolate import LinearNDInterpolator, NearestNDInterpolator
+                x_points = [[l[i] for l in self.x_values] for i in range(len(self.x_values[0]))]
+                self._function = LinearNDInterpolator(points=np.array(x_points), values=np.array(self.y_values))
+                self._backup_function = NearestNDInterpolator(x=np.array(x_points), y=np.array(self.y_values))
 
         else:
             raise Exception("Too many variables to interpolate, not implemented yet!")
@@ -122,17 +148,45 @@ class LookupTableFunction(GenericVariable):
 
             input_values.append(input_vars[given_input])
 
-        if isinstance(self._function, interp1d):
+        # The grid interpolator handles both scalar and array inputs
+        if isinstance(self._function, GridInterpolator):
+            return self._function(*input_values)
+
+        # Inputs given as arrays (e.g. the state of a fleet of batteries) are evaluated at once
+        if any(np.ndim(input_val) > 0 for input_val in input_values):
+            return self.get_values(input_vars=dict(zip(self.x_names, input_values)))
+
+        # Only scattered points (LinearNDInterpolator) come with a backup function
+        if self._backup_function is None:
             return float(self._function(*[input_val for input_val in input_values]))
 
-        elif isinstance(self._function, LinearNDInterpolator):
+        else:
             res = float(self._function(*[input_val for input_val in input_values]))
             if np.isnan(res):
                 res = float(self._backup_function(*[input_val for input_val in input_values]))
             return res
 
-        else:
-            raise Exception("Given inputs list has a wrong dimension for the computation of {}".format(self.name))
+    def get_values(self, input_vars: dict):
+        """
+        Evaluate the lookup table for arrays of inputs in a single interpolator call. Inputs are retrieved by
+        name, so the whole state (e.g. {'temp': ..., 'soc': ..., 'soh': ...}) can be given.
+        """
+        try:
+            input_values = [np.asarray(input_vars[name], dtype=float) for name in self.x_names]
+        except KeyError:
+            raise Exception("Given inputs aren't correct for the computation of {}! Required inputs are {}.".format(
+                self.name, self.x_names))
+
+        input_values = np.broadcast_arrays(*input_values)
+
+        if self._backup_function is not None:
+            res = self._function(*input_values)
+            is_nan = np.isnan(res)
+            if is_nan.any():
+                res[is_nan] = self._backup_function(*[input_val[is_nan] for input_val in input_values])
+            return res
+
+        return np.asarray(self._function(*input_values), dtype=float)
 
     def set_value(self, new_value):
         raise AttributeError("Is impossible to modify the values within the lookup table of the parameter {}".
@@ -169,7 +223,8 @@ def instantiate_variables(var_dict: dict) -> dict:
                     y_values=var_dict[var]['lookup']['output'],
                     x_names=var_dict[var]['lookup']['inputs'].keys(),
                     x_values=[var_dict[var]['lookup']['inputs'][key] for key in
-                              var_dict[var]['lookup']['inputs'].keys()]
+                              var_dict[var]['lookup']['inputs'].keys()],
+                    interpolation=var_dict[var]['lookup'].get('interpolation', 'linear')
                 )
             # Csv lookup table
             else:
@@ -183,7 +238,8 @@ def instantiate_variables(var_dict: dict) -> dict:
                     x_values=[_validate_data_unit(data_list=table[var['label']].tolist(),
                                                   var_name=var['var'],
                                                   unit=var['unit'])
-                              for var in var_dict[var]['lookup']['inputs']]
+                              for var in var_dict[var]['lookup']['inputs']],
+                    interpolation=var_dict[var]['lookup'].get('interpolation', 'linear')
                 )
 
         else:
@@ -1,148 +1,340 @@
+import hashlib
+import json
 import logging
 import os
-import pint.util
+import re
+import shutil
+import tempfile
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from pint import UnitRegistry
+from src.preprocessing.units import convert
 
-ureg = UnitRegistry(autoconvert_offset_to_baseunit=True)
 logger = logging.getLogger('DT_ernesto')
 
-# Dictionary of units internally used inside the simulator
+# Version of the format of the cache of the ground data, to be increased when the parsing changes
+CACHE_VERSION = 1
+
+# Dictionary of units internally used inside the simulator (name and symbol), converted by the units module
 internal_units = dict(
-    current=['ampere', 'A', ureg.ampere],
-    voltage=['volt', 'V', ureg.volt],
-    power=['watt', 'W', ureg.watt],
-    resistance=['ohm', '\u03A9', ureg.ohm],
-    capacity=['faraday', 'F', ureg.faraday],
-    temperature=['kelvin', 'K', ureg.kelvin],
-    time=['seconds', 's', ureg.s],
-    soc=[None, None, None],
-    soh=[None, None, None]
+    current=['ampere', 'A'],
+    voltage=['volt', 'V'],
+    power=['watt', 'W'],
+    resistance=['ohm', '\u03A9'],
+    capacity=['faraday', 'F'],
+    temperature=['kelvin', 'K'],
+    time=['seconds', 's'],
+    soc=[None, None],
+    soh=[None, None]
 )
 
 
-def load_data_from_csv(csv_file: Path, vars_to_retrieve: [dict], **kwargs):
+def load_data_from_csv(csv_file: Path, vars_to_retrieve: [dict], cache: bool = True, **kwargs):
     """
     Function to preprocess preprocessing that need to be read from a csv table.
 
+    The parsed timestamps and the variables converted to the internal units are cached next to the csv file (in the
+    folder '.cache'), as binary arrays which are memory-mapped by the following runs on the same file. The cache is
+    keyed by the hash of the content of the file and by the variables to retrieve, so it is rebuilt when any of them
+    changes. The file is hashed only if its size or its modification time differ from the ones of the cached file.
+
     Args:
         csv_file (pathlib.Path): file path of the csv which we want to retrieve preprocessing from
         vars_to_retrieve (list(dict)): variables to retrieve from csv file
+        cache (bool): read and write the binary cache of the parsed data
+
+    Returns: the timestamps and a dictionary with the values of each variable, as numpy arrays (memory-mapped if
+        read from the cache)
     """
     # Check file existence
     if not os.path.isfile(csv_file):
         raise FileNotFoundError("The specified file '{}' doesn't not exist.".format(csv_file))
 
+    cache_folder = _cache_folder(csv_file, vars_to_retrieve, kwargs['time_format']) if cache else None
+    columns = _read_cache(cache_folder, vars_to_retrieve) if cache else None
+
+    if columns is None:
+        columns = _parse_csv(csv_file, vars_to_retrieve, kwargs['time_format'])
+        if cache:
+            _write_cache(cache_folder, columns, csv_file)
+
+    # The cache holds the whole file, the requested iterations are taken afterwards
+    rows = slice(None, kwargs['iterations']) if kwargs['iterations'] else slice(None)
+    timestamps = columns.pop('time')[rows]
+    vars_data = {var: values[rows] for var, values in columns.items()}
+
+    return timestamps, vars_data
+
+
+def _parse_csv(csv_file: Path, vars_to_retrieve: [dict], time_format: str):
+    """
+    Read the timestamps (in seconds) and the variables (in the internal units) from the csv file.
+    """
     df = None
     try:
         df = pd.read_csv(csv_file, encoding='unicode_escape')
-
-        if kwargs['iterations']:
-            df = df.iloc[:kwargs['iterations']]
     except IOError:
         logger.error("The specified file '{}' cannot be imported as a Pandas Dataframe.".format(csv_file))
 
-    # Retrieve and convert timestamps to list of seconds (format: YYYY/MM/DD hh:mm:ss)
-    if kwargs['time_format'] == 'seconds':
+    return _parse_frame(df, vars_to_retrieve, time_format)
+
+
+def _parse_frame(df: pd.DataFrame, vars_to_retrieve: [dict], time_format: str, verbose: bool = True):
+    """
+    Retrieve the timestamps and the variables from the rows of the csv file in the dataframe.
+    """
+    # Retrieve and convert timestamps to seconds (format: YYYY/MM/DD hh:mm:ss)
+    if time_format == 'seconds':
         timestamps = df['Time']
     else:
         timestamps = pd.to_datetime(df['Time'], format="%Y/%m/%d %H:%M:%S").values.astype(float) // 10 ** 9
-    vars_data = {}
+    columns = {'time': np.asarray(timestamps)}
 
     # We first check if the variable column label exists
     for var in vars_to_retrieve:
         if var['label'] not in df.columns:
             raise NameError("Label {} is not present among df columns [{}]".format(var['label'], df.columns))
         else:
-            vars_data[var['var']] = _validate_data_unit(df[var['label']].values.tolist(), var['var'], var['unit'])
+            columns[var['var']] = _validate_data_unit(df[var['label']].to_numpy(), var['var'], var['unit'],
+                                                      verbose=verbose)
 
-    return timestamps.tolist(), vars_data
+    return columns
 
 
-def sync_data_with_step(times: list, data: dict, sim_step: float, interp: bool = False):
+def iter_data_from_csv(csv_file: Path, vars_to_retrieve: [dict], chunk_size: int, time_format: str,
+                       iterations: int = None):
+    """
+    Read the csv table in chunks of rows, so that only a chunk at a time is kept in memory. Each chunk is parsed as
+    done by load_data_from_csv().
+
+    Args:
+        csv_file (pathlib.Path): file path of the csv which we want to retrieve preprocessing from
+        vars_to_retrieve (list(dict)): variables to retrieve from csv file
+        chunk_size (int): number of rows of each chunk
+        time_format (str): format of the 'Time' column, 'seconds' or 'timestamp'
+        iterations (int, None): number of rows to read (the whole file if None)
+
+    Returns: a generator of the chunks, each one as a dictionary with the 'time' and the variables as numpy arrays
+    """
+    if not os.path.isfile(csv_file):
+        raise FileNotFoundError("The specified file '{}' doesn't not exist.".format(csv_file))
+
+    header = pd.read_csv(csv_file, encoding='unicode_escape', nrows=0).columns
+    for var in vars_to_retrieve:
+        if var['label'] not in header:
+            raise NameError("Label {} is not present among df columns [{}]".format(var['label'], header))
+
+    # Only the needed columns are parsed, as floats since the type inferred from a single chunk could be different
+    # from the one of the whole column (e.g. integers in a chunk without decimal values)
+    n_rows = 0
+    with pd.read_csv(csv_file, encoding='unicode_escape', chunksize=chunk_size,
+                     usecols=['Time'] + [var['label'] for var in vars_to_retrieve],
+                     dtype={var['label']: float for var in vars_to_retrieve}) as reader:
+        for df in reader:
+            if iterations:
+                df = df.iloc[:iterations - n_rows]
+                if len(df) == 0:
+                    break
+            yield _parse_frame(df, vars_to_retrieve, time_format, verbose=n_rows == 0)
+            n_rows += len(df)
+
+
+def _file_digest(csv_file: Path):
+    """
+    Hash of the content of the csv file.
+    """
+    file_digest = hashlib.sha256()
+    with open(csv_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            file_digest.update(block)
+    return file_digest.hexdigest()[:16]
+
+
+def _file_stat(csv_file: Path):
+    stat = os.stat(csv_file)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _file_folders(csv_file: Path):
+    """
+    Folders of the caches of the versions of the csv file, one for each hash of its content.
+    """
+    csv_file = Path(csv_file)
+    cache_root = csv_file.parent / '.cache'
+    if not cache_root.is_dir():
+        return []
+    return [folder for folder in cache_root.iterdir()
+            if re.fullmatch(re.escape(csv_file.stem) + '_[0-9a-f]{16}', folder.name)]
+
+
+def _cache_folder(csv_file: Path, vars_to_retrieve: [dict], time_format: str):
+    """
+    Folder of the cache of the csv file, named after the hash of its content, with a subfolder for each set of
+    variables to retrieve. The hash is taken from the cache if the size and the modification time of the file are
+    the ones saved with it (in 'source.json'), otherwise the file is hashed again.
+    """
+    csv_file = Path(csv_file)
+    stat = _file_stat(csv_file)
+    spec = json.dumps([CACHE_VERSION, time_format, vars_to_retrieve], sort_keys=True).encode()
+
+    file_folder = None
+    for folder in _file_folders(csv_file):
+        try:
+            with open(folder / 'source.json') as f:
+                if json.load(f) == stat:
+                    file_folder = folder
+                    break
+        except (OSError, ValueError):
+            continue
+
+    if file_folder is None:
+        file_folder = csv_file.parent / '.cache' / '{}_{}'.format(csv_file.stem, _file_digest(csv_file))
+        # Same content with a different modification time (e.g. a copy of the file): the hash is saved again
+        if file_folder.is_dir():
+            _write_source(file_folder, stat)
+
+    return file_folder / hashlib.sha256(spec).hexdigest()[:16]
+
+
+def _write_source(file_folder: Path, stat: dict):
+    try:
+        with open(file_folder / 'source.json', 'w') as f:
+            json.dump(stat, f)
+    except OSError as e:
+        logger.warning("The cache of the ground data cannot be saved in '{}': {}".format(file_folder, e))
+
+
+def _read_cache(cache_folder: Path, vars_to_retrieve: [dict]):
+    """
+    Memory-map the cached columns, if they have been already saved.
+    """
+    names = ['time'] + [var['var'] for var in vars_to_retrieve]
+    try:
+        return {name: np.load(cache_folder / '{}.npy'.format(name), mmap_mode='r') for name in names}
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(cache_folder: Path, columns: dict, csv_file: Path):
+    """
+    Save the columns as binary arrays, removing the caches of previous versions of the same csv file. The cache is
+    written in a temporary folder which is then renamed, so that an interrupted run doesn't leave a partial cache.
+    """
+    file_folder = cache_folder.parent
+    tmp_folder = None
+    try:
+        file_folder.mkdir(parents=True, exist_ok=True)
+        for old_folder in _file_folders(csv_file):
+            if old_folder != file_folder:
+                shutil.rmtree(old_folder, ignore_errors=True)
+        _write_source(file_folder, _file_stat(csv_file))
+
+        tmp_folder = Path(tempfile.mkdtemp(dir=file_folder))
+        for name, values in columns.items():
+            np.save(tmp_folder / '{}.npy'.format(name), values)
+        os.replace(tmp_folder, cache_folder)
+    except OSError as e:
+        # The same cache can have been saved in the meanwhile by a parallel run
+        if not cache_folder.is_dir():
+            logger.warning("The cache of the ground data cannot be saved in '{}': {}".format(cache_folder, e))
+    finally:
+        if tmp_folder is not None:
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+
+
+def sync_data_with_step(times: list, data: dict, sim_step: float, interp: bool = False, max_gap: float = None):
     """
     Augmentation or reduction of the ground dataset in order to adapt it to the specified simulator timestep.
-    If the simulator timestamp is smaller than the time delta, we need to replicate the previous values or interpolate
-    data to coherently extend the dataset.
-    If the simulator timestamp is bigger, instead, we need to skip some input data and/or interpolate if necessary.
+    The data are resampled on a regular grid of times, starting from the first timestamp with a spacing of sim_step.
+    If the simulator timestamp is smaller than the time delta, the previous values are replicated or interpolated to
+    coherently extend the dataset, while if it is bigger some input data are skipped.
 
     Args:
-        times ():
-        data ():
-        sim_step ():
-        interp ():
+        times (list): timestamps of the ground data, in seconds
+        data (dict): values of each ground variable at the timestamps
+        sim_step (float): timestep of the simulator, in seconds
+        interp (bool): linear interpolation of the data instead of holding the last value
+        max_gap (float, None): gaps of the ground data longer than max_gap are not interpolated, the last value
+            before the gap is held instead (no check if None)
+
+    Returns: the times of the grid and the values of each variable on it, as numpy arrays
     """
-    if interp:
-        logger.error("Interpolation of ground data has not been implemented yet! "
-                     "The values will be just replicated by existing data!")
-        # Todo: allow interpolation
-        interp = False
-
-    sync_times = [times[0]]
-    sync_data = {key: [data[key][0]] for key in data.keys()}
-
-    i = 1
-    while i < len(times):
-        dt = times[i] - times[i - 1]
-
-        # If sim_step is smaller than dt, we perform data augmentation by duplicating data in between
-        if sim_step < dt:
-            # Compute the floor of the integer division and extend the new times list
-            floor = int(dt // sim_step)
-            sync_times.extend([times[i - 1] + j * sim_step for j in range(1, floor)])
-
-            if not interp:
-                aug_data = {key: [data[key][i - 1]] * (floor - 1) for key in sync_data.keys()}
-            else:
-                #TODO: implement interpolation
-                raise NotImplementedError()
+    times = np.asarray(times, dtype=float)
+    assert sim_step > 0, "The timestep of the simulator has to be positive, {} given.".format(sim_step)
 
-            # Extend the new data dictionary with repeated data
-            [sync_data[key].extend(aug_data[key]) for key in sync_data.keys()]
+    # The tolerance avoids losing samples because of the rounding of the grid times
+    n_steps = int(np.floor((times[-1] - times[0]) / sim_step + 1e-9)) + 1
+    sync_times = times[0] + np.arange(n_steps) * sim_step
 
-            sync_times.append(times[i])
-            [sync_data[key].append(data[key][i]) for key in sync_data.keys()]
-            i += 1
+    return sync_times, resample_on_grid(times, data, sync_times, tol=1e-9 * sim_step, interp=interp, max_gap=max_gap)
 
-        elif sim_step == dt:
-            sync_times.append(times[i])
-            [sync_data[key].append(data[key][i]) for key in sync_data.keys()]
-            i += 1
 
-        # If sim_step is greater than dt, we perform data reduction by deleting data in between
-        else:
-            # Deleting all the skipped data
-            [data[key].pop(i) for key in sync_data.keys()]
-            times.pop(i)
+def resample_on_grid(times: np.ndarray, data: dict, grid: np.ndarray, tol: float = 0., interp: bool = False,
+                     max_gap: float = None):
+    """
+    Values of the ground data at the given times of the grid, which cannot precede the first timestamp. The last
+    value before each time of the grid is taken, or the data are linearly interpolated.
+
+    Args:
+        times (np.ndarray): sorted timestamps of the ground data
+        data (dict): values of each ground variable at the timestamps
+        grid (np.ndarray): times where the data are evaluated
+        tol (float): tolerance on the times of the grid matching a timestamp
+        interp (bool): linear interpolation of the data instead of holding the last value
+        max_gap (float, None): gaps of the ground data longer than max_gap are not interpolated
+
+    Returns: the values of each variable on the grid, as numpy arrays
+    """
+    assert np.all(np.diff(times) >= 0), "The timestamps of the ground data have to be sorted."
+
+    # Index of the last sample taken before (or at) each time of the grid
+    prev = np.searchsorted(times, grid + tol, side='right') - 1
+
+    gaps = np.diff(times)
+    if max_gap is not None and np.any(gaps > max_gap):
+        logger.warning("{} gaps longer than {} s found in the ground data: the last value before each gap is held."
+                       .format(np.count_nonzero(gaps > max_gap), max_gap))
+
+    # Grid times where the last value is held instead of being interpolated
+    held = np.ones(len(grid), dtype=bool)
+    if interp:
+        held = np.append(gaps, 0.)[prev] > max_gap if max_gap is not None else np.zeros(len(grid), dtype=bool)
+
+    sync_data = {}
+    for key in data.keys():
+        values = np.asarray(data[key], dtype=float)
+        sync_data[key] = values[prev]
+        if not np.all(held):
+            sync_data[key] = np.where(held, sync_data[key], np.interp(grid, times, values))
 
-    return sync_times, sync_data
+    return sync_data
 
 
-def _validate_data_unit(data_list, var_name, unit):
+def _validate_data_unit(data_list, var_name, unit, verbose: bool = True):
     """
     Function to validate and adapt preprocessing unit to internal simulator units.
 
     Args:
-        data_list (list): list with values of a preprocessing stream
+        data_list (list, np.ndarray): values of a preprocessing stream, converted into the same type
         var_name (str): name of the variable
         unit (str): unit of the variable
+        verbose (bool): log the conversion of the unit
     """
     # Unit employed is already compliant with internal simulator units
     if unit == internal_units[var_name][1]:
         return data_list
 
     try:
-        tmp_data = data_list * ureg.parse_units(unit)
-        transformed_data = tmp_data.to(internal_units[var_name][2])
-        logger.info("Ground variable '{}' has been converted from [{}] to [{}]"
-                    .format(var_name, unit, internal_units[var_name][1]))
+        transformed_data = convert(data_list, unit, internal_units[var_name][0])
+        if verbose:
+            logger.info("Ground variable '{}' has been converted from [{}] to [{}]"
+                        .format(var_name, unit, internal_units[var_name][1]))
 
-    except pint.PintError as e:
-        logger.error("UnitError on '{}': ".format(var_name), e)
+    except ValueError as e:
+        logger.error("UnitError on '{}': {}".format(var_name, e))
         exit(1)
 
-    return transformed_data.magnitude.tolist()
+    return transformed_data.tolist() if isinstance(data_list, list) else transformed_data
 
 
 def validate_parameters_unit(param_dict):
@@ -162,11 +354,10 @@ def validate_parameters_unit(param_dict):
             # Parameter unit measure is not compliant with internal simulator units
             if param['unit'] != internal_units[param['var']][1]:
                 try:
-                    tmp_param = param['value'] * ureg.parse_units(param['unit'])
-                    transformed_dict[key] = tmp_param.to(internal_units[param['var']][2]).magnitude
+                    transformed_dict[key] = convert(param['value'], param['unit'], internal_units[param['var']][0])
 
-                except pint.PintError as e:
-                    logger.error("UnitError on '{}': ".format(param['var']), e)
+                except ValueError as e:
+                    logger.error("UnitError on '{}': {}".format(param['var'], e))
                     exit(1)
 
             else:
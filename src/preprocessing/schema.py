@@ -25,6 +25,8 @@ ground_data = Schema(
         "file": And(str, string_pattern),
         "load": And(str, var_pattern),
         "time_format": Or('seconds', 'timestamp'),
+        Optional("cache"): bool,
+        Optional("chunk_size"): Or(None, And(int, lambda n: n > 0)),
         "vars": [
             Or(
                 {
@@ -72,7 +74,10 @@ battery = Schema(
                 "soc": And(Or(float, And(int, Use(float))), lambda n: 0 <= n <= 1),
                 "soh": And(Or(float, And(int, Use(float))), lambda n: 0 <= n <= 1),
             },
-        Optional("reset_soc_every"): Or(int, None)
+        Optional("reset_soc_every"): Or(int, None),
+        Optional("n_batteries"): And(int, lambda n: n >= 1),
+        Optional("series_capacity"): Or(None, And(int, lambda n: n >= 1)),
+        Optional("aging_max_lag"): Or(None, And(int, lambda n: n >= 0))
     }
 )
 
@@ -93,8 +98,26 @@ config_schema = Schema(
         # Simulation options
         Optional("iterations"): Or(int, None),
         Optional("timestep"): Or(int, float, None),
+        Optional("interp_ground_data"): Or(bool, None),
+        Optional("max_ground_gap"): Or(None, And(Or(float, And(int, Use(float))), lambda n: n > 0)),
         Optional("check_soh_every"): Or(int, None),
         Optional("get_rest_after"): Or(int, None),
+        Optional("fused"): bool,
+        Optional("accelerated_aging"): {
+            "soh_threshold": And(Or(float, And(int, Use(float))), lambda n: n > 0),
+        },
+        Optional("output"): And({
+            Optional("variables"): Or(None, [str]),
+            Optional("stride"): Or(None, And(int, lambda n: n >= 1)),
+            Optional("period"): Or(None, And(Or(float, And(int, Use(float))), lambda n: n > 0)),
+            Optional("aggregates"): Or(None, {str: [Or("mean", "min", "max")]}),
+            Optional("format"): Or("csv", "parquet"),
+            Optional("parquet"): {
+                Optional("compression"): Or("zstd", "snappy", "gzip", "lz4", "brotli", "none"),
+                Optional("float_dtype"): Or("float64", "float32"),
+            },
+        }, lambda output: output.get("stride") is None or output.get("period") is None,
+            error="Output rows can be decimated either by 'stride' or by 'period', not both."),
         # Battery parameters
         "battery": battery,
     }
@@ -126,7 +149,8 @@ single_comp_hardcoded_lookup = Schema(
                 Optional('soc'): [And(Or(float, And(int, Use(float))), lambda n: 0 <= n <= 1)],
                 Optional('soh'): [And(Or(float, And(int, Use(float))), lambda n: 0 <= n <= 1)],
             },
-            "output": [Or(float, And(int, Use(float)))]
+            "output": [Or(float, And(int, Use(float)))],
+            Optional("interpolation"): Or('linear', 'multilinear')
         }
     },
 )
@@ -146,7 +170,8 @@ single_comp_csv_lookup = Schema(
                 "var": And(str, var_pattern),
                 "label": And(str, label_pattern),
                 "unit": Or(And(str, unit_pattern), None)
-            }
+            },
+            Optional("interpolation"): Or('linear', 'multilinear')
         }
     },
 )
@@ -200,8 +225,8 @@ mlp_thermal = Schema(
         "hidden_size": And(int),
         "output_size": And(int),
         "model_state": And(str, path_pattern),
-        "scaler": And(str, path_pattern),
-        "cuda": Or(False, True)
+        Optional("scaler"): And(str, path_pattern),
+        Optional("cuda"): Or(False, True)
     }
 )
 
@@ -216,6 +241,10 @@ bolun = Schema(
             "cyclic": [And(str, var_pattern)],
         },
         "cycle_counting_mode": Or('rainflow', 'streamflow', 'fastflow', only_one=True),
+        Optional("fastflow"): {
+            Optional("resolution"): Or(None, float),
+            Optional("max_open"): Or(None, And(int, lambda n: n >= 2)),
+        },
         #"compute_every": And(int)
     },
 )
@@ -0,0 +1,87 @@
+import functools
+import logging
+
+import numpy as np
+
+logger = logging.getLogger('DT_ernesto')
+
+# Common units of the ground data and of the parameters, with their dimension and the scale and offset of the affine
+# transformation to the corresponding SI unit (as defined by pint). Other units are resolved by pint.
+_UNITS = {
+    'A': ('current', 1., 0.), 'ampere': ('current', 1., 0.), 'mA': ('current', 1e-3, 0.),
+    'kA': ('current', 1e3, 0.),
+    'V': ('voltage', 1., 0.), 'volt': ('voltage', 1., 0.), 'mV': ('voltage', 1e-3, 0.), 'kV': ('voltage', 1e3, 0.),
+    'W': ('power', 1., 0.), 'watt': ('power', 1., 0.), 'mW': ('power', 1e-3, 0.), 'kW': ('power', 1e3, 0.),
+    'MW': ('power', 1e6, 0.),
+    'ohm': ('resistance', 1., 0.), 'Ω': ('resistance', 1., 0.), 'mohm': ('resistance', 1e-3, 0.),
+    'milliohm': ('resistance', 1e-3, 0.), 'mΩ': ('resistance', 1e-3, 0.), 'kohm': ('resistance', 1e3, 0.),
+    'kΩ': ('resistance', 1e3, 0.),
+    'K': ('temperature', 1., 0.), 'kelvin': ('temperature', 1., 0.), 'degC': ('temperature', 1., 273.15),
+    'celsius': ('temperature', 1., 273.15), 'degF': ('temperature', 5 / 9, 233.15 + 200 / 9),
+    'fahrenheit': ('temperature', 5 / 9, 233.15 + 200 / 9),
+    's': ('time', 1., 0.), 'second': ('time', 1., 0.), 'seconds': ('time', 1., 0.), 'ms': ('time', 1e-3, 0.),
+    'min': ('time', 60., 0.), 'minute': ('time', 60., 0.), 'h': ('time', 3600., 0.), 'hour': ('time', 3600., 0.),
+}
+
+_registry = None
+
+
+def get_registry():
+    """
+    Get the pint registry shared by the simulator, which is built (and pint imported) only at the first call.
+    """
+    global _registry
+    if _registry is None:
+        from pint import UnitRegistry
+        _registry = UnitRegistry(autoconvert_offset_to_baseunit=True)
+    return _registry
+
+
+@functools.lru_cache(maxsize=None)
+def get_conversion(from_unit: str, to_unit: str):
+    """
+    Resolve the conversion between two units into the scale and the offset of an affine transformation, i.e.
+    value_to = value_from * scale + offset. The conversion is computed once for each pair of units.
+
+    Args:
+        from_unit (str): unit of the values to convert
+        to_unit (str): unit of the converted values
+
+    Returns: the scale and the offset of the conversion
+    """
+    if from_unit == to_unit:
+        return 1., 0.
+
+    if from_unit in _UNITS and to_unit in _UNITS:
+        from_dim, from_scale, from_offset = _UNITS[from_unit]
+        to_dim, to_scale, to_offset = _UNITS[to_unit]
+        if from_dim != to_dim:
+            raise ValueError("Cannot convert from '{}' ({}) to '{}' ({}).".format(from_unit, from_dim, to_unit, to_dim))
+        return from_scale / to_scale, (from_offset - to_offset) / to_scale
+
+    # Unusual units are resolved by pint, evaluating the conversion of 0 and 1
+    import pint
+    ureg = get_registry()
+    try:
+        zero, one = (ureg.Quantity(np.array([0., 1.]), ureg.parse_units(from_unit)).to(ureg.parse_units(to_unit))
+                     .magnitude)
+    except pint.PintError as e:
+        raise ValueError("Cannot convert from '{}' to '{}': {}".format(from_unit, to_unit, e)) from e
+    return one - zero, zero
+
+
+def convert(values, from_unit: str, to_unit: str):
+    """
+    Convert values from a unit to another one.
+
+    Args:
+        values (float, list, np.ndarray): values to convert
+        from_unit (str): unit of the values
+        to_unit (str): unit of the converted values
+
+    Returns: the converted values, as a float or as a numpy array
+    """
+    scale, offset = get_conversion(from_unit, to_unit)
+    if np.ndim(values) == 0:
+        return float(values) * scale + offset
+    return np.asarray(values, dtype=float) * scale + offset
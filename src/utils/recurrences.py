@@ -0,0 +1,100 @@
+import numpy as np
+
+
+def linear_recurrence(alpha, beta, y0: float, block_size: int = 4096, max_log: float = 50.):
+    """
+    Solve the first order linear recurrence y[k] = alpha[k] * y[k-1] + beta[k] for the whole sequence at once.
+
+    With a constant coefficient the recurrence is a linear IIR filter and it is solved with scipy lfilter.
+    Otherwise, it is solved block by block as y[k] = P[k] * (y0 + sum_j(beta[j] / P[j])), where P[k] is the
+    cumulative product of the coefficients, splitting blocks before P[k] can underflow.
+
+    Args:
+        alpha (np.ndarray, float): positive coefficients of the recurrence (scalar if constant)
+        beta (np.ndarray): forcing terms of the recurrence
+        y0 (float): value of the sequence before the first element
+        block_size (int): maximum number of samples solved with a single cumulative product
+        max_log (float): maximum absolute value of log(P[k]) allowed within a block
+    """
+    beta = np.asarray(beta, dtype=float)
+    alpha = np.broadcast_to(np.asarray(alpha, dtype=float), beta.shape)
+    n = beta.shape[0]
+
+    if n == 0:
+        return np.empty(0)
+
+    if np.all(alpha == alpha[0]):
+        from scipy.signal import lfilter
+        return lfilter([1.], [1., -alpha[0]], beta, zi=[alpha[0] * y0])[0]
+
+    if np.any(alpha <= 0):
+        raise ValueError("The coefficients of the linear recurrence have to be positive.")
+
+    log_alpha = np.log(alpha)
+    y = np.empty(n)
+    start = 0
+
+    while start < n:
+        stop = min(start + block_size, n)
+        log_p = np.cumsum(log_alpha[start:stop])
+
+        over = np.flatnonzero(np.abs(log_p) > max_log)
+        if over.size:
+            stop = start + max(over[0], 1)
+            log_p = log_p[:stop - start]
+
+        p = np.exp(log_p)
+        y[start:stop] = p * (y0 + np.cumsum(beta[start:stop] / p))
+        y0 = y[stop - 1]
+        start = stop
+
+    return y
+
+
+def clipped_cumsum(x, y0: float, low: float, high: float, block_size: int = 4096):
+    """
+    Cumulative sum saturated within [low, high] at every step, i.e. y[k] = clip(y[k-1] + x[k], low, high).
+
+    The saturation at one bound is computed in closed form with a running maximum (or minimum) of the cumulative
+    sum, so that the sequence is solved with a handful of array operations for each time it moves from one bound
+    to the other one.
+
+    Args:
+        x (np.ndarray): increments of the sequence
+        y0 (float): value of the sequence before the first element
+        low (float): lower bound of the sequence
+        high (float): upper bound of the sequence
+        block_size (int): number of samples processed with a single cumulative sum
+    """
+    x = np.asarray(x, dtype=float)
+    n = x.shape[0]
+    y = np.empty(n)
+
+    # The walk is saturated at the upper bound until it crosses the lower bound, and vice versa
+    saturate_high = True
+    start = 0
+
+    while start < n:
+        stop = min(start + block_size, n)
+        walk = y0 + np.cumsum(x[start:stop])
+
+        if saturate_high:
+            traj = walk - np.maximum(np.maximum.accumulate(walk - high), 0.)
+            over = np.flatnonzero(traj < low)
+        else:
+            traj = walk - np.minimum(np.minimum.accumulate(walk - low), 0.)
+            over = np.flatnonzero(traj > high)
+
+        if over.size:
+            i = over[0]
+            y[start:start + i] = traj[:i]
+            y[start + i] = low if saturate_high else high
+            saturate_high = not saturate_high
+            stop = start + i + 1
+        else:
+            y[start:stop] = traj
+
+        y0 = y[stop - 1]
+        start = stop
+
+    return y
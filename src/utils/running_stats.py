@@ -0,0 +1,97 @@
+from collections import deque
+
+import numpy as np
+
+
+class RunningMean:
+    """
+    Mean of a growing series of values kept with a running sum and count, so that it can be read at any time in
+    constant time without storing or summing again the whole series.
+
+    If a window is given, the mean is computed over the most recent values only, which are retained to subtract
+    them from the sum once they exit the window.
+    """
+    def __init__(self, window: int = None):
+        """
+        Args:
+            window (int, None): number of most recent values considered by the mean (all the values if None)
+        """
+        assert window is None or window >= 1, "The window of the running mean has to contain at least one value."
+
+        self._window = window
+        self._values = deque() if window is not None else None
+        self._sum = 0.
+        self._count = 0
+        self._last = None
+
+    @property
+    def mean(self):
+        if self._count == 0:
+            return np.nan
+        return self._sum / self._count
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def window(self):
+        return self._window
+
+    def clear(self):
+        self._sum = 0.
+        self._count = 0
+        self._last = None
+        if self._values is not None:
+            self._values.clear()
+
+    def update(self, value: float):
+        """
+        Add a new value to the series.
+        """
+        self._sum += value
+        self._count += 1
+        self._last = value
+
+        if self._values is not None:
+            self._values.append(value)
+            if self._count > self._window:
+                self._sum -= self._values.popleft()
+                self._count -= 1
+
+    def extend(self, values):
+        """
+        Add an array of new values to the series.
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values) == 0:
+            return
+
+        if self._values is not None:
+            for value in values[-self._window:].tolist():
+                self.update(value)
+            return
+
+        self._sum += float(np.sum(values))
+        self._count += len(values)
+        self._last = float(values[-1])
+
+    def merge(self, mean: float, count: int):
+        """
+        Add a group of values of which only the mean is known (e.g. values that haven't been simulated).
+        """
+        assert self._values is None, "Values without a position in the series cannot be added to a windowed mean."
+
+        self._sum += mean * count
+        self._count += count
+
+    def replace_last(self, value: float):
+        """
+        Overwrite the most recent value of the series, e.g. when a state estimation is reset.
+        """
+        assert self._count > 0, "There isn't any value to replace in the running mean."
+
+        self._sum += value - self._last
+        self._last = value
+        if self._values is not None:
+            self._values[-1] = value
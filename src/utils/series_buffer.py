@@ -0,0 +1,144 @@
+import numpy as np
+
+
+class SeriesBuffer:
+    """
+    Compact collection of the values taken by a simulation variable at each step.
+
+    Values are stored in a preallocated numpy array that grows geometrically, instead of a list of boxed floats.
+    Each value can be either a scalar or an array with a fixed shape (e.g. a value for each battery of a fleet).
+    The buffer can be indexed as a list with the step of the simulation, since its length is the number of values
+    appended so far.
+
+    If a capacity is given, the buffer works as a ring that keeps only the last 'capacity' values: this is useful
+    when the history is already persisted by the writer. Older steps cannot be retrieved anymore and slices,
+    iteration and conversion to array are restricted to the retained values.
+    """
+    def __init__(self, capacity: int = None, initial_size: int = 1024):
+        """
+        Args:
+            capacity (int, None): maximum number of values retained by the buffer (unbounded if None)
+            initial_size (int): number of values allocated by the first append
+        """
+        assert capacity is None or capacity >= 1, \
+            "The capacity of the series buffer has to be a positive integer, {} given.".format(capacity)
+
+        self._capacity = capacity
+        self._initial_size = initial_size if capacity is None else min(initial_size, capacity)
+        self._data = None
+        self._length = 0
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def n_retained(self):
+        """
+        Number of values that can still be retrieved from the buffer
+        """
+        return self._length if self._capacity is None else min(self._length, self._capacity)
+
+    def _allocate(self, item_shape: tuple, n_values: int):
+        size = max(self._initial_size, n_values)
+        if self._capacity is not None:
+            size = min(size, self._capacity)
+        self._data = np.empty((size,) + item_shape)
+
+    def _reserve(self, n_values: int):
+        """
+        Grow the underlying array to store n_values. In ring mode, the array never exceeds the capacity and it
+        starts wrapping only after reaching it, so values are never reordered while growing.
+        """
+        if self._capacity is not None:
+            n_values = min(n_values, self._capacity)
+
+        size = len(self._data)
+        if n_values > size:
+            new_size = max(2 * size, n_values)
+            if self._capacity is not None:
+                new_size = min(new_size, self._capacity)
+
+            data = np.empty((new_size,) + self._data.shape[1:])
+            data[:self._length] = self._data[:self._length]
+            self._data = data
+
+    def _position(self, k):
+        return k if self._capacity is None else k % self._capacity
+
+    def append(self, value):
+        if self._data is None:
+            self._allocate(np.shape(value), 1)
+        self._reserve(self._length + 1)
+
+        self._data[self._position(self._length)] = value
+        self._length += 1
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        if self._data is None:
+            self._allocate(values.shape[1:], len(values))
+
+        self._reserve(self._length + len(values))
+
+        # In ring mode, only the last values fitting in the buffer are stored
+        if self._capacity is not None and len(values) > self._capacity:
+            self._length += len(values) - self._capacity
+            values = values[-self._capacity:]
+
+        if self._capacity is None:
+            self._data[self._length:self._length + len(values)] = values
+        else:
+            self._data[self._position(np.arange(self._length, self._length + len(values)))] = values
+        self._length += len(values)
+
+    def clear(self):
+        self._data = None
+        self._length = 0
+
+    def to_array(self):
+        """
+        Retained values in chronological order
+        """
+        if self._data is None:
+            return np.empty(0)
+
+        if self._capacity is None or self._length <= self._capacity:
+            return self._data[:self._length].copy()
+
+        start = self._position(self._length)
+        return np.concatenate((self._data[start:], self._data[:start]))
+
+    def tolist(self):
+        return self.to_array().tolist()
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return self.to_array()[k]
+
+        if k < 0:
+            k += self._length
+
+        if k < 0 or k >= self._length:
+            raise IndexError("Step {} of the series not computed yet.".format(k))
+        if k < self._length - self.n_retained:
+            raise IndexError("Step {} of the series is no more retained by the buffer (capacity of {} values)."
+                             .format(k, self._capacity))
+
+        value = self._data[self._position(k)]
+        return value.item() if value.ndim == 0 else value.copy()
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.to_array()
+        return array if dtype is None else array.astype(dtype)
+
+    def __repr__(self):
+        return "SeriesBuffer({}, capacity={})".format(self.to_array(), self._capacity)
@@ -0,0 +1,266 @@
+import math
+
+import numpy as np
+
+
+class StepRecorder:
+    """
+    Columnar recorder of the variables of a simulation, collecting a row of values at each step.
+
+    Variables are registered once with a getter of their current value and each of them gets a fixed slot, i.e. a
+    preallocated numpy column where the values are written step by step. When the columns are full (or when the
+    recorder is flushed) the chunk of recorded rows is handed to the consumer as a dictionary of arrays, so that no
+    dictionary has to be built at each step.
+
+    Rows can be decimated, recording one step every 'stride' steps or at most one step every 'period' units of the
+    clock (e.g. seconds of simulated time). The getters of the variables are not even called on the steps that are
+    not recorded, unless aggregates of the variable over the window of steps between two rows are requested
+    ('mean', 'min' or 'max', recorded in the columns '<name>_<aggregate>').
+
+    Variables with an array value (e.g. a value for each battery of a fleet) are split in a column for each entry,
+    named '<name>_<j>'. Variables whose getter returns integers (both when registered and when the chunk is handed)
+    are handed as integer columns, unless the chunk contains values that are not integral.
+    """
+    aggregates = ('mean', 'min', 'max')
+
+    class _Slot:
+        """
+        Columns of a recorded variable and accumulators of its aggregates over the current window of steps
+        """
+        def __init__(self, name, getter, value, chunk_size, instant, aggregates):
+            self.name = name
+            self.getter = getter
+            self.instant = instant
+            self.aggregates = [stat for stat in StepRecorder.aggregates if stat in aggregates]
+            self.is_int = StepRecorder._is_int(value)
+            self.width = np.size(value) if np.ndim(value) > 0 else None
+
+            shape = (chunk_size,) if self.width is None else (chunk_size, self.width)
+            self.column = np.empty(shape)
+            self.stat_columns = [np.empty(shape) for _ in self.aggregates]
+
+            self.last = None
+            self.sum = 0.
+            self.min = None
+            self.max = None
+            self.count = 0
+
+        def accumulate(self):
+            value = self.getter()
+            if self.count == 0:
+                self.sum, self.min, self.max = value, value, value
+            elif self.width is None:
+                self.sum += value
+                self.min = min(self.min, value)
+                self.max = max(self.max, value)
+            else:
+                self.sum = self.sum + value
+                self.min = np.minimum(self.min, value)
+                self.max = np.maximum(self.max, value)
+            self.last = value
+            self.count += 1
+
+        def write_window(self, n):
+            stats = {'mean': self.sum / self.count, 'min': self.min, 'max': self.max}
+            for stat, column in zip(self.aggregates, self.stat_columns):
+                column[n] = stats[stat]
+            self.count = 0
+
+        def columns(self):
+            """
+            Name, column and integer flag of each column of the variable
+            """
+            columns = [(self.name, self.column, self.is_int)] if self.instant else []
+            columns += [('{}_{}'.format(self.name, stat), column, self.is_int and stat != 'mean')
+                        for stat, column in zip(self.aggregates, self.stat_columns)]
+            return columns
+
+    def __init__(self, on_chunk, chunk_size: int = 10000, stride: int = 1, period: float = None, clock=None):
+        """
+        Args:
+            on_chunk (callable): consumer of the chunks of recorded rows, called with a dictionary of columns
+            chunk_size (int): number of rows of each chunk
+            stride (int): number of steps between two recorded rows
+            period (float, None): minimum clock interval between two recorded rows (no time decimation if None)
+            clock (callable, None): function without arguments returning the current time, required by 'period'
+        """
+        assert chunk_size >= 1, "The chunks of the step recorder have to contain at least one row."
+        assert stride >= 1, "The stride of the step recorder has to be a positive integer, {} given.".format(stride)
+        assert period is None or (period > 0 and clock is not None), \
+            "The period of the step recorder has to be positive and requires a clock."
+
+        self._on_chunk = on_chunk
+        self._chunk_size = chunk_size
+        self._stride = stride
+        self._period = period
+        self._clock = clock
+
+        self._registered = []
+        self._slots = []
+        self._instant = []
+        self._aggregated = []
+
+        self._n_rows = 0
+        self._n_recorded = 0
+        self._n_steps = 0
+        self._start_time = None
+        self._next_time = None
+
+    @property
+    def names(self):
+        names = []
+        for slot in self._slots:
+            for name, _, _ in slot.columns():
+                names += [name] if slot.width is None else ['{}_{}'.format(name, j) for j in range(slot.width)]
+        return names
+
+    @property
+    def n_recorded(self):
+        """
+        Number of rows recorded so far, including the ones already handed to the consumer
+        """
+        return self._n_recorded
+
+    @staticmethod
+    def _is_int(value):
+        return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+
+    def register(self, name: str, getter, instant: bool = True, aggregates: list = None):
+        """
+        Add a variable to the recorded ones, or replace the getter of a variable already registered (the column keeps
+        its position). Variables can be registered only before the first row is recorded.
+
+        Args:
+            name (str): name of the variable
+            getter (callable): function without arguments returning the current value of the variable
+            instant (bool): record the value of the variable at the recorded steps
+            aggregates (list, None): aggregates of the variable over the steps between two rows
+        """
+        assert self._n_steps == 0, "Variables cannot be registered after the recording has started."
+
+        aggregates = aggregates if aggregates is not None else []
+        for stat in aggregates:
+            if stat not in self.aggregates:
+                raise Exception("Aggregate '{}' of variable {} is not available, choose among {}."
+                                .format(stat, name, list(self.aggregates)))
+
+        slot = self._Slot(name, getter, getter(), self._chunk_size, instant, aggregates)
+        if name in self._registered:
+            self._slots[self._registered.index(name)] = slot
+        else:
+            self._registered.append(name)
+            self._slots.append(slot)
+
+        self._instant = [slot for slot in self._slots if slot.instant and not slot.aggregates]
+        self._aggregated = [slot for slot in self._slots if slot.aggregates]
+
+    def _is_due(self):
+        if self._period is None:
+            return (self._n_steps - 1) % self._stride == 0
+
+        # Rows are aligned to a grid of the clock starting from the first recorded step
+        time = self._clock()
+        if self._start_time is None:
+            self._start_time = time
+        elif time < self._next_time:
+            return False
+        self._next_time = self._start_time + (math.floor((time - self._start_time) / self._period) + 1) * self._period
+        return True
+
+    def record(self):
+        """
+        Write the current value of each variable in its slot, if the step has to be recorded.
+
+        Returns: True if a row has been recorded at this step
+        """
+        self._n_steps += 1
+        for slot in self._aggregated:
+            slot.accumulate()
+
+        if not self._is_due():
+            return False
+
+        n = self._n_rows
+        for slot in self._instant:
+            slot.column[n] = slot.getter()
+        for slot in self._aggregated:
+            if slot.instant:
+                slot.column[n] = slot.last
+            slot.write_window(n)
+
+        self._n_rows = n + 1
+        self._n_recorded += 1
+        if self._n_rows == self._chunk_size:
+            self.flush()
+        return True
+
+    def record_block(self, columns: dict, times=None):
+        """
+        Record a block of consecutive steps at once (e.g. a whole profile solved by a fused simulation), given the
+        values taken by each registered variable at each step. Rows are decimated as if the steps were recorded one
+        by one, but aggregates are not available.
+
+        Args:
+            columns (dict): values of each registered variable at each step of the block
+            times (np.ndarray, None): clock at each step of the block, required by 'period'
+
+        Returns: the indices of the steps of the block that have been recorded
+        """
+        assert not self._aggregated, "Aggregates cannot be recorded from a block of steps."
+
+        n_steps = len(columns[self._registered[0]])
+        if self._period is None:
+            due = (np.arange(self._n_steps, self._n_steps + n_steps) % self._stride) == 0
+        else:
+            times = np.asarray(times, dtype=float)
+            if self._start_time is None:
+                self._start_time = self._next_time = times[0]
+
+            # Only the first step reaching each period of the grid of the clock is recorded
+            bins = np.floor((times - self._start_time) / self._period)
+            first = np.concatenate(([True], bins[1:] != bins[:-1]))
+            due = first & (times >= self._next_time)
+        rows = np.flatnonzero(due)
+
+        self._n_steps += n_steps
+        if self._period is not None and len(rows) > 0:
+            self._next_time = self._start_time + (bins[rows[-1]] + 1) * self._period
+
+        start = 0
+        while start < len(rows):
+            n = self._n_rows
+            block_rows = rows[start:start + self._chunk_size - n]
+            for slot in self._slots:
+                slot.column[n:n + len(block_rows)] = np.asarray(columns[slot.name])[block_rows]
+
+            self._n_rows += len(block_rows)
+            self._n_recorded += len(block_rows)
+            start += len(block_rows)
+            if self._n_rows == self._chunk_size:
+                self.flush()
+
+        return rows
+
+    def flush(self):
+        """
+        Hand the rows recorded since the last chunk to the consumer, even if the columns are not full yet.
+        """
+        n = self._n_rows
+        if n == 0:
+            return
+
+        chunk = {}
+        for slot in self._slots:
+            is_int_now = self._is_int(slot.last if slot.aggregates else slot.getter())
+            for name, column, is_int in slot.columns():
+                values = column[:n].copy()
+                if is_int and is_int_now and np.all(values == np.round(values)):
+                    values = values.astype(np.int64)
+
+                if values.ndim == 1:
+                    chunk[name] = values
+                else:
+                    chunk.update({'{}_{}'.format(name, j): values[:, j] for j in range(values.shape[1])})
+
+        self._n_rows = 0
+        self._on_chunk(chunk)
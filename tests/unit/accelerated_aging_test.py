@@ -0,0 +1,80 @@
+import unittest
+import numpy as np
+import yaml
+from src.digital_twin.orchestrator.simulation.driven_sim import DrivenSimulator
+from tests.unit.helpers import battery_models_config, driven_sim_config
+
+
+class RepeatedProfileLoader:
+    """
+    Minimal driven loader repeating a charge/discharge profile for many cycles
+    """
+    def __init__(self, n_cycles, dt=10.):
+        times = np.arange(0., 7200. + dt, dt)
+        current = np.where(times < 3600., -1.25, 1.25)
+
+        self.input_var = 'current'
+        self.timestep = None
+        self.in_memory = True
+        self.n_cycles = n_cycles
+        self.cycle_duration = times[-1]
+        self.cycle_length = len(times)
+        self.duration = times[-1] * n_cycles
+        self._data = {'current': current.tolist() * n_cycles,
+                      'time': [t + self.cycle_duration * i for i in range(n_cycles) for t in times]}
+
+    def iter_columns(self, chunk_size):
+        for start in range(0, len(self._data['time']), chunk_size):
+            yield {key: np.asarray(values[start:start + chunk_size]) for key, values in self._data.items()}
+
+    def get_all_data(self):
+        return self._data
+
+    def destroy(self):
+        pass
+
+
+class NullWriter:
+    save_output_every = 10000
+
+    def add_ground_chunk(self, data):
+        pass
+
+    def add_simulated_chunk(self, data):
+        pass
+
+
+class AcceleratedAgingTest(unittest.TestCase):
+    def setUp(self):
+        with open('data/config/models/aging/bolun.yaml') as f:
+            aging_config = yaml.safe_load(f)
+        aging_config['components']['cycle_counting_mode'] = 'rainflow'
+
+        self.model_config = battery_models_config() + [aging_config]
+        self.sim_config = driven_sim_config(soc=1., check_soh_every=100)
+
+    def _simulate(self, n_cycles, accelerated_aging=None):
+        if accelerated_aging is not None:
+            self.sim_config['accelerated_aging'] = accelerated_aging
+        simulator = DrivenSimulator(model_config=self.model_config, sim_config=self.sim_config,
+                                    data_loader=RepeatedProfileLoader(n_cycles=n_cycles), data_writer=NullWriter())
+        simulator.solve()
+        return simulator
+
+    def test_extrapolated_soh(self):
+        full = self._simulate(n_cycles=40)
+        accelerated = self._simulate(n_cycles=40, accelerated_aging={'soh_threshold': 1e-3})
+
+        full_battery, accelerated_battery = full._battery, accelerated._battery
+        soh_drop = 1. - full_battery.soh_series[-1]
+        error = abs(full_battery.soh_series[-1] - accelerated_battery.soh_series[-1])
+
+        # Only a fraction of the cycles is simulated, with the final SoH close to the one of the full simulation
+        self.assertLess(len(accelerated_battery.soh_series), 0.5 * len(full_battery.soh_series))
+        self.assertAlmostEqual(accelerated._elapsed_time, full._elapsed_time)
+        self.assertLess(error, 0.01 * soh_drop)
+        self.assertLessEqual(error, accelerated.aging_error_bound)
+
+
+if __name__ == '__main__':
+    unittest.main()
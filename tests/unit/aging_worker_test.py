@@ -0,0 +1,78 @@
+import unittest
+import numpy as np
+import yaml
+from src.digital_twin.battery_models.aging.bolun import BolunModel
+from src.digital_twin.battery_models.aging.worker import AgingWorker
+
+
+class FailingModel(BolunModel):
+    def compute_degradation(self, **kwargs):
+        return 1 / 0
+
+
+class AgingWorkerTest(unittest.TestCase):
+    def setUp(self):
+        with open('data/config/models/aging/bolun.yaml') as f:
+            self.config = yaml.safe_load(f)
+        self.config['components']['cycle_counting_mode'] = 'rainflow'
+
+        rng = np.random.default_rng(0)
+        self.soc = np.clip(0.5 + 0.3 * np.sin(np.linspace(0., 60., 3000)) + rng.normal(0., 1e-3, 3000), 0., 1.)
+        self.temp = 298.15 + rng.normal(0., 1., 3000)
+
+    def _new_model(self):
+        model = BolunModel(components_settings=self.config['components'], stress_models=self.config['stress_models'])
+        model.init_model()
+        return model
+
+    def _run(self, max_lag):
+        model = self._new_model()
+        worker = AgingWorker(aging_model=model, max_lag=max_lag) if max_lag is not None else None
+        soc_series, temp_series, degradation = [], [], []
+
+        for k in range(3000):
+            soc_series.append(self.soc[k])
+            temp_series.append(self.temp[k])
+            if k > 0 and k % 100 == 0:
+                if worker is None:
+                    degradation.append(model.compute_degradation(soc_history=soc_series, temp_history=temp_series,
+                                                                 elapsed_time=k, k=k))
+                else:
+                    worker.submit(soc_series=soc_series, temp_series=temp_series, elapsed_time=k, k=k)
+                    self.assertLessEqual(worker.pending, max_lag)
+
+                # The last sample can be overwritten after the check
+                soc_series[-1] = 0.5
+
+        if worker is not None:
+            worker.close()
+            return model.get_deg_series()[1:]
+        return degradation
+
+    def test_matches_synchronous_aging(self):
+        np.testing.assert_allclose(self._run(max_lag=0), self._run(max_lag=None))
+        np.testing.assert_allclose(self._run(max_lag=3), self._run(max_lag=None))
+
+    def test_calls_reach_the_model_of_the_worker(self):
+        model = self._new_model()
+        worker = AgingWorker(aging_model=model, max_lag=2)
+        worker.submit(soc_series=self.soc[:1000].tolist(), temp_series=self.temp[:1000].tolist(), elapsed_time=1000,
+                      k=1000)
+        cyclic_damage = worker.call('get_cyclic_damage')
+        self.assertGreater(cyclic_damage, 0.)
+
+        worker.call('add_cyclic_damage', 0.1)
+        worker.close()
+        self.assertEqual(model.get_cyclic_damage(), cyclic_damage)
+        self.assertGreaterEqual(model._f_cyc_closed, 0.1)
+
+    def test_worker_errors_are_raised(self):
+        model = FailingModel(components_settings=self.config['components'], stress_models=self.config['stress_models'])
+        model.init_model()
+        worker = AgingWorker(aging_model=model, max_lag=0)
+        self.assertRaises(Exception, worker.submit, soc_series=[0.5], temp_series=[298.15], elapsed_time=0, k=1)
+        self.assertRaises(Exception, worker.close)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import numpy as np
+from src.digital_twin.battery_models.electrical.ecm import FirstOrderThevenin, SecondOrderThevenin
+from src.digital_twin.battery_models.electrical.batched_ecm import BatchedFirstOrderThevenin, \
+    BatchedSecondOrderThevenin
+from tests.unit.helpers import scalar_settings
+
+
+class BatchedFirstOrderTheveninTest(unittest.TestCase):
+    def setUp(self):
+        self.settings = scalar_settings(r0=0.003, r1=0.002, c=10000., v_ocv=3.7)
+        self.r0_values = [0.002, 0.003, 0.004]
+        self.init_conditions = {'voltage': 3.7, 'current': 0., 'temperature': 298.15, 'soc': 0.5, 'soh': 1.}
+
+    def _build_reference_models(self, sign_convention):
+        models = []
+        for r0 in self.r0_values:
+            model = FirstOrderThevenin(components_settings=self.settings, sign_convention=sign_convention)
+            model.reset_model(r0=r0)
+            model.load_battery_state(temp=298.15, soc=0.5, soh=1.)
+            model.init_model(**self.init_conditions)
+            models.append(model)
+        return models
+
+    def _build_batched_model(self, sign_convention):
+        model = BatchedFirstOrderThevenin(components_settings=self.settings, sign_convention=sign_convention,
+                                          n_batteries=len(self.r0_values))
+        model.reset_model(r0=self.r0_values)
+        model.load_battery_state(temp=298.15, soc=0.5, soh=1.)
+        model.init_model(**self.init_conditions)
+        return model
+
+    def test_current_driven_matches_scalar_models(self):
+        for sign_convention in ['active', 'passive']:
+            references = self._build_reference_models(sign_convention)
+            batched = self._build_batched_model(sign_convention)
+
+            for k, i_load in enumerate([3., -2., 0., 5.5, -4.]):
+                v, i = batched.step_current_driven(i_load=i_load, dt=1., k=k)
+                expected = [model.step_current_driven(i_load=i_load, dt=1., k=k) for model in references]
+                np.testing.assert_allclose(v, [res[0] for res in expected])
+                np.testing.assert_allclose(i, [res[1] for res in expected])
+                np.testing.assert_allclose(batched.compute_generated_heat(),
+                                           [model.compute_generated_heat() for model in references])
+
+            for key, values in batched.get_results(k=-1).items():
+                np.testing.assert_allclose(values, [model.get_results(k=-1)[key] for model in references])
+
+    def test_voltage_and_power_driven_match_scalar_models(self):
+        references = self._build_reference_models('passive')
+        batched = self._build_batched_model('passive')
+
+        for k, (load_var, load) in enumerate([('voltage', 3.6), ('power', 10.), ('voltage', 3.8), ('power', -7.)]):
+            step = 'step_{}_driven'.format(load_var)
+            batched_res = getattr(batched, step)(load, dt=1., k=k)
+            expected = [getattr(model, step)(load, dt=1., k=k) for model in references]
+            np.testing.assert_allclose(batched_res[0], [res[0] for res in expected])
+            np.testing.assert_allclose(batched_res[1], [res[1] for res in expected])
+
+    def test_wrong_parameter_override(self):
+        batched = self._build_batched_model('active')
+        self.assertRaises(KeyError, batched.set_params, r2=[1., 2., 3.])
+
+
+class BatchedSecondOrderTheveninTest(unittest.TestCase):
+    def test_current_driven_matches_scalar_models(self):
+        settings = scalar_settings(r0=0.003, r1=0.002, c1=10000., r2=0.001, c2=50000., v_ocv=3.7)
+        init_conditions = {'voltage': 3.7, 'current': 0., 'temperature': 298.15, 'soc': 0.5, 'soh': 1.}
+
+        reference = SecondOrderThevenin(components_settings=settings, sign_convention='passive')
+        reference.load_battery_state(temp=298.15, soc=0.5, soh=1.)
+        reference.init_model(**init_conditions)
+
+        batched = BatchedSecondOrderThevenin(components_settings=settings, sign_convention='passive', n_batteries=4)
+        batched.load_battery_state(temp=298.15, soc=0.5, soh=1.)
+        batched.init_model(**init_conditions)
+
+        for k, i_load in enumerate([3., -2., 0., 5.5]):
+            v, _ = batched.step_current_driven(i_load=i_load, dt=2., k=k)
+            v_ref, _ = reference.step_current_driven(i_load=i_load, dt=2., k=k)
+            np.testing.assert_allclose(v, np.full(4, v_ref))
+
+
+if __name__ == '__main__':
+    unittest.main()
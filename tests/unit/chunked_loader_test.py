@@ -0,0 +1,58 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from src.digital_twin.orchestrator import DrivenLoader, ChunkedDrivenLoader
+
+
+class ChunkedDrivenLoaderTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = Path(tempfile.mkdtemp())
+        rng = np.random.default_rng(0)
+
+        # Irregular timestamps, with a gap in the middle of the profile
+        seconds = np.cumsum(rng.choice([1, 1, 2, 3], size=400))
+        seconds[200:] += 600
+        times = (pd.Timestamp('2023-01-01') + pd.to_timedelta(seconds, unit='s')).strftime("%Y/%m/%d %H:%M:%S")
+        pd.DataFrame({'Time': times, 'I': rng.normal(size=400).round(3), 'T': 25. + rng.normal(size=400)}) \
+            .to_csv(self.folder / 'ground.csv', index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _config(self, **options):
+        ground_data = {'file': self.folder / 'ground.csv', 'load': 'current', 'time_format': 'timestamp',
+                       'vars': [{'var': 'current', 'label': 'I', 'unit': 'A'},
+                                {'var': 'temperature', 'label': 'T', 'unit': 'degC'}]}
+        config = {'input': {'ground_data': ground_data, 'cycle_for': options.pop('cycle_for', 1)},
+                  'iterations': options.pop('iterations', None), 'timestep': options.pop('timestep', None)}
+        config.update(options)
+        return config
+
+    def test_same_samples(self):
+        for options in [{}, {'iterations': 150}, {'timestep': 2}, {'timestep': 0.5, 'interp_ground_data': True},
+                        {'timestep': 1, 'interp_ground_data': True, 'max_ground_gap': 60}, {'cycle_for': 3},
+                        {'timestep': 3, 'cycle_for': 2}]:
+            loader = DrivenLoader(self._config(**options))
+            chunked_config = self._config(**options)
+            chunked_config['input']['ground_data']['chunk_size'] = 37
+            chunked_loader = ChunkedDrivenLoader(chunked_config)
+
+            samples = list(loader.collection())
+            chunked_samples = list(chunked_loader.collection())
+            self.assertEqual(len(chunked_samples), len(samples), options)
+            self.assertEqual(len(chunked_loader), len(loader), options)
+            self.assertEqual(chunked_loader.duration, loader.duration, options)
+            self.assertEqual(chunked_loader.cycle_length, loader.cycle_length, options)
+            for sample, chunked_sample in zip(samples, chunked_samples):
+                self.assertEqual(list(chunked_sample.keys()), list(sample.keys()))
+                np.testing.assert_allclose(list(chunked_sample.values()), list(sample.values()), rtol=1e-12)
+
+        self.assertRaises(Exception, chunked_loader.get_all_data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import tracemalloc
+import unittest
+import numpy as np
+from src.digital_twin.orchestrator.loader import CyclicView
+
+
+class CyclicViewTest(unittest.TestCase):
+    def setUp(self):
+        self.times = [0., 1.5, 3., 10.]
+        self.loads = [0.5, -1., 2., 0.]
+
+    def test_items(self):
+        duration = self.times[-1] - self.times[0]
+        times = CyclicView(self.times, n_cycles=3, shift=duration)
+        loads = CyclicView(self.loads, n_cycles=3)
+
+        # Same items of the repeated lists
+        expected_times = self.times + [t + duration * i for i in range(1, 3) for t in self.times]
+        self.assertEqual(len(times), 12)
+        self.assertEqual(list(times), expected_times)
+        self.assertEqual([times[i] for i in range(12)], expected_times)
+        self.assertEqual(list(loads), self.loads * 3)
+        self.assertEqual(times[-1], 30.)
+        self.assertRaises(IndexError, times.__getitem__, 12)
+
+        np.testing.assert_array_equal(np.asarray(times, dtype=float), expected_times)
+        np.testing.assert_array_equal(np.asarray(loads)[[0, 5, 11]], [0.5, -1., 0.])
+
+    def test_constant_memory(self):
+        values = np.arange(1000.)
+        view = CyclicView(values, n_cycles=200, shift=1000.)
+        self.assertEqual(len(view), 200000)
+        self.assertEqual(view[123456], 456. + 123000.)
+
+        # Reading the view in chunks allocates memory proportional to the chunk, whatever the number of cycles
+        peaks = []
+        for n_cycles in [1, 200]:
+            view = CyclicView(values, n_cycles=n_cycles, shift=1000.)
+            tracemalloc.start()
+            for start in range(0, len(view), 500):
+                view[start:start + 500]
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        self.assertLess(peaks[1], 2 * peaks[0])
+
+    def test_slices(self):
+        duration = self.times[-1] - self.times[0]
+        times = CyclicView(self.times, n_cycles=3, shift=duration)
+        expected_times = np.array(self.times + [t + duration * i for i in range(1, 3) for t in self.times])
+
+        # Across the boundaries of the cycles, with negative bounds and steps
+        for i in [slice(2, 7), slice(3, 12), slice(-6, -1), slice(None, None, 3), slice(10, 1, -2), slice(5, 5)]:
+            np.testing.assert_array_equal(times[i], expected_times[i])
+        np.testing.assert_array_equal(CyclicView(self.loads, n_cycles=3)[2:9], (self.loads * 3)[2:9])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from src.digital_twin.orchestrator import writer
+from src.digital_twin.orchestrator.writer import ChunkBuffer, DataWriter, read_output, read_output_index
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class ChunkBufferTest(unittest.TestCase):
+    def test_backpressure(self):
+        buffer = ChunkBuffer(max_chunks=2)
+        buffer.put(0)
+        buffer.put(1)
+
+        # The third chunk waits until the consumer makes room for it
+        producer = threading.Thread(target=buffer.put, args=(2,))
+        producer.start()
+        time.sleep(0.05)
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(len(buffer), 2)
+
+        self.assertEqual(buffer.get(), 0)
+        producer.join(timeout=1.)
+        self.assertFalse(producer.is_alive())
+
+        buffer.close()
+        self.assertEqual([buffer.get(), buffer.get(), buffer.get()], [1, 2, None])
+        self.assertRaises(Exception, buffer.put, 3)
+
+    def test_error(self):
+        buffer = ChunkBuffer(max_chunks=1)
+        buffer.put(0)
+        buffer.close(error=ValueError("disk full"))
+        self.assertIsNone(buffer.get())
+        self.assertRaises(Exception, buffer.put, 1)
+
+
+class DataWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_rows_and_chunks(self):
+        writer = DataWriter(output_folder=self.folder, max_pending_chunks=1)
+        writer._save_output_every = 7
+
+        for k in range(20):
+            writer.add_ground_data({'time': k, 'current': 0.5 * k})
+            writer.add_simulated_data({'time': k, 'voltage': 3. + k})
+        writer.add_simulated_chunk({'time': np.arange(20, 30), 'voltage': 3. + np.arange(20, 30)})
+        writer.add_simulated_data({'time': 30, 'voltage': 33.})
+        writer.stop()
+        writer.close()
+
+        ground = pd.read_csv(self.folder / 'ground_0.csv')
+        simulated = pd.read_csv(self.folder / 'dataset_0.csv')
+        np.testing.assert_array_equal(ground['time'], np.arange(20))
+        np.testing.assert_array_equal(simulated['time'], np.arange(31))
+        np.testing.assert_array_equal(simulated['voltage'], 3. + np.arange(31))
+
+    def _write_chunks(self, n_chunks=5, **kwargs):
+        writer = DataWriter(output_folder=self.folder, **kwargs)
+        for i in range(n_chunks):
+            time = np.arange(100. * i, 100. * (i + 1))
+            writer.add_simulated_chunk({'time': time, 'voltage': 3. + time / 1000., 'iteration': np.full(100, i)})
+        writer.stop()
+        writer.close()
+
+    def test_read_csv(self):
+        self._write_chunks(max_file_size=2000)
+        self.assertGreater(len(list(self.folder.glob('dataset_*.csv'))), 2)
+
+        # The files after the time range are not read
+        with mock.patch.object(writer.pd, 'read_csv', wraps=pd.read_csv) as read_csv:
+            df = read_output(self.folder, start=150, end=249.5, columns=['voltage'])
+        np.testing.assert_allclose(df['voltage'], 3. + np.arange(150, 250) / 1000.)
+        self.assertLess(read_csv.call_count, len(list(self.folder.glob('dataset_*.csv'))))
+        self.assertEqual(len(read_output(self.folder)), 500)
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+        self._write_chunks(output_format='parquet', float_dtype='float32', max_file_size=2000)
+        self.assertFalse(list(self.folder.glob('*.csv')))
+
+        # Each chunk is a row group, indexed by its time range
+        index = read_output_index(self.folder)
+        self.assertEqual(index['n_rows'].sum(), 500)
+        np.testing.assert_array_equal(index['time_min'], np.arange(0., 500., 100.))
+        self.assertGreater(index['file'].nunique(), 1)
+
+        df = read_output(self.folder, start=150, end=249.5)
+        np.testing.assert_array_equal(df['time'], np.arange(150., 250.))
+        self.assertEqual(df['time'].dtype, np.float64)
+        self.assertEqual(df['voltage'].dtype, np.float32)
+        np.testing.assert_allclose(df['voltage'], 3. + np.arange(150, 250) / 1000., rtol=1e-7)
+        np.testing.assert_array_equal(df['iteration'], np.repeat([1, 2], [50, 50]))
+        self.assertEqual(len(read_output(self.folder)), 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
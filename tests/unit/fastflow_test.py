@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+import rainflow
+import yaml
+from src.digital_twin.battery_models.aging.bolun import BolunModel
+
+
+def daily_soc_profile(n_days, rng, samples_per_day=1440):
+    """
+    Daily charge/discharge cycles of varying depth with measurement noise and rests
+    """
+    t = np.arange(n_days * samples_per_day) / samples_per_day
+    depth = 0.3 + 0.2 * np.sin(2 * np.pi * t / 7.)
+    soc = 0.55 + depth * np.sin(2 * np.pi * t) + 0.1 * np.sin(2 * np.pi * 5 * t)
+    soc += rng.normal(0., 2e-4, len(t))
+    soc[(t % 1) > 0.9] = soc[(t % 1) > 0.9][0]
+    return np.clip(soc, 0., 1.)
+
+
+def sorted_cycles(cycles):
+    cycles = np.reshape(np.array(cycles, dtype=float), (-1, 4))
+    return cycles[np.lexsort(cycles.T[::-1])]
+
+
+class FastflowTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.soc = daily_soc_profile(n_days=10, rng=rng).tolist()
+        self.temp = (298.15 + rng.normal(0., 1., len(self.soc))).tolist()
+
+        with open('data/config/models/aging/bolun.yaml') as f:
+            self.config = yaml.safe_load(f)
+
+    def _cyclic_aging(self, mode, check_every=1000, **fastflow_settings):
+        self.config['components']['cycle_counting_mode'] = mode
+        self.config['components']['fastflow'] = fastflow_settings
+        model = BolunModel(components_settings=self.config['components'], stress_models=self.config['stress_models'])
+        model.init_model()
+        for n in list(range(check_every, len(self.soc), check_every)) + [len(self.soc)]:
+            model.compute_degradation(soc_history=self.soc[:n], temp_history=self.temp[:n], elapsed_time=n, k=n)
+        return model.get_f_cyc_series(k=-1)
+
+    def test_exact_without_approximations(self):
+        counter = BolunModel.Fastflow(resolution=None, max_open=None)
+        all_closed = []
+        for n in [1, 2, 3, 10, 5000, 5001, len(self.soc)]:
+            closed, residual = counter.update(self.soc[:n], self.temp[:n])
+            all_closed.extend(closed)
+            expected = [(rng, count, np.mean(self.soc[i_start:i_end]), np.mean(self.temp[i_start:i_end]))
+                        for rng, mean, count, i_start, i_end in rainflow.extract_cycles(self.soc[:n])]
+            # Full cycles are extracted in a different order than the rainflow
+            np.testing.assert_allclose(sorted_cycles(all_closed + residual), sorted_cycles(expected), rtol=1e-9)
+
+    def test_tolerance_wrt_rainflow(self):
+        rainflow_aging = self._cyclic_aging('rainflow')
+        self.assertAlmostEqual(self._cyclic_aging('fastflow'), rainflow_aging, delta=1e-9 * rainflow_aging)
+
+        fastflow_aging = self._cyclic_aging('fastflow', resolution=1e-4)
+        self.assertLess(abs(fastflow_aging - rainflow_aging) / rainflow_aging, 0.01)
+
+    def test_bounded_open_points(self):
+        counter = BolunModel.Fastflow(max_open=4)
+        counter.update(self.soc, self.temp)
+        self.assertLessEqual(len(counter._points), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import numpy as np
+from src.digital_twin.bess import BatteryEnergyStorageSystem
+from src.utils.recurrences import linear_recurrence, clipped_cumsum
+from tests.unit.helpers import battery_models_config, battery_options
+
+
+class RecurrencesTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_linear_recurrence(self):
+        alpha = self.rng.uniform(0.9, 0.999, 10000)
+        beta = self.rng.normal(size=10000)
+
+        for coefficients in [alpha, np.full(10000, 0.97)]:
+            expected, y = [], 3.
+            for a, b in zip(coefficients, beta):
+                y = a * y + b
+                expected.append(y)
+            np.testing.assert_allclose(linear_recurrence(coefficients, beta, y0=3.), expected, atol=1e-10)
+
+    def test_clipped_cumsum(self):
+        x = self.rng.normal(0., 0.05, 10000)
+
+        expected, y = [], 0.5
+        for value in x:
+            y = min(1., max(0., y + value))
+            expected.append(y)
+        np.testing.assert_allclose(clipped_cumsum(x, y0=0.5, low=0., high=1.), expected, atol=1e-12)
+
+
+class FusedProfileTest(unittest.TestCase):
+    def setUp(self):
+        self.models_config = battery_models_config()
+        self.battery_options = battery_options()
+
+    def _build_battery(self):
+        battery = BatteryEnergyStorageSystem(models_config=self.models_config, battery_options=self.battery_options)
+        battery.reset()
+        battery.init()
+        return battery
+
+    def test_solve_profile_matches_step(self):
+        rng = np.random.default_rng(1)
+        load = np.concatenate((rng.normal(0., 3., 2000), np.full(2000, 5.), np.full(3000, -5.)))
+        dt = rng.choice([1., 1., 2., 10., 300.], size=len(load))
+
+        stepped = self._build_battery()
+        for k, (i, delta) in enumerate(zip(load, dt)):
+            stepped.step(load=i, dt=delta, k=k)
+
+        fused = self._build_battery()
+        self.assertTrue(fused.can_solve_profile)
+        results = fused.solve_profile(load=load, dt=dt)
+
+        np.testing.assert_allclose(fused.soc_series, stepped.soc_series, atol=1e-10)
+        for model in stepped.models:
+            for key, values in model.get_results().items():
+                np.testing.assert_allclose(results[key], values[1:], rtol=1e-9, atol=1e-10)
+
+    def test_solve_profile_not_available(self):
+        self.models_config[0]['components']['r0'] = {
+            'selected_type': 'lookup',
+            'lookup': {'inputs': {'soc': [0., 1.]}, 'output': [0.01, 0.02]}
+        }
+        battery = self._build_battery()
+        self.assertFalse(battery.can_solve_profile)
+
+
+if __name__ == '__main__':
+    unittest.main()
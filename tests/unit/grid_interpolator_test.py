@@ -0,0 +1,80 @@
+import glob
+import unittest
+import numpy as np
+import pandas as pd
+from scipy.interpolate import LinearNDInterpolator, NearestNDInterpolator
+from src.digital_twin.parameters.interpolation import GridInterpolator, TriangulatedGridInterpolator
+from src.digital_twin.parameters.variables import LookupTableFunction
+
+
+def bilinear(temp, soc):
+    return 1. + 0.02 * temp - 3. * soc + 0.01 * temp * soc
+
+
+class GridInterpolatorTest(unittest.TestCase):
+    def setUp(self):
+        temps, socs = np.meshgrid([273.15, 283.15, 298.15, 313.15], np.linspace(0., 1., 11), indexing='ij')
+        self.x_values = [temps.ravel().tolist(), socs.ravel().tolist()]
+        self.y_values = bilinear(temps, socs).ravel().tolist()
+
+    def test_bilinear_is_exact(self):
+        interpolator = GridInterpolator.from_points(self.x_values, self.y_values)
+        rng = np.random.default_rng(0)
+        temps, socs = rng.uniform(273.15, 313.15, 100), rng.uniform(0., 1., 100)
+
+        np.testing.assert_allclose(interpolator(temps, socs), bilinear(temps, socs))
+        for temp, soc in zip(temps, socs):
+            self.assertAlmostEqual(interpolator(float(temp), float(soc)), bilinear(temp, soc))
+
+    def test_clamped_extrapolation(self):
+        interpolator = GridInterpolator.from_points(self.x_values, self.y_values)
+        self.assertAlmostEqual(interpolator(350., 1.2), bilinear(313.15, 1.))
+        np.testing.assert_allclose(interpolator(np.array([250., 350.]), np.array([0.5, -0.1])),
+                                   [bilinear(273.15, 0.5), bilinear(313.15, 0.)])
+
+    def test_scattered_points_are_not_a_grid(self):
+        self.assertIsNone(GridInterpolator.from_points([x[:-1] for x in self.x_values], self.y_values[:-1]))
+
+        lookup = LookupTableFunction(name='r0', y_values=self.y_values[:-1], x_names=['temp', 'soc'],
+                                     x_values=[x[:-1] for x in self.x_values])
+        self.assertNotIsInstance(lookup._function, GridInterpolator)
+
+    def test_lookup_table_uses_grid(self):
+        lookup = LookupTableFunction(name='r0', y_values=self.y_values, x_names=['temp', 'soc'],
+                                     x_values=self.x_values)
+        self.assertIsInstance(lookup._function, TriangulatedGridInterpolator)
+
+        # Bilinear interpolation has to be chosen explicitly
+        lookup = LookupTableFunction(name='r0', y_values=self.y_values, x_names=['temp', 'soc'],
+                                     x_values=self.x_values, interpolation='multilinear')
+        self.assertNotIsInstance(lookup._function, TriangulatedGridInterpolator)
+        self.assertAlmostEqual(lookup.get_value({'temp': 290., 'soc': 0.33}), bilinear(290., 0.33))
+
+    def test_same_as_linear_nd(self):
+        rng = np.random.default_rng(0)
+
+        for table_file in sorted(glob.glob('data/config/params/*_table.csv')):
+            table = pd.read_csv(table_file)
+            # Tables are triangulated in kelvin by the simulator
+            for offset in [0., 273.15]:
+                x_values = [table['temp'].to_numpy(dtype=float) + offset, table['soc'].to_numpy(dtype=float)]
+                y_values = table.iloc[:, 2].to_numpy(dtype=float)
+                points = np.column_stack(x_values)
+                linear, nearest = LinearNDInterpolator(points, y_values), NearestNDInterpolator(points, y_values)
+
+                # Off-node points, also outside the table
+                temps = rng.uniform(x_values[0].min() - 5., x_values[0].max() + 5., 2000)
+                socs = rng.uniform(-0.1, 1.1, 2000)
+                expected = linear(temps, socs)
+                outside = np.isnan(expected)
+                expected[outside] = nearest(temps[outside], socs[outside])
+
+                interpolator = TriangulatedGridInterpolator.from_points(x_values, y_values)
+                self.assertIsNotNone(interpolator, table_file)
+                np.testing.assert_allclose(interpolator(temps, socs), expected, rtol=1e-12, err_msg=table_file)
+                np.testing.assert_allclose([interpolator(float(t), float(s)) for t, s in zip(temps, socs)],
+                                           expected, rtol=1e-12, err_msg=table_file)
+
+
+if __name__ == '__main__':
+    unittest.main()
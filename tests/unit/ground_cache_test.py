@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from src.preprocessing import data_preparation
+from src.preprocessing.data_preparation import load_data_from_csv
+
+
+class GroundCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = Path(tempfile.mkdtemp())
+        self.csv_file = self.folder / 'ground.csv'
+        self.vars = [{'var': 'current', 'label': 'I', 'unit': 'mA'}, {'var': 'voltage', 'label': 'V', 'unit': 'V'}]
+
+        times = pd.date_range('2023-01-01', periods=50, freq='s').strftime("%Y/%m/%d %H:%M:%S")
+        pd.DataFrame({'Time': times, 'I': np.arange(50) * 100., 'V': 3. + np.arange(50) / 100.}) \
+            .to_csv(self.csv_file, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _load(self, **kwargs):
+        return load_data_from_csv(self.csv_file, self.vars, time_format='timestamp', **kwargs)
+
+    def test_cache(self):
+        times, data = self._load(iterations=None)
+        self.assertEqual(len(list((self.folder / '.cache').glob('*/*/time.npy'))), 1)
+
+        # The second run reads the cache without parsing nor hashing the csv again
+        with mock.patch.object(data_preparation, '_parse_csv') as parse, \
+                mock.patch.object(data_preparation, '_file_digest') as digest:
+            cached_times, cached_data = self._load(iterations=20)
+            parse.assert_not_called()
+            digest.assert_not_called()
+        np.testing.assert_array_equal(cached_times, times[:20])
+        np.testing.assert_array_equal(cached_data['current'], data['current'][:20])
+        self.assertEqual(cached_data['current'][1], 0.1)
+        self.assertIsInstance(cached_data['current'], np.memmap)
+
+        # Another set of variables gets its own cache
+        self.vars = self.vars[:1]
+        self._load(iterations=None)
+        self.assertEqual(len(list((self.folder / '.cache').glob('*/*/time.npy'))), 2)
+
+        # The same content with another modification time is hashed again, but the cache is still valid
+        os.utime(self.csv_file, ns=(0, 0))
+        with mock.patch.object(data_preparation, '_parse_csv') as parse:
+            self._load(iterations=None)
+            parse.assert_not_called()
+        with mock.patch.object(data_preparation, '_file_digest') as digest:
+            self._load(iterations=None)
+            digest.assert_not_called()
+
+        # A change of the file replaces its caches
+        with open(self.csv_file, 'a') as f:
+            f.write("2023/01/01 00:00:50,5000.0,3.5\n")
+        times, data = self._load(iterations=None)
+        self.assertEqual(len(times), 51)
+        self.assertEqual(len(list((self.folder / '.cache').glob('*/*/time.npy'))), 1)
+
+    def test_parallel_writes(self):
+        cache_folder = data_preparation._cache_folder(self.csv_file, self.vars, time_format='timestamp')
+        columns = {'time': np.arange(5.), 'current': np.ones(5)}
+
+        # A run missing the cache saved in the meanwhile by another run is not an error
+        with self.assertNoLogs('DT_ernesto', level='WARNING'):
+            data_preparation._write_cache(cache_folder, columns, self.csv_file)
+            data_preparation._write_cache(cache_folder, columns, self.csv_file)
+        self.assertEqual([folder.name for folder in cache_folder.parent.iterdir() if folder.is_dir()],
+                         [cache_folder.name])
+
+        # The temporary folder is removed when the cache cannot be saved
+        shutil.rmtree(cache_folder)
+        with mock.patch.object(data_preparation.np, 'save', side_effect=OSError("No space left on device")), \
+                self.assertLogs('DT_ernesto', level='WARNING'):
+            data_preparation._write_cache(cache_folder, columns, self.csv_file)
+        self.assertEqual([folder for folder in cache_folder.parent.iterdir() if folder.is_dir()], [])
+
+    def test_no_cache(self):
+        self._load(iterations=None, cache=False)
+        self.assertFalse((self.folder / '.cache').exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
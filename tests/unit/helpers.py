@@ -0,0 +1,46 @@
+"""
+Helpers shared by the unit tests.
+"""
+
+
+def scalar_settings(**values):
+    """
+    Settings of model components with constant values, as read from the model yaml files.
+    """
+    return {name: {'selected_type': 'scalar', 'scalar': value} for name, value in values.items()}
+
+
+def battery_models_config():
+    """
+    Configuration of a battery with a first order Thevenin electrical model and a R2C thermal model with constant
+    parameters. A new one is returned at each call, so that it can be modified.
+    """
+    return [
+        {'type': 'electrical', 'class_name': 'FirstOrderThevenin',
+         'components': scalar_settings(r0=0.012, r1=0.02, c=2500., v_ocv=3.6)},
+        {'type': 'thermal', 'class_name': 'R2CThermal',
+         'components': scalar_settings(c_term=410., r_cond=0.000784, r_conv=2.73, dv_dT=0.0001)}
+    ]
+
+
+def battery_options(soc: float = 0.5):
+    """
+    Options of the battery of battery_models_config(), starting from the given SoC.
+    """
+    return {
+        'params': {'nominal_capacity': 2.5, 'v_max': 4.2, 'v_min': 2.5, 'temp_ambient': 298.15},
+        'init': {'voltage': 3.6, 'current': 0., 'temperature': 298.15, 'soc': soc, 'soh': 1.},
+        'sign_convention': 'passive'
+    }
+
+
+def driven_sim_config(soc: float = 0.5, **options):
+    """
+    Configuration of a driven simulation of the battery of battery_models_config(), with a rest inserted in the gaps of
+    the ground data longer than one hour.
+
+    Args:
+        soc (float): initial SoC of the battery
+        **options: other options of the simulation (e.g. check_soh_every)
+    """
+    return {'get_rest_after': 3600, 'battery': battery_options(soc=soc), **options}
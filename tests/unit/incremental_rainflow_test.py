@@ -0,0 +1,45 @@
+import unittest
+import numpy as np
+import rainflow
+from src.digital_twin.battery_models.aging.bolun import BolunModel
+
+
+def full_history_cycles(soc_history, temp_history):
+    return [(rng, count, np.mean(soc_history[i_start:i_end]), np.mean(temp_history[i_start:i_end]))
+            for rng, mean, count, i_start, i_end in rainflow.extract_cycles(soc_history)]
+
+
+class IncrementalRainflowTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # Random walk with plateaus, as produced by rests in the load profile
+        steps = rng.normal(0., 0.01, 2000) * (rng.uniform(size=2000) > 0.2)
+        self.soc = np.clip(0.5 + np.cumsum(steps), 0., 1.).tolist()
+        self.temp = (298.15 + rng.normal(0., 2., 2000)).tolist()
+
+    def test_matches_full_history(self):
+        counter = BolunModel.IncrementalRainflow()
+        all_closed = []
+
+        for n in [1, 2, 3, 4, 7, 50, 51, 333, 1000, 1999, 2000]:
+            closed, residual = counter.update(self.soc[:n], self.temp[:n])
+            all_closed.extend(closed)
+            expected = full_history_cycles(self.soc[:n], self.temp[:n])
+
+            self.assertEqual(len(all_closed) + len(residual), len(expected))
+            np.testing.assert_allclose(all_closed + residual, expected, rtol=1e-9)
+
+    def test_overwritten_last_sample(self):
+        counter = BolunModel.IncrementalRainflow()
+        soc = self.soc[:500]
+        closed, _ = counter.update(soc, self.temp[:500])
+
+        # The last sample of the history can be reset after the aging check
+        soc = soc[:-1] + [0.9] + self.soc[500:600]
+        new_closed, residual = counter.update(soc, self.temp[:600])
+        np.testing.assert_allclose(closed + new_closed + residual, full_history_cycles(soc, self.temp[:600]),
+                                   rtol=1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
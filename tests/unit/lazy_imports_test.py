@@ -0,0 +1,27 @@
+import subprocess
+import sys
+import unittest
+from src.digital_twin.battery_models import MODELS, get_model_class
+
+
+class LazyImportsTest(unittest.TestCase):
+    def test_model_classes(self):
+        for class_name in MODELS:
+            self.assertEqual(get_model_class(class_name).__name__, class_name)
+        self.assertRaises(Exception, get_model_class, 'UnknownModel')
+
+    def test_physics_without_torch(self):
+        # A fresh interpreter is needed to inspect the imported modules
+        code = "\n".join([
+            "import sys",
+            "from src.digital_twin.orchestrator.orchestrator import DTOrchestrator",
+            "from src.digital_twin.battery_models import get_model_class",
+            "get_model_class('FirstOrderThevenin'), get_model_class('R2CThermal'), get_model_class('BolunModel')",
+            "assert 'torch' not in sys.modules and 'joblib' not in sys.modules, 'Heavy modules imported'",
+        ])
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+from src.digital_twin.battery_models.thermal.mlp_network import MLPThermal
+
+MODELS_FOLDER = './data/config/models/data_driven/thermal_mlp/'
+SETTINGS = {'input_size': 4, 'hidden_size': 16, 'output_size': 1,
+            'model_state': MODELS_FOLDER + 'state_checkup_rolling25.pth',
+            'scaler': MODELS_FOLDER + 'scaler_checkup_rolling25.pth', 'cuda': False}
+
+
+@unittest.skipUnless(importlib.util.find_spec('torch') and importlib.util.find_spec('sklearn'),
+                     "torch and scikit-learn are needed to load the trained model")
+class MLPThermalTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        # Inputs within the training range: current, heat, ambient temperature and ground temperature
+        self.inputs = np.column_stack([rng.uniform(-20., 10., 500), rng.uniform(0., 5., 500),
+                                       rng.uniform(280., 310., 500), rng.uniform(280., 310., 500)])
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _torch_predict(self, inputs):
+        """
+        Previous inference path, with the scaler and the network of torch.
+        """
+        import joblib
+        import torch
+        import torch.nn as nn
+
+        network = nn.Sequential(nn.Linear(4, 16), nn.ReLU(), nn.Linear(16, 16), nn.ReLU(), nn.Linear(16, 1))
+        state = torch.load(SETTINGS['model_state'])
+        network.load_state_dict({key.replace('layers.', ''): value for key, value in state.items()})
+        inputs = torch.tensor(joblib.load(SETTINGS['scaler']).transform(inputs), dtype=torch.float32)
+        with torch.no_grad():
+            return network(inputs).squeeze(-1).numpy()
+
+    def test_torch_parity(self):
+        model = MLPThermal(components_settings=SETTINGS)
+        expected = self._torch_predict(self.inputs)
+
+        # Torch runs in single precision
+        np.testing.assert_allclose(model.predict(self.inputs)[:, 0], expected, rtol=1e-6, atol=1e-4)
+        np.testing.assert_allclose([model.predict(x).item() for x in self.inputs], expected, rtol=1e-6, atol=1e-4)
+
+        temp = model.compute_temp(i=self.inputs[0, 0], q=self.inputs[0, 1], T_amb=self.inputs[0, 2],
+                                  ground_temp=self.inputs[0, 3])
+        self.assertIsInstance(temp, float)
+        self.assertAlmostEqual(temp, float(expected[0]), delta=1e-4)
+
+    def test_numpy_weights(self):
+        model = MLPThermal(components_settings=SETTINGS)
+        weights_file = os.path.join(self.folder, 'weights.npz')
+        model.save_weights(weights_file)
+
+        npz_model = MLPThermal(components_settings={**SETTINGS, 'model_state': weights_file})
+        np.testing.assert_array_equal(npz_model.predict(self.inputs), model.predict(self.inputs))
+
+        # The exported weights are loaded without torch
+        code = "\n".join([
+            "import sys",
+            "sys.modules['torch'] = None",
+            "from src.digital_twin.battery_models.thermal.mlp_network import MLPThermal",
+            "settings = {{'input_size': 4, 'hidden_size': 16, 'output_size': 1, 'model_state': {!r}}}".format(
+                weights_file),
+            "print(MLPThermal(components_settings=settings).predict([1., 0.5, 298.15, 298.15]).item())",
+        ])
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(float(result.stdout), model.predict([1., 0.5, 298.15, 298.15]).item())
+
+
+class RollingGroundTempTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_rolling_mean(self):
+        # Random weights, saved as the exported ones, since the network doesn't matter here
+        rng = np.random.default_rng(0)
+        weights_file = os.path.join(self.folder, 'weights.npz')
+        np.savez(weights_file, weight_0=rng.normal(size=(8, 4)), bias_0=rng.normal(size=8),
+                 weight_1=rng.normal(size=(1, 8)), bias_1=rng.normal(size=1))
+        model = MLPThermal(components_settings={'input_size': 4, 'output_size': 1, 'model_state': weights_file})
+
+        ground_temps = 298.15 + rng.normal(0., 5., 1000)
+        for k, ground_temp in enumerate(ground_temps):
+            self.assertAlmostEqual(model._rolling_ground_temp(float(ground_temp)),
+                                   np.mean(ground_temps[max(0, k - 24):k + 1]), delta=1e-10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+from src.digital_twin.battery_models.electrical.ecm_components import Resistor
+from src.digital_twin.parameters.variables import LookupTableFunction
+
+
+class CountingLookup(LookupTableFunction):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.n_calls = 0
+
+    def get_value(self, input_vars: dict):
+        self.n_calls += 1
+        return super().get_value(input_vars)
+
+
+class ParamsSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.lookup = CountingLookup(name='r0', y_values=[0.01, 0.02], x_names=['soc'], x_values=[[0., 1.]])
+        self.resistor = Resistor(name='R0', resistance=self.lookup)
+        self.resistor.soc = 0.5
+
+    def test_evaluated_once_per_state(self):
+        self.assertAlmostEqual(self.resistor.resistance, 0.015)
+        self.assertAlmostEqual(self.resistor.compute_v(i=2.), 0.03)
+        self.resistor.compute_i(v_r0=0.03)
+        self.assertEqual(self.lookup.n_calls, 1)
+
+        # The same state doesn't invalidate the snapshot
+        self.resistor.soc = 0.5
+        self.resistor.resistance
+        self.assertEqual(self.lookup.n_calls, 1)
+
+    def test_invalidated_by_state_change(self):
+        self.resistor.resistance
+        self.resistor.soc = 1.
+        self.assertAlmostEqual(self.resistor.resistance, 0.02)
+        self.resistor.temp = 300.
+        self.resistor.resistance
+        self.assertEqual(self.lookup.n_calls, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
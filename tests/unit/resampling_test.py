@@ -0,0 +1,48 @@
+import time
+import unittest
+import numpy as np
+from src.preprocessing.data_preparation import sync_data_with_step
+
+
+class SyncDataWithStepTest(unittest.TestCase):
+    def setUp(self):
+        self.times = [0., 2., 4., 10., 11., 12.]
+        self.data = {'current': [0., 1., 2., 3., 4., 5.]}
+
+    def test_hold(self):
+        times, data = sync_data_with_step(self.times, self.data, sim_step=1.)
+        np.testing.assert_array_equal(times, np.arange(13.))
+        np.testing.assert_array_equal(data['current'], [0, 0, 1, 1, 2, 2, 2, 2, 2, 2, 3, 4, 5])
+
+        # Reduction keeps the last sample before each time of the grid
+        times, data = sync_data_with_step(self.times, self.data, sim_step=3.)
+        np.testing.assert_array_equal(times, [0., 3., 6., 9., 12.])
+        np.testing.assert_array_equal(data['current'], [0, 1, 2, 2, 5])
+
+    def test_interpolation(self):
+        times, data = sync_data_with_step(self.times, self.data, sim_step=0.5, interp=True)
+        np.testing.assert_allclose(data['current'], np.interp(times, self.times, self.data['current']))
+
+        # The gap between 4 and 10 s is not interpolated
+        times, data = sync_data_with_step(self.times, self.data, sim_step=1., interp=True, max_gap=5.)
+        np.testing.assert_array_equal(data['current'], [0, 0.5, 1, 1.5, 2, 2, 2, 2, 2, 2, 3, 4, 5])
+
+    def test_irregular_grid(self):
+        # Rounding of the timestamps must not drop samples lying on the grid
+        times = np.arange(0., 100.) * 0.1
+        data = {'voltage': np.arange(100.)}
+        sync_times, sync_data = sync_data_with_step(times.tolist(), data, sim_step=0.1)
+        np.testing.assert_array_equal(sync_data['voltage'], data['voltage'])
+
+    def test_large_profile(self):
+        times = np.cumsum(np.random.default_rng(0).uniform(0.5, 1.5, 1000000))
+        data = {'current': np.sin(times), 'voltage': np.cos(times)}
+
+        start = time.perf_counter()
+        sync_times, sync_data = sync_data_with_step(times, data, sim_step=1., interp=True)
+        self.assertLess(time.perf_counter() - start, 1.)
+        np.testing.assert_allclose(sync_data['current'], np.interp(sync_times, times, data['current']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import numpy as np
+from src.utils.running_stats import RunningMean
+
+
+class RunningMeanTest(unittest.TestCase):
+    def setUp(self):
+        self.values = np.random.default_rng(0).uniform(270., 320., 1000)
+
+    def test_mean(self):
+        running_mean = RunningMean()
+        self.assertTrue(np.isnan(running_mean.mean))
+
+        for value in self.values[:500]:
+            running_mean.update(value)
+        running_mean.extend(self.values[500:])
+
+        self.assertEqual(running_mean.count, 1000)
+        self.assertAlmostEqual(running_mean.mean, np.mean(self.values))
+
+    def test_replace_last(self):
+        running_mean = RunningMean()
+        running_mean.extend(self.values)
+        running_mean.replace_last(0.)
+        self.assertAlmostEqual(running_mean.mean, np.mean(np.append(self.values[:-1], 0.)))
+
+    def test_window(self):
+        running_mean = RunningMean(window=10)
+        running_mean.extend(self.values[:500])
+        for value in self.values[500:]:
+            running_mean.update(value)
+        self.assertEqual(running_mean.count, 10)
+        self.assertAlmostEqual(running_mean.mean, np.mean(self.values[-10:]))
+
+        running_mean.replace_last(0.)
+        self.assertAlmostEqual(running_mean.mean, np.mean(np.append(self.values[-10:-1], 0.)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import numpy as np
+from src.utils.series_buffer import SeriesBuffer
+
+
+class SeriesBufferTest(unittest.TestCase):
+    def test_list_like_access(self):
+        series = SeriesBuffer(initial_size=2)
+        values = [float(i) for i in range(10)]
+        for value in values[:5]:
+            series.append(value)
+        series.extend(values[5:])
+
+        self.assertEqual(len(series), 10)
+        self.assertEqual(series[-1], 9.)
+        self.assertEqual(series[3], 3.)
+        self.assertIsInstance(series[0], float)
+        self.assertEqual(list(series), values)
+        np.testing.assert_array_equal(series[2:5], values[2:5])
+        self.assertRaises(IndexError, series.__getitem__, 10)
+
+    def test_ring_mode(self):
+        series = SeriesBuffer(capacity=4, initial_size=2)
+        series.append(0.)
+        series.extend(np.arange(1., 8.))
+        series.append(8.)
+
+        self.assertEqual(len(series), 9)
+        self.assertEqual(series[-1], 8.)
+        self.assertEqual(series[5], 5.)
+        np.testing.assert_array_equal(np.asarray(series), [5., 6., 7., 8.])
+        self.assertRaises(IndexError, series.__getitem__, 4)
+
+    def test_array_values(self):
+        series = SeriesBuffer(capacity=3)
+        for i in range(5):
+            series.append(np.full(2, i))
+
+        last = series[-1]
+        last[0] = -1.
+        np.testing.assert_array_equal(series[-1], [4., 4.])
+        self.assertEqual(np.asarray(series).shape, (3, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.digital_twin.bess import BatteryEnergyStorageSystem
+from src.utils.step_recorder import StepRecorder
+from tests.unit.helpers import battery_models_config, battery_options
+
+
+class StepRecorderTest(unittest.TestCase):
+    def setUp(self):
+        self.chunks = []
+
+    def test_chunks(self):
+        state = {'k': 0, 'x': 0.5, 'fleet': np.zeros(3)}
+        recorder = StepRecorder(on_chunk=self.chunks.append, chunk_size=4)
+        recorder.register('k', lambda: state['k'])
+        recorder.register('x', lambda: state['x'])
+        recorder.register('fleet', lambda: state['fleet'])
+        self.assertEqual(recorder.names, ['k', 'x', 'fleet_0', 'fleet_1', 'fleet_2'])
+
+        for k in range(10):
+            state['k'], state['x'], state['fleet'] = k, 0.5 * k, np.arange(3.) + k
+            recorder.record()
+        recorder.flush()
+        recorder.flush()
+
+        self.assertEqual([len(chunk['k']) for chunk in self.chunks], [4, 4, 2])
+        df = pd.concat([pd.DataFrame(chunk) for chunk in self.chunks], ignore_index=True)
+        self.assertEqual(df['k'].dtype, np.int64)
+        np.testing.assert_array_equal(df['k'], np.arange(10))
+        np.testing.assert_array_equal(df['x'], 0.5 * np.arange(10))
+        np.testing.assert_array_equal(df['fleet_2'], np.arange(10) + 2.)
+        self.assertEqual(recorder.n_recorded, 10)
+        self.assertRaises(AssertionError, recorder.register, 'y', lambda: 0.)
+
+    def test_integers_turning_into_floats(self):
+        state = {'t': -1}
+        recorder = StepRecorder(on_chunk=self.chunks.append)
+        recorder.register('t', lambda: state['t'])
+        recorder.record()
+        state['t'] = 0.
+        recorder.record()
+        recorder.flush()
+        self.assertEqual(self.chunks[0]['t'].dtype, np.float64)
+
+    def _record_profile(self, times, values, aggregates=None, **kwargs):
+        state = {'t': times[0], 'x': values[0]}
+        recorder = StepRecorder(on_chunk=self.chunks.append, chunk_size=7, clock=lambda: state['t'], **kwargs)
+        recorder.register('t', lambda: state['t'])
+        recorder.register('x', lambda: state['x'], aggregates=aggregates)
+        return recorder, state
+
+    def test_decimation(self):
+        times = np.cumsum(np.random.default_rng(0).choice([1., 2., 5., 130.], size=200))
+        values = np.sin(times)
+
+        for options in [{'stride': 3}, {'period': 60.}]:
+            self.chunks = []
+            recorder, state = self._record_profile(times, values, **options)
+            recorded = [recorder.record() for state['t'], state['x'] in zip(times, values)]
+            recorder.flush()
+            stepped = pd.concat([pd.DataFrame(chunk) for chunk in self.chunks], ignore_index=True)
+
+            np.testing.assert_array_equal(stepped['t'], times[recorded])
+            if 'stride' in options:
+                np.testing.assert_array_equal(np.flatnonzero(recorded), np.arange(0, 200, 3))
+            else:
+                # A row for each period of the clock reached by the profile
+                np.testing.assert_array_equal(np.unique(np.floor((times - times[0]) / 60.)),
+                                              np.floor((stepped['t'] - times[0]) / 60.))
+
+            # Recording the steps as a block selects the same rows
+            self.chunks = []
+            recorder, state = self._record_profile(times, values, **options)
+            recorder.record()
+            rows = recorder.record_block({'t': times[1:], 'x': values[1:]}, times=times[1:])
+            recorder.flush()
+            block = pd.concat([pd.DataFrame(chunk) for chunk in self.chunks], ignore_index=True)
+
+            np.testing.assert_array_equal(rows + 1, np.flatnonzero(recorded)[1:])
+            pd.testing.assert_frame_equal(block, stepped)
+
+    def test_aggregates(self):
+        times = np.arange(100.)
+        values = np.random.default_rng(0).normal(size=100)
+
+        recorder, state = self._record_profile(times, values, stride=10, aggregates=['max', 'mean'])
+        self.assertEqual(recorder.names, ['t', 'x', 'x_mean', 'x_max'])
+        for state['t'], state['x'] in zip(times, values):
+            recorder.record()
+        recorder.flush()
+        df = pd.concat([pd.DataFrame(chunk) for chunk in self.chunks], ignore_index=True)
+
+        # Each row aggregates the steps after the previous row
+        windows = [values[:1]] + [values[i - 9:i + 1] for i in range(10, 100, 10)]
+        np.testing.assert_array_equal(df['x'], values[::10])
+        np.testing.assert_allclose(df['x_mean'], [np.mean(window) for window in windows])
+        np.testing.assert_array_equal(df['x_max'], [np.max(window) for window in windows])
+        self.assertRaises(AssertionError, recorder.record_block, {'t': times, 'x': values})
+        self.assertRaises(Exception, StepRecorder(on_chunk=None).register, 'x', lambda: 0., aggregates=['median'])
+
+    def test_battery_status(self):
+        battery = BatteryEnergyStorageSystem(models_config=battery_models_config(), battery_options=battery_options())
+        battery.reset()
+        battery.init()
+
+        recorder = battery.build_status_recorder(on_chunk=self.chunks.append, chunk_size=64)
+        tables = [battery.get_status_table()]
+        recorder.record()
+        for k, load in enumerate(np.random.default_rng(0).normal(0., 3., 100)):
+            battery.step(load=load, dt=1., k=k)
+            battery.t_series.append(float(k))
+            tables.append(battery.get_status_table())
+            recorder.record()
+        recorder.flush()
+
+        recorded = pd.concat([pd.DataFrame(chunk) for chunk in self.chunks], ignore_index=True)
+        expected = pd.DataFrame.from_records(tables)
+        self.assertEqual(list(recorded.columns), list(expected.columns))
+        np.testing.assert_allclose(recorded.to_numpy(), expected.to_numpy())
+
+        variables = ['time', 'voltage', 'temperature']
+        self.assertEqual(list(battery.get_status_table(variables=variables).keys()), variables)
+        recorder = battery.build_status_recorder(on_chunk=self.chunks.append, variables=variables[:2],
+                                                 aggregates={'temperature': ['max']})
+        self.assertEqual(recorder.names, ['time', 'voltage', 'temperature_max'])
+        self.assertRaises(Exception, battery.build_status_recorder, on_chunk=self.chunks.append, variables=['v'])
+
+
+if __name__ == '__main__':
+    unittest.main()
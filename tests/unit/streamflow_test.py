@@ -0,0 +1,38 @@
+import unittest
+import numpy as np
+from src.digital_twin.battery_models.aging.bolun import BolunModel
+
+
+class StreamflowTest(unittest.TestCase):
+    def setUp(self):
+        # Periodic charge/discharge cycles with a smaller oscillation on top
+        t = np.linspace(0., 200., 20001)
+        self.soc = (0.5 + 0.3 * np.sin(2 * np.pi * t) + 0.05 * np.sin(2 * np.pi * 7.3 * t)).tolist()
+
+    def test_open_cycles_stay_compact(self):
+        streamflow = BolunModel.Streamflow(init_soc=self.soc[0], expected_cycle_num=4, cycle_num_increment=4)
+        n_created, n_closed, max_open = 0, 0, 0
+
+        for k in range(1, len(self.soc)):
+            n_open = streamflow.n_open
+            soc_means, ranges, temp_means = streamflow.step(actual_value=self.soc[k], expected_end=0.5 * self.soc[k],
+                                                            second_signal_value=298.15)
+            n_created += streamflow.n_open + len(ranges) - n_open
+            n_closed += len(ranges)
+            max_open = max(max_open, streamflow.n_open)
+
+            self.assertTrue(np.all(ranges >= 0))
+            np.testing.assert_allclose(temp_means, 298.15)
+
+        # Open cycles don't grow with the number of samples, since closed ones are removed
+        self.assertGreater(n_closed, 200)
+        self.assertLess(max_open, 50)
+        self.assertEqual(n_created, n_closed + streamflow.n_open)
+
+        soc_means, ranges, _ = streamflow.get_open_cycles()
+        self.assertEqual(len(ranges), streamflow.n_open)
+        self.assertTrue(np.all((soc_means >= min(self.soc)) & (soc_means <= max(self.soc))))
+
+
+if __name__ == '__main__':
+    unittest.main()
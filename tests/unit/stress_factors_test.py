@@ -0,0 +1,45 @@
+import unittest
+import numpy as np
+import yaml
+from src.digital_twin.battery_models.aging import stress_functions
+from src.digital_twin.battery_models.aging.bolun import BolunModel
+
+
+class StressFactorsTest(unittest.TestCase):
+    def setUp(self):
+        with open('data/config/models/aging/bolun.yaml') as f:
+            self.config = yaml.safe_load(f)
+        self.params = self.config['stress_models']
+        self.model = BolunModel(components_settings=self.config['components'], stress_models=self.params)
+
+    def test_vectorized_cyclic_aging(self):
+        rng = np.random.default_rng(0)
+        dod, soc, temp = rng.uniform(0.01, 1., 1000), rng.uniform(0., 1., 1000), rng.uniform(280., 320., 1000)
+        counts = rng.choice([0.5, 1.], 1000)
+
+        expected = counts * stress_functions.soc_stress(soc=soc, **self.params['soc']) * \
+            stress_functions.temperature_stress(mean_temp=temp, **self.params['temperature']) * \
+            stress_functions.dod_bolun_stress(dod=dod, **self.params['dod_bolun'])
+
+        cyclic_aging = self.model._compute_cyclic_aging(cycle_type=counts, cycle_dod=dod, avg_cycle_temp=temp,
+                                                        avg_cycle_soc=soc)
+        np.testing.assert_allclose(cyclic_aging, expected)
+        self.assertAlmostEqual(self.model._compute_cyclic_aging(cycle_type=counts[3], cycle_dod=dod[3],
+                                                                avg_cycle_temp=temp[3], avg_cycle_soc=soc[3]),
+                               expected[3])
+
+    def test_calendar_aging(self):
+        expected = stress_functions.time_stress(t=3600., **self.params['time']) * \
+            stress_functions.soc_stress(soc=0.4, **self.params['soc']) * \
+            stress_functions.temperature_stress(mean_temp=300., **self.params['temperature'])
+        self.assertAlmostEqual(self.model._compute_calendar_aging(curr_time=3600., avg_temp=300., avg_soc=0.4),
+                               expected)
+
+    def test_wrong_factor(self):
+        self.config['components']['stress_factors']['calendar'].append('dod_bolun')
+        self.assertRaises(KeyError, BolunModel, components_settings=self.config['components'],
+                          stress_models=self.params)
+
+
+if __name__ == '__main__':
+    unittest.main()
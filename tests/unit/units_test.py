@@ -0,0 +1,39 @@
+import unittest
+import numpy as np
+from pint import UnitRegistry
+from src.preprocessing.data_preparation import validate_parameters_unit
+from src.preprocessing.units import convert, get_conversion
+
+
+class UnitsTest(unittest.TestCase):
+    def test_same_as_pint(self):
+        ureg = UnitRegistry(autoconvert_offset_to_baseunit=True)
+        values = np.random.default_rng(0).normal(20., 10., 1000)
+
+        # Common units are converted with the same factors of pint, unusual ones by pint itself
+        for from_unit, to_unit in [('degC', 'kelvin'), ('degF', 'kelvin'), ('mA', 'ampere'), ('kW', 'watt'),
+                                   ('mohm', 'ohm'), ('h', 'seconds'), ('kWh', 'joule'), ('degR', 'degC')]:
+            expected = (values.tolist() * ureg.parse_units(from_unit)).to(ureg.parse_units(to_unit)).magnitude
+            np.testing.assert_allclose(convert(values, from_unit, to_unit), expected, rtol=1e-12,
+                                       err_msg="{} -> {}".format(from_unit, to_unit))
+
+        self.assertEqual(convert(25, 'degC', 'K'), 298.15)
+        self.assertRaises(ValueError, convert, 1., 'V', 'ampere')
+        self.assertRaises(ValueError, convert, 1., 'mF', 'faraday')
+
+    def test_cached_conversion(self):
+        get_conversion.cache_clear()
+        for _ in range(3):
+            convert(np.arange(10.), 'mV', 'volt')
+        self.assertEqual(get_conversion.cache_info().misses, 1)
+        self.assertEqual(get_conversion('mV', 'volt'), (1e-3, 0.))
+
+    def test_parameters(self):
+        params = validate_parameters_unit({'temp_ambient': {'var': 'temperature', 'value': 25, 'unit': 'degC'},
+                                           'v_max': {'var': 'voltage', 'value': 4.2, 'unit': 'V'},
+                                           'nominal_capacity': 2.5})
+        self.assertEqual(params, {'temp_ambient': 298.15, 'v_max': 4.2, 'nominal_capacity': 2.5})
+
+
+if __name__ == '__main__':
+    unittest.main()
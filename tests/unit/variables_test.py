@@ -0,0 +1,42 @@
+import unittest
+import numpy as np
+from src.digital_twin.parameters.variables import Scalar, LookupTableFunction
+
+
+class GetValuesTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.temps = rng.uniform(270., 320., 50)
+        self.socs = rng.uniform(0., 1., 50)
+
+    def _assert_matches_get_value(self, lookup, state):
+        values = lookup.get_values(input_vars=state)
+        expected = [lookup.get_value(input_vars={name: state[name][j] for name in lookup.x_names})
+                    for j in range(len(values))]
+        np.testing.assert_allclose(values, expected)
+
+    def test_scalar(self):
+        scalar = Scalar(name='r0', value=0.01)
+        np.testing.assert_array_equal(scalar.get_values(input_vars={'soc': self.socs}), np.full(50, 0.01))
+        self.assertEqual(scalar.get_values().shape, ())
+
+    def test_lookup_tables(self):
+        state = {'temp': self.temps, 'soc': self.socs, 'soh': np.ones(50)}
+
+        one_dim = LookupTableFunction(name='v_ocv', y_values=[3., 3.6, 4.2], x_names=['soc'], x_values=[[0., 0.5, 1.]])
+        self._assert_matches_get_value(one_dim, state)
+
+        temps, socs = np.meshgrid([273.15, 298.15, 313.15], [0., 0.5, 1.], indexing='ij')
+        grid = LookupTableFunction(name='r0', y_values=(temps * socs).ravel().tolist(), x_names=['temp', 'soc'],
+                                   x_values=[temps.ravel().tolist(), socs.ravel().tolist()])
+        self._assert_matches_get_value(grid, state)
+
+        scattered = LookupTableFunction(name='r0', y_values=[1., 2., 3., 5.], x_names=['temp', 'soc'],
+                                        x_values=[[273.15, 313.15, 273.15, 300.], [0., 0., 1., 0.9]])
+        self._assert_matches_get_value(scattered, state)
+
+        self.assertRaises(Exception, grid.get_values, {'soc': self.socs})
+
+
+if __name__ == '__main__':
+    unittest.main()